@@ -1,230 +1,428 @@
+import config  # loads .env once, before the modules below read their settings
 import streamlit as st
 import time
-import random
 import os
-import re
-from dotenv import load_dotenv
-import pandas as pd
-from groq import Groq
+import uuid
+from functools import partial
+import llm_gateway
+from prefetch import QuestionPrefetcher
+from batch_generation import generate_game, format_question
+from question_bank import get_bank
+import question_pack
+from question_pool import get_pool
+from dedup import DedupIndex
+from highscores import get_scores
+from stream_parser import QuestionStreamParser
+import engine
+import errors
+import verification
+import output_parser
+import prompts
+import metrics
+import player_stats
+import snapshots
+import event_log
 
 # --- Setup Groq API ---
-load_dotenv()
-
-if not os.getenv("GROQ_API_KEY"):
+# .env was read once when config was first imported, not on every rerun. Replaying a
+# cassette (LLM_CASSETTE=replay) makes no calls, so it runs without a key.
+if not config.GROQ_API_KEY and config.LLM_CASSETTE != "replay":
     st.error("❌ Missing GROQ_API_KEY in .env file. Please add it before running.")
     st.stop()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Every call goes through the shared LLM gateway; each browser session gets its own
+# handle so its in-flight requests are cancelled when the session goes away. The
+# gateway (and groq) is only started by the first request that needs it.
+if "llm" not in st.session_state:
+    st.session_state.llm = llm_gateway.session()
+client = st.session_state.llm
+
+# How many upcoming questions to generate in the background
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "2"))
+# "batch" asks for the whole game in one call, "single" generates question by question
+GENERATION_MODE = os.getenv("GENERATION_MODE", "batch")
+# Draw a question while it is being generated when nothing is ready in advance
+STREAM_QUESTIONS = os.getenv("STREAM_QUESTIONS", "1") == "1"
+LEADERBOARD_PAGE = 10
+# Stock every tier of every theme in the shared pool as soon as the process serves a page,
+# instead of when a theme is first picked; costs LLM calls up front (see bench_ladder.py)
+POOL_PREWARM = os.getenv("POOL_PREWARM") == "1"
+# Sidebar with latency/token stats; also available with ?debug=1 in the URL
+DEBUG_PANEL = os.getenv("DEBUG_PANEL") == "1"
 
 # --- Quiz Themes ---
-themes = ["Bollywood", "General Knowledge", "IPL", "Chhatrapati Shivaji Maharaj", "History"]
+# Plus whatever an imported question pack covers (see question_pack.py)
+themes = question_pack.with_pack_themes(
+    ["Bollywood", "General Knowledge", "IPL", "Chhatrapati Shivaji Maharaj", "History"], engine.TIERS[0])
+
+if POOL_PREWARM:
+    # Cheap after the first rerun: only buffers under their low water start a refill
+    for theme in themes:
+        get_pool().ensure_ladder(theme)
 
 # --- Session State Initialization ---
 if "player_name" not in st.session_state:
     st.session_state.player_name = ""
-if "selected_theme" not in st.session_state:
-    st.session_state.selected_theme = None
-if "score" not in st.session_state:
-    st.session_state.score = 0
-if "q_count" not in st.session_state:
-    st.session_state.q_count = 0
-if "question_data" not in st.session_state:
-    st.session_state.question_data = None
-if "correct_answer" not in st.session_state:
-    st.session_state.correct_answer = None
-if "lifelines" not in st.session_state:
-    st.session_state.lifelines = {"50-50": True, "Skip": True, "Hint": True}
-if "shuffled_options" not in st.session_state:
-    st.session_state.shuffled_options = None
-if "options_50_50" not in st.session_state:
-    st.session_state.options_50_50 = None
+# The running game (engine.GameState); None while choosing a theme
+if "game" not in st.session_state:
+    st.session_state.game = None
 if "history_questions" not in st.session_state:
-    st.session_state.history_questions = {theme: [] for theme in themes}
+    st.session_state.history_questions = {theme: DedupIndex() for theme in themes}
+if "bank_id" not in st.session_state:
+    st.session_state.bank_id = None
+
+# --- Resume a game from another session, another replica or before a restart ---
+if "resume_token" not in st.session_state:
+    token = st.query_params.get("resume", "")
+    blob = snapshots.get_snapshots().load(token) if token.isalnum() else None
+    restored = snapshots.loads(blob) if blob else None
+    if restored:
+        player, game, game_id, history, extra = restored
+        st.session_state.player_name = player
+        st.session_state.game = game
+        st.session_state.game_id = game_id
+        if game is not None:
+            st.session_state.history_questions[game.theme] = DedupIndex(history)
+        st.session_state.bank_id = extra.get("bank_id")
+        st.session_state.question_source = extra.get("source")
+        st.session_state.shown_at = time.monotonic()
+    st.session_state.resume_token = token if restored else uuid.uuid4().hex
+    st.session_state.saved = (st.session_state.player_name, st.session_state.game)
 
 # --- Helper Functions ---
-def generate_question(theme, difficulty="Easy"):
-    prompt = f"""
-    You are a quiz generator. Create ONE easy multiple-choice question
-    STRICTLY about: {theme}.
-    It MUST be factual and relevant to the theme.
-    Do NOT repeat these questions: {st.session_state.history_questions[theme]}
-
-    Output exactly in this format:
-    Question: <question>
-    Options:
-    1. <option1>
-    2. <option2>
-    3. <option3>
-    4. <option4>
-    Explanation: <short explanation>
-    """
-
-    response = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a strict trivia question generator."},
-            {"role": "user", "content": prompt},
-        ],
-        model="llama-3.1-8b-instant",
-        temperature=0.7
-    )
-
-    content = response.choices[0].message.content.strip()
-    first_line = content.split("\n")[0].replace("Question:", "").strip()
-    st.session_state.history_questions[theme].append(first_line)
-    return content
-
-
-def generate_answer(question):
-    prompt = f"Answer this question: {question}\nOutput only the correct option number (1-4)."
-    response = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a trivia answerer."},
-            {"role": "user", "content": prompt},
-        ],
-        model="llama-3.1-8b-instant"
-    )
-    content = response.choices[0].message.content.strip()
-    match = re.search(r'[1-4]', content)
-    return int(match.group()) if match else random.randint(1, 4)
-
-
-def load_highscores():
-    if os.path.exists("highscores.csv"):
-        return pd.read_csv("highscores.csv")
-    return pd.DataFrame(columns=["Name", "Score"])
-
-
-def save_highscore(name, score):
-    df = load_highscores()
-    df = pd.concat([df, pd.DataFrame([{"Name": name, "Score": score}])], ignore_index=True)
-    df.to_csv("highscores.csv", index=False)
+@metrics.instrument()
+def generate_question(theme, history, difficulty="Easy"):
+    # Prompt written by prompts.py (PROMPT_STRATEGY)
+    response = client.chat.completions.create(**prompts.question_request(theme, history, difficulty))
+
+    return response.choices[0].message.content.strip()
+
+
+@metrics.instrument()
+def stream_question(theme, history, number, difficulty):
+    # Show the question text as it is generated; the options are listed once their
+    # lines are complete, and the answer radio only appears once the answer key is agreed.
+    # The streamed text stays up through the parse and the key votes.
+    parser = QuestionStreamParser()
+    title, choices = st.empty(), st.empty()
+    for delta in client.stream(**prompts.question_request(theme, history, difficulty)):
+        if parser.feed(delta) and parser.question:
+            title.subheader(f"Question {number}: {parser.question}")
+            if parser.options:
+                choices.markdown("\n".join(f"- {opt}" for opt in parser.options))
+    try:
+        q_data = format_question(output_parser.parse(parser.close(), client, theme, source="stream"))
+        # None when the reply was unusable or the answer voters disagree; the caller then
+        # takes a prefetched question
+        return q_data, verification.verify(client, q_data, theme, difficulty)
+    except output_parser.MalformedOutput:
+        return None, None
+    finally:
+        title.empty()
+        choices.empty()
+
+
+def produce_question(theme, history, difficulty="Easy"):
+    # Runs on the prefetch workers, so it only uses its arguments
+    return verification.generate_verified(client, partial(generate_question, theme, history, difficulty), theme,
+                                          difficulty)
+
+
+def produce_game(theme, history, count=5, difficulty="Easy"):
+    # Whole game in one request; the keys that come with it are checked in one parallel round
+    items = verification.verify_items(client, generate_game(client, theme, history, count=count,
+                                                            difficulty=difficulty), theme, difficulty)
+    return [(format_question(item), item["correct"]) for item in items]
+
+
+@metrics.instrument()
+def next_question(theme):
+    # Serve an unseen question from an imported pack, the bank or the shared pool first;
+    # only generate in the request when all of them miss. Served questions are saved to the bank.
+    # Everything is looked up at the tier the ladder puts this question on.
+    bank = get_bank()
+    player = st.session_state.player_name
+    history = st.session_state.history_questions[theme]
+    difficulty = engine.tier(st.session_state.game)
+    item = question_pack.draw(player, theme, difficulty)
+    if item is not None and item["question"] not in history:
+        metrics.note(cache_hits=1)
+        st.session_state.bank_id = None
+        st.session_state.question_source = "pack"
+        return engine.Question.from_item(item)
+    drawn = bank.draw(player, theme, difficulty, exclude=history)
+    if drawn:
+        metrics.note(cache_hits=1)
+        st.session_state.bank_id = drawn[0]["id"]
+        st.session_state.question_source = "bank"
+        return engine.Question.from_item(drawn[0])
+    item = get_pool().take(theme, difficulty, history)
+    if item is not None:
+        metrics.note(cache_hits=1)
+        st.session_state.bank_id = bank.record(player, theme, difficulty, item)
+        st.session_state.question_source = "pool"
+        return engine.Question.from_item(item)
+    try:
+        question = None
+        # Asked once: a job finishing in between would serve it without counting the hit
+        ready = st.session_state.prefetcher.has_ready(theme, difficulty)
+        if ready:
+            metrics.note(cache_hits=1)
+        if STREAM_QUESTIONS and not ready:
+            q_data, correct = stream_question(theme, history, st.session_state.game.q_count + 1, difficulty)
+            if correct is not None:
+                question = engine.Question.from_item(output_parser.parse_question(q_data, correct))
+        if question is None or question.text in history:
+            prefetched = st.session_state.prefetcher.take(theme, difficulty, history)
+            question = engine.Question.from_item(output_parser.parse_question(*prefetched))
+    except errors.QuestionUnavailable:
+        # Groq is saturated or down (or the game's token budget is spent): repeat a stored question from an earlier game instead
+        drawn = bank.draw(player, theme, difficulty, exclude=history, include_seen=True)
+        if not drawn:
+            st.error("⚠️ The question service is busy right now. Please try again in a minute.")
+            st.stop()
+        st.session_state.bank_id = drawn[0]["id"]
+        st.session_state.question_source = "fallback"
+        return engine.Question.from_item(drawn[0])
+    st.session_state.bank_id = bank.record(player, theme, difficulty, question.to_item())
+    st.session_state.question_source = "generated"
+    return question
+
+
+@metrics.instrument()
+def load_leaderboard(theme, page):
+    return get_scores().leaderboard(theme, page, LEADERBOARD_PAGE)
+
+
+@metrics.instrument()
+def save_highscore(game_id, name, score, theme):
+    # Safe to call on every rerun of the results screen: one row per game id
+    get_scores().add(game_id, name, score, theme)
+
+
+def render_leaderboard(theme):
+    # Paginated from the per-player aggregates, so it costs the same with 10M games stored
+    scores = get_scores()
+    scope = st.radio("🏅 Leaderboard", [theme, "All themes"], horizontal=True, key="board_scope")
+    key = player_stats.ALL if scope == "All themes" else scope
+    mine = scores.standing(st.session_state.player_name, key)
+    if mine:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Your rank", f"#{mine['rank']:,}", f"of {mine['players']:,} players", delta_color="off")
+        col2.metric("Your best", mine["best"], f"avg {mine['mean']} over {mine['games']} games", delta_color="off")
+        col3.metric("Percentile", f"{mine['percentile']}%")
+    pages = max(1, -(-scores.players(key) // LEADERBOARD_PAGE))
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"board_page_{key}")
+    st.dataframe(load_leaderboard(key, page - 1), hide_index=True)
+
+
+def log_event(kind, **fields):
+    # Queued for the background writer; never waits on disk during a rerun
+    event_log.emit(kind, game_id=st.session_state.game_id, player=st.session_state.player_name,
+                   theme=st.session_state.game.theme, **fields)
+
+
+def log_move(state, **fields):
+    # The transition that ends the game also logs the final result and its LLM tokens
+    if state.finished:
+        budget = st.session_state.llm.budget
+        log_event(event_log.GAME_FINISHED, score=state.score, length=state.length, questions=state.q_count,
+                  tokens=budget.spent if budget is not None else None)
+
+
+def available(theme, difficulty):
+    # Questions of a tier this player can get without generating anything for the session
+    player = st.session_state.player_name
+    return (get_bank().count_unseen(player, theme, difficulty) + question_pack.remaining(player, theme, difficulty)
+            + get_pool().depth(theme, difficulty))
 
 
 def reset_game():
-    st.session_state.selected_theme = None
-    st.session_state.score = 0
-    st.session_state.q_count = 0
-    st.session_state.question_data = None
-    st.session_state.correct_answer = None
-    st.session_state.lifelines = {"50-50": True, "Skip": True, "Hint": True}
-    st.session_state.shuffled_options = None
-    st.session_state.options_50_50 = None
-    st.session_state.history_questions = {theme: [] for theme in themes}
+    st.session_state.prefetcher.reset()
+    st.session_state.llm.cancel()
+    st.session_state.game = None
+    st.session_state.history_questions = {theme: DedupIndex() for theme in themes}
+
+if "prefetcher" not in st.session_state:
+    st.session_state.prefetcher = QuestionPrefetcher(produce_question, depth=PREFETCH_DEPTH)
+
+def checkpoint():
+    # Runs after every rerun but only writes when there was a transition: game states
+    # are immutable, so an identity check is enough to tell
+    player, game = st.session_state.player_name, st.session_state.game
+    saved_player, saved_game = st.session_state.saved
+    if not player or (player == saved_player and game is saved_game):
+        return
+    st.session_state.saved = (player, game)
+    history = st.session_state.history_questions.get(game.theme, ()) if game is not None else ()
+    with metrics.timed("snapshot"):
+        snapshots.get_snapshots().save(st.session_state.resume_token, snapshots.dumps(
+            player, game, st.session_state.get("game_id"), history,
+            {"bank_id": st.session_state.bank_id, "source": st.session_state.get("question_source")}))
+    st.query_params["resume"] = st.session_state.resume_token
+
+
+def render_debug_panel():
+    with st.sidebar:
+        st.header("⏱️ Latency & cost")
+        st.dataframe(metrics.summary(), hide_index=True)
+        st.caption(f"Scheduler: {llm_gateway.get_gateway().scheduler.stats}")
+        if st.session_state.llm.budget is not None:
+            st.caption(f"Game tokens ({prompts.STRATEGY} prompts): {st.session_state.llm.budget.stats}")
+        if llm_gateway.get_gateway().cassette is not None:
+            recorder = llm_gateway.get_gateway().cassette
+            st.caption(f"Cassette ({recorder.mode}, {recorder.directory}): {recorder.stats}")
+        st.caption("Shared question pool")
+        st.dataframe(get_pool().stats(), hide_index=True)
+        st.caption("Generated replies: repaired locally, fixed with a follow-up call, or lost")
+        st.dataframe(output_parser.stats(), hide_index=True)
+        st.caption("Answer-key agreement by theme (least reliable first)")
+        st.dataframe(get_bank().agreement(), hide_index=True)
+        st.caption(f"Prometheus dump: {metrics.METRICS_PATH}")
+
 
 # --- Streamlit UI ---
-st.title("💰 Millionaire Quiz - Next Level")
-
-# --- Player Name ---
-if not st.session_state.player_name:
-    name_input = st.text_input("Enter your name to start the game:")
-    if st.button("Confirm Name") and name_input.strip():
-        st.session_state.player_name = name_input.strip()
-        st.rerun()
-else:
-    st.write(f"Welcome, **{st.session_state.player_name}**! 🎮")
-
-    # --- Theme Selection ---
-    if st.session_state.selected_theme is None:
-        selected = st.selectbox("🎯 Choose a theme:", themes)
-        if st.button("Start Quiz"):
-            st.session_state.selected_theme = selected
-            st.session_state.score = 0
-            st.session_state.q_count = 0
-            st.session_state.question_data = None
-            st.session_state.correct_answer = None
-            st.session_state.lifelines = {"50-50": True, "Skip": True, "Hint": True}
-            st.session_state.shuffled_options = None
-            st.session_state.options_50_50 = None
+def render_page():
+    st.title("💰 Millionaire Quiz - Next Level")
+
+    # --- Player Name ---
+    if not st.session_state.player_name:
+        name_input = st.text_input("Enter your name to start the game:")
+        if st.button("Confirm Name") and name_input.strip():
+            st.session_state.player_name = name_input.strip()
             st.rerun()
     else:
-        st.write(f"📘 Current Theme: **{st.session_state.selected_theme}**")
-
-        # --- Quiz Completed ---
-        if st.session_state.q_count >= 5:
-            st.success(f"🏆 Quiz Completed! Final Score: {st.session_state.score}/5")
-            save_highscore(st.session_state.player_name, st.session_state.score)
-            st.dataframe(load_highscores())
-
-            if st.button("Play Again"):
-                reset_game()
+        st.write(f"Welcome, **{st.session_state.player_name}**! 🎮")
+
+        # --- Theme Selection ---
+        if st.session_state.game is None:
+            selected = st.selectbox("🎯 Choose a theme:", themes)
+            if st.button("Start Quiz"):
+                game = st.session_state.game = engine.new_game(selected)
+                st.session_state.game_id = uuid.uuid4().hex
+                # Calls made for this game from here on count against GAME_TOKEN_BUDGET
+                st.session_state.llm.budget = prompts.Budget()
+                # Only the first tier's buffer starts filling now; each question on screen
+                # stocks the tier of the one after it. Only generate what the pack, the bank and
+                # the shared pool can't serve for this player, for the questions on the first tier.
+                first = engine.tier(game)
+                get_pool().ensure(selected, first)
+                opening = sum(engine.base_tier(n, game.length) == 0 for n in range(game.length))
+                missing = opening - available(selected, first)
+                if STREAM_QUESTIONS:
+                    # The first question is streamed, so only the rest comes from the background
+                    missing -= 1
+                if missing > 0 and GENERATION_MODE == "batch":
+                    st.session_state.prefetcher.fill_batch(selected, first,
+                                                           st.session_state.history_questions[selected],
+                                                           partial(produce_game, count=missing), missing)
+                elif missing > 0 and not STREAM_QUESTIONS:
+                    st.session_state.prefetcher.fill(selected, first, st.session_state.history_questions[selected],
+                                                     limit=1)
                 st.rerun()
-
         else:
-            # --- Generate Question if Needed ---
-            if not st.session_state.question_data:
-                q_data = generate_question(st.session_state.selected_theme)
-                correct = generate_answer(q_data)
-                st.session_state.question_data = q_data
-                st.session_state.correct_answer = correct
-
-                lines = q_data.split("\n")
-                options = [line.split(". ", 1)[1] for line in lines if line.strip().startswith(("1.", "2.", "3.", "4."))]
-                st.session_state.original_options = options.copy()
-                random.shuffle(options)
-                st.session_state.shuffled_options = options
-                correct_text = st.session_state.original_options[correct - 1]
-                st.session_state.correct_shuffled = options.index(correct_text)
-                st.session_state.options_50_50 = options.copy()
-
-            # --- Display Question ---
-            lines = st.session_state.question_data.split("\n")
-            question_text = lines[0].replace("Question:", "").strip()
-            explanation_lines = [line.replace("Explanation:", "").strip() for line in lines if "Explanation:" in line]
-            explanation = explanation_lines[0] if explanation_lines else "No explanation available."
-
-            options_list = st.session_state.shuffled_options
-            correct_index = st.session_state.correct_shuffled
-
-            st.subheader(f"Question {st.session_state.q_count+1}: {question_text}")
-            st.subheader(f"Score: {st.session_state.score}/5")
-
-            # --- Lifelines ---
-            col1, col2, col3 = st.columns(3)
-
-            if st.session_state.lifelines["50-50"]:
-                if col1.button("50-50", key=f"fifty_{st.session_state.q_count}"):
-                    correct_opt = options_list[correct_index]
-                    wrong_opts = [opt for opt in options_list if opt != correct_opt]
-                    remove_opts = random.sample(wrong_opts, 2)
-                    st.session_state.options_50_50 = [opt for opt in options_list if opt not in remove_opts]
-                    st.session_state.lifelines["50-50"] = False
-            else:
-                col1.button("50-50", disabled=True, key=f"fifty_disabled_{st.session_state.q_count}")
-
-            if st.session_state.lifelines["Skip"]:
-                if col2.button("Skip", key=f"skip_{st.session_state.q_count}"):
-                    st.session_state.q_count += 1
-                    st.session_state.question_data = None
-                    st.session_state.shuffled_options = None
-                    st.session_state.options_50_50 = None
-                    st.session_state.lifelines["Skip"] = False
+            game = st.session_state.game
+            theme = game.theme
+            st.write(f"📘 Current Theme: **{theme}**")
+
+            # --- Quiz Completed ---
+            if game.finished:
+                st.success(f"🏆 Quiz Completed! Final Score: {game.score}/{game.length} "
+                           f"— you won ₹{engine.prize(game):,}")
+                save_highscore(st.session_state.game_id, st.session_state.player_name, game.score, theme)
+                render_leaderboard(theme)
+
+                if st.button("Play Again"):
+                    reset_game()
                     st.rerun()
-            else:
-                col2.button("Skip", disabled=True, key=f"skip_disabled_{st.session_state.q_count}")
 
-            if st.session_state.lifelines["Hint"]:
-                if col3.button("Hint", key=f"hint_{st.session_state.q_count}"):
-                    st.info(f"💡 Hint: {explanation.split('.')[0]}...")
-                    st.session_state.lifelines["Hint"] = False
             else:
-                col3.button("Hint", disabled=True, key=f"hint_disabled_{st.session_state.q_count}")
-
-            # --- Answer Options ---
-            choice = st.radio("Select your answer:", st.session_state.options_50_50, key=f"radio_{st.session_state.q_count}")
+                # --- Generate Question if Needed ---
+                if game.question is None:
+                    question = next_question(theme)
+                    st.session_state.history_questions[theme].append(question.text)
+                    game = st.session_state.game = engine.present(game, question)
+                    st.session_state.shown_at = time.monotonic()
+                    log_event(event_log.QUESTION_SERVED, q_index=game.q_count, question=question.text,
+                              source=st.session_state.question_source, difficulty=engine.tier(game))
+
+                # Start generating the next questions nothing else can cover while this one is on
+                # screen, at the tier the next question gets if this one is answered right
+                remaining = game.length - 1 - game.q_count
+                upcoming = engine.next_tier(game)
+                if remaining > 0:
+                    get_pool().ensure(theme, upcoming)
+                st.session_state.prefetcher.fill(theme, upcoming, st.session_state.history_questions[theme],
+                                                 limit=remaining - available(theme, upcoming))
+
+                # --- Display Question ---
+                st.subheader(f"Question {game.q_count+1}: {game.question.text}")
+                st.subheader(f"Score: {game.score}/{game.length}")
+                st.caption(f"{engine.tier(game)} question · winnings so far ₹{engine.prize(game):,}")
+
+                # --- Lifelines ---
+                col1, col2, col3 = st.columns(3)
+
+                if "50-50" in game.lifelines:
+                    if col1.button("50-50", key=f"fifty_{game.q_count}"):
+                        game = st.session_state.game = engine.fifty_fifty(game)
+                        log_event(event_log.LIFELINE_USED, q_index=game.q_count, lifeline="50-50")
+                else:
+                    col1.button("50-50", disabled=True, key=f"fifty_disabled_{game.q_count}")
+
+                if "Skip" in game.lifelines:
+                    if col2.button("Skip", key=f"skip_{game.q_count}"):
+                        st.session_state.game = engine.skip(game)
+                        log_event(event_log.LIFELINE_USED, q_index=game.q_count, lifeline="Skip")
+                        log_move(st.session_state.game)
+                        st.rerun()
+                else:
+                    col2.button("Skip", disabled=True, key=f"skip_disabled_{game.q_count}")
 
-            # --- Submit ---
-            if st.button("Submit", key=f"submit_{st.session_state.q_count}"):
-                if choice == options_list[correct_index]:
-                    st.success("✅ Correct!")
-                    st.session_state.score += 1
-                    st.balloons()
+                if "Hint" in game.lifelines:
+                    if col3.button("Hint", key=f"hint_{game.q_count}"):
+                        game = st.session_state.game = engine.hint(game)
+                        log_event(event_log.LIFELINE_USED, q_index=game.q_count, lifeline="Hint")
                 else:
-                    st.error(f"❌ Wrong! Correct answer: {options_list[correct_index]}")
-                    st.info(f"Explanation: {explanation}")
-
-                st.session_state.q_count += 1
-                st.session_state.question_data = None
-                st.session_state.shuffled_options = None
-                st.session_state.options_50_50 = None
-                time.sleep(1)
-                st.rerun()
+                    col3.button("Hint", disabled=True, key=f"hint_disabled_{game.q_count}")
+                if game.hint:
+                    st.info(f"💡 Hint: {game.hint}")
+
+                # --- Answer Options ---
+                choice = st.radio("Select your answer:", game.options, key=f"radio_{game.q_count}")
+
+                # --- Submit ---
+                if st.button("Submit", key=f"submit_{game.q_count}"):
+                    st.session_state.game = engine.answer(game, choice)
+                    log_event(event_log.ANSWER_SUBMITTED, q_index=game.q_count, choice=choice,
+                              correct=st.session_state.game.last,
+                              latency_ms=round((time.monotonic() - st.session_state.shown_at) * 1000))
+                    log_move(st.session_state.game)
+                    if st.session_state.game.last:
+                        st.success("✅ Correct!")
+                        st.balloons()
+                    else:
+                        st.error(f"❌ Wrong! Correct answer: {game.question.answer}")
+                        st.info(f"Explanation: {game.question.explanation}")
+
+                    with metrics.timed("submit_pause"):
+                        time.sleep(1)
+                    st.rerun()
+
+                # --- Report a bad question so the bank stops serving it ---
+                if st.session_state.bank_id is not None:
+                    if st.button("🚩 Report question", key=f"report_{game.q_count}"):
+                        get_bank().flag(st.session_state.bank_id)
+                        st.session_state.bank_id = None
+                        st.info("Thanks! This question won't be asked again.")
+
+metrics.maybe_dump()
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    render_debug_panel()
+
+with metrics.timed("rerun"):
+    try:
+        render_page()
+    finally:
+        # st.rerun() leaves render_page() through an exception right after most transitions
+        checkpoint()
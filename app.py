@@ -1,128 +1,146 @@
+import config  # loads .env once, before the modules below read their settings
 import time
-import threading
 import streamlit as st
-from groq import Groq
-from dotenv import load_dotenv
-import os
-
-# Load API key
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+import llm_gateway
+import uuid
+from question_bank import get_bank
+import question_pack
+from question_pool import get_pool
+from dedup import DedupIndex
+import engine
+import errors
+import output_parser
+import verification
+import event_log
+import prompts
+
+# Shared LLM gateway; one handle per browser session so abandoned requests get cancelled
+if "llm" not in st.session_state:
+    st.session_state.llm = llm_gateway.session()
+client = st.session_state.llm
 
 # Available themes
-themes = [
+themes = question_pack.with_pack_themes([
     "Science", "Movies", "Sports", "History", "Geography",
     "Chhatrapati Shivaji Maharaj", "Chhatrapati Sambhaji Maharaj"
-]
+], engine.TIERS[0])
 
 # Keep track of asked questions
 if "history_questions" not in st.session_state:
-    st.session_state.history_questions = {theme: [] for theme in themes}
-
-# Game state
-if "selected_theme" not in st.session_state:
-    st.session_state.selected_theme = None
-if "score" not in st.session_state:
-    st.session_state.score = 0
-if "q_count" not in st.session_state:
-    st.session_state.q_count = 0
-if "question_data" not in st.session_state:
-    st.session_state.question_data = None
-if "correct_answer" not in st.session_state:
-    st.session_state.correct_answer = None
+    st.session_state.history_questions = {theme: DedupIndex() for theme in themes}
 
-# Functions to generate question and answer
-def generate_question(selected_theme):
-    prompt = f"""
-You are a quiz generator. Create ONE easy multiple-choice trivia question
-STRICTLY about: {selected_theme}.
-It MUST be factual and relevant to the theme.
+# Anonymous id so the question bank can track what this player has seen
+if "player_id" not in st.session_state:
+    st.session_state.player_id = uuid.uuid4().hex
 
-Do NOT repeat any of these past questions: {st.session_state.history_questions[selected_theme]}
+# Game state (engine.GameState); None until a theme is picked
+if "game" not in st.session_state:
+    st.session_state.game = None
 
-Output EXACTLY in this format (no extra text, no explanations):
+# Functions to generate question and answer
+def generate_question(selected_theme, difficulty="Easy"):
+    # Prompt written by prompts.py (PROMPT_STRATEGY)
+    request = prompts.question_request(selected_theme, st.session_state.history_questions[selected_theme],
+                                       difficulty, model="llama3-8b-8192")
 
-Question: <question text>
-Options:
-1. <option1>
-2. <option2>
-3. <option3>
-4. <option4>
-"""
+    # The prompt only lists a few recent questions, so repeats are caught here instead
+    for _ in range(3):
+        chat_completion = client.chat.completions.create(**request)
 
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a trivia quiz generator that follows format strictly."},
-            {"role": "user", "content": prompt}
-        ],
-        model="llama3-8b-8192",
-        temperature=0.7
-    )
+        result = chat_completion.choices[0].message.content.strip()
 
-    result = chat_completion.choices[0].message.content.strip()
-    
-    # Extract question text only for history
-    first_line = result.split("\n")[0].replace("Question:", "").strip()
+        # Extract question text only for history
+        first_line = result.split("\n")[0].replace("Question:", "").strip()
+        if first_line not in st.session_state.history_questions[selected_theme]:
+            break
     st.session_state.history_questions[selected_theme].append(first_line)
     
     return result
 
 
-def generate_answer(question):
-    prompt = f"""Please answer this question: {question}
-    Output only the correct option number (1-4). No extra text."""
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a trivia quiz answerer."},
-            {"role": "user", "content": prompt}
-        ],
-        model="llama3-8b-8192"
-    )
-    return int(chat_completion.choices[0].message.content.strip())
-
 # UI starts here
 st.title("💰 Millionaire Quiz Game")
 
 # Step 1: Theme selection
-if not st.session_state.selected_theme:
-    st.session_state.selected_theme = st.selectbox("Choose a theme", themes)
+if st.session_state.game is None:
+    selected = st.selectbox("Choose a theme", themes)
     if st.button("Start Quiz"):
-        st.session_state.score = 0
-        st.session_state.q_count = 0
-        st.session_state.history_questions = {theme: [] for theme in themes}
+        st.session_state.game = engine.new_game(selected)
+        st.session_state.game_id = uuid.uuid4().hex
+        # Calls made for this game count against GAME_TOKEN_BUDGET
+        client.budget = prompts.Budget()
+        # Stock the first question's tier; each question on screen stocks the next one's
+        get_pool().ensure(selected, engine.tier(st.session_state.game))
+        st.session_state.history_questions = {theme: DedupIndex() for theme in themes}
         st.rerun()
 else:
+    game = st.session_state.game
     # Step 2: Generate new question if needed
-    if st.session_state.q_count < 5:
-        if not st.session_state.question_data:
-            q_data = generate_question(st.session_state.selected_theme)
-            # st.session_state.history_questions[st.session_state.selected_theme].append(q_data)
-            correct = generate_answer(q_data)
-            st.session_state.question_data = q_data
-            st.session_state.correct_answer = correct
-
-        # Parse question and options
-        lines = st.session_state.question_data.split("\n")
-        question_text = lines[0].replace("Question:", "").strip()
-        options = [line.split(". ", 1)[1] for line in lines if line.strip().startswith(("1.", "2.", "3.", "4."))]
-
-        st.subheader(f"Question {st.session_state.q_count+1}: {question_text}")
-        st.subheader(f"Current Score : {st.session_state.score}")
-        choice = st.radio("Select your answer:", options)
+    if not game.finished:
+        if game.question is None:
+            theme = game.theme
+            difficulty = engine.tier(game)
+            # Serve from an imported pack or the question bank first, only call the LLM when neither has anything unseen
+            item = question_pack.draw(st.session_state.player_id, theme, difficulty)
+            drawn = [item] if item is not None else get_bank().draw(st.session_state.player_id, theme, difficulty,
+                                                                    exclude=st.session_state.history_questions[theme])
+            pooled = None if drawn else get_pool().take(theme, difficulty, st.session_state.history_questions[theme])
+            if drawn:
+                question = engine.Question.from_item(drawn[0])
+                st.session_state.history_questions[theme].append(question.text)
+            elif pooled is not None:
+                # Ready question from the process-wide pool, no LLM call in this rerun
+                question = engine.Question.from_item(pooled)
+                st.session_state.history_questions[theme].append(question.text)
+                get_bank().record(st.session_state.player_id, theme, difficulty, pooled)
+            else:
+                try:
+                    # The answer key is a majority vote of parallel answer calls; no consensus means a new question
+                    question = engine.Question.from_item(output_parser.parse_question(
+                        *verification.generate_verified(client, lambda: generate_question(theme, difficulty),
+                                                        theme, difficulty)))
+                    get_bank().record(st.session_state.player_id, theme, difficulty, question.to_item())
+                except errors.QuestionUnavailable:
+                    # Groq is saturated or down (or the game's token budget is spent): fall back to a stored question from an earlier game
+                    drawn = get_bank().draw(st.session_state.player_id, theme, difficulty,
+                                            exclude=st.session_state.history_questions[theme], include_seen=True)
+                    if not drawn:
+                        st.error("The question service is busy right now. Please try again in a minute.")
+                        st.stop()
+                    question = engine.Question.from_item(drawn[0])
+                    st.session_state.history_questions[theme].append(question.text)
+            game = st.session_state.game = engine.present(game, question)
+            st.session_state.shown_at = time.monotonic()
+            if game.q_count + 1 < game.length:
+                get_pool().ensure(theme, engine.next_tier(game))
+            event_log.emit(event_log.QUESTION_SERVED, game_id=st.session_state.game_id,
+                           player=st.session_state.player_id, theme=game.theme, q_index=game.q_count,
+                           question=question.text, difficulty=difficulty)
+
+        st.subheader(f"Question {game.q_count+1}: {game.question.text}")
+        st.subheader(f"Current Score : {game.score}")
+        st.caption(f"{engine.tier(game)} question · winnings so far ₹{engine.prize(game):,}")
+        choice = st.radio("Select your answer:", game.options)
 
         if st.button("Submit"):
-            chosen_index = options.index(choice) + 1
-            if chosen_index == st.session_state.correct_answer:
+            st.session_state.game = engine.answer(game, choice)
+            event_log.emit(event_log.ANSWER_SUBMITTED, game_id=st.session_state.game_id,
+                           player=st.session_state.player_id, theme=game.theme, q_index=game.q_count,
+                           choice=choice, correct=st.session_state.game.last,
+                           latency_ms=round((time.monotonic() - st.session_state.shown_at) * 1000))
+            if st.session_state.game.finished:
+                event_log.emit(event_log.GAME_FINISHED, game_id=st.session_state.game_id,
+                               player=st.session_state.player_id, theme=game.theme,
+                               score=st.session_state.game.score, length=game.length,
+                               tokens=client.budget.spent if client.budget is not None else None)
+            if st.session_state.game.last:
                 st.success("✅ Correct!")
-                st.session_state.score += 1
             else:
-                st.error(f"❌ Wrong! Correct answer: {options[st.session_state.correct_answer - 1]}")
-            st.session_state.q_count += 1
-            st.session_state.question_data = None
+                st.error(f"❌ Wrong! Correct answer: {game.question.answer}")
             time.sleep(1)
             st.rerun()
     else:
-        st.success(f"🎯 Game Over! Your score: {st.session_state.score}/5")
+        st.success(f"🎯 Game Over! Your score: {game.score}/{game.length} — you won ₹{engine.prize(game):,}")
         if st.button("Play Again"):
-            st.session_state.selected_theme = None
+            st.session_state.game = None
             st.rerun()
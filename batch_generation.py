@@ -0,0 +1,91 @@
+import json
+
+import output_parser
+import prompts
+from dedup import DedupIndex
+
+# Retry rounds for entries the model got wrong; each round is a single call
+MAX_REPAIR_ROUNDS = 2
+
+
+def validate_item(item):
+    # Returns a cleaned question dict, or None if the entry is unusable
+    if not isinstance(item, dict):
+        return None
+    question = str(item.get("question", "")).strip()
+    options = item.get("options")
+    if not question or not isinstance(options, list) or len(options) != 4:
+        return None
+    options = [str(opt).strip() for opt in options]
+    if not all(options) or len({opt.lower() for opt in options}) != 4:
+        return None
+    try:
+        correct = int(item.get("correct"))
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= correct <= 4:
+        return None
+    explanation = str(item.get("explanation", "")).strip() or "No explanation available."
+    return {"question": question, "options": options, "correct": correct, "explanation": explanation}
+
+
+def parse_batch(content):
+    # Pull the list of entries out of the reply; tolerate a bare list or ```json fences
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`")
+        content = content[content.find("\n") + 1:] if "\n" in content else content
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end <= start:
+            return []
+        try:
+            data = json.loads(content[start:end + 1])
+        except json.JSONDecodeError:
+            return []
+    if isinstance(data, dict):
+        data = data.get("questions", [])
+    return data if isinstance(data, list) else []
+
+
+def request_batch(client, theme, count, history, model="llama-3.1-8b-instant", difficulty="easy"):
+    response = client.chat.completions.create(**prompts.batch_request(theme, count, history, difficulty, model))
+    return parse_batch(response.choices[0].message.content)
+
+
+def generate_game(client, theme, history, count=5, model="llama-3.1-8b-instant", difficulty="easy"):
+    # One call for the whole game, then small calls only for the entries that failed validation
+    items = []
+    seen = DedupIndex(history)
+    wanted = count
+    for _ in range(MAX_REPAIR_ROUNDS + 1):
+        entries = request_batch(client, theme, wanted, list(seen), model, difficulty)
+        if not entries:
+            output_parser.record("batch", "failed")
+        for entry in entries:
+            item = validate_item(entry)
+            if item is not None:
+                output_parser.record("batch", "clean")
+            else:
+                # Renamed keys, a letter for the answer and the like are repaired locally
+                item = validate_item(output_parser.entry(entry)) if isinstance(entry, dict) else None
+                output_parser.record("batch", "failed" if item is None else "repaired")
+            if item and item["question"] not in seen and len(items) < count:
+                seen.append(item["question"])
+                items.append(item)
+        wanted = count - len(items)
+        if wanted == 0:
+            return items
+    if not items:
+        raise ValueError(f"Could not generate any valid questions for {theme}")
+    return items
+
+
+def format_question(item):
+    # Render a batch entry in the same text layout generate_question() returns
+    lines = [f"Question: {item['question']}", "Options:"]
+    lines += [f"{i}. {opt}" for i, opt in enumerate(item["options"], start=1)]
+    lines.append(f"Explanation: {item['explanation']}")
+    return "\n".join(lines)
@@ -0,0 +1,75 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cassette
+import verification
+from fake_groq_server import start_server
+from llm_gateway import Gateway, Session
+from llm_scheduler import Scheduler
+
+# Record a run of question traffic against the local fake server, then replay it:
+# per-call latency live vs replayed (instant and at the recorded pace), upstream calls
+# made while replaying (should be 0), replies that differ from the recording (should
+# be 0) and the size of the cassette.
+# Usage: python bench_cassette.py [questions] [seconds_per_token]
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+TOKEN_DELAY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+THEMES = ("History", "IPL", "Bollywood", "General Knowledge")
+
+
+def prompt(n):
+    return [{"role": "system", "content": "You are a strict trivia question generator."},
+            {"role": "user", "content": f"Create ONE easy multiple-choice question STRICTLY about: "
+                                        f"{THEMES[n % len(THEMES)]}. Question number {n}."}]
+
+
+def play(session):
+    # One generated, one streamed question and a round of answer-key votes per step;
+    # returns the replies and the seconds each kind of call took
+    replies, timings = [], {"create": [], "stream": [], "votes": []}
+    for n in range(QUESTIONS):
+        start = time.perf_counter()
+        q_data = session.create(messages=prompt(n), model="llama-3.1-8b-instant",
+                                temperature=0.7).choices[0].message.content
+        timings["create"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        streamed = "".join(session.stream(messages=prompt(n + QUESTIONS), model="llama-3.1-8b-instant",
+                                          temperature=0.7))
+        timings["stream"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        votes = session.gather(verification.answer_requests(q_data))
+        timings["votes"].append(time.perf_counter() - start)
+        replies += [q_data, streamed] + [v.choices[0].message.content for v in votes]
+    return replies, timings
+
+
+def main():
+    server, fake, url = start_server(latency=0.1, token_delay=TOKEN_DELAY)
+    with tempfile.TemporaryDirectory() as folder:
+        runs = {}
+        for label, mode, latency in (("record", "record", "0"), ("replay (no delay)", "replay", "0"),
+                                     ("replay (recorded)", "replay", "recorded")):
+            recorder = cassette.Cassette(mode, folder, latency)
+            scheduler = Scheduler(rpm=10_000, tpm=10_000_000) if mode == "record" else None
+            session = Session(Gateway(api_key="fake", base_url=url, scheduler=scheduler, cassette=recorder))
+            before = fake.stats["requests"]
+            replies, timings = play(session)
+            runs[label] = replies, timings, fake.stats["requests"] - before
+        recorded = runs["record"][0]
+        size = sum(os.path.getsize(recorder._path(key)) for key in recorder.keys())
+        print(f"{QUESTIONS} questions (generate, stream, {verification.VOTES} votes each), "
+              f"{len(recorded)} replies, cassette {size / 1024:.1f} KiB")
+        print(f"  {'run':18} {'create':>8} {'stream':>8} {'votes':>8} {'upstream':>9} {'differ':>7}  (median ms)")
+        for label, (replies, timings, upstream) in runs.items():
+            differ = sum(a != b for a, b in zip(replies, recorded))
+            print(f"  {label:18} " + " ".join(f"{statistics.median(timings[k]) * 1000:8.1f}" for k in timings)
+                  + f" {upstream:9} {differ:7}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import random
+import time
+import tracemalloc
+
+from dedup import DedupIndex, prompt_history
+
+# Compares the old "paste the whole history into the prompt" approach with the
+# bounded DedupIndex over 1,000 generated questions.
+# Tokens are estimated at ~4 characters per token, as for the Llama tokenizer on English.
+
+QUESTIONS = 1000
+CHECKPOINTS = (10, 20, 36, 50, 100, 250, 1000)
+PROMPT = """
+    You are a quiz generator. Create ONE easy multiple-choice question
+    STRICTLY about: General Knowledge.
+    It MUST be factual and relevant to the theme.
+    Do NOT repeat these questions: {history}
+
+    Output exactly in this format:
+    Question: <question>
+    Options:
+    1. <option1>
+    2. <option2>
+    3. <option3>
+    4. <option4>
+    Explanation: <short explanation>
+    """
+
+WORDS = ("which what who when where river city country king battle film actor team year won largest "
+         "first famous capital ocean planet element painted wrote invented founded dynasty empire").split()
+
+
+def fake_question(rng):
+    return "Question: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))).capitalize() + "?"
+
+
+def tokens(text):
+    return len(text) // 4
+
+
+def measure(make_history, add, render):
+    titles = [fake_question(random.Random(n)) for n in range(QUESTIONS)]
+
+    # Timing pass without tracemalloc, which would dominate the numbers
+    history = make_history()
+    start = time.perf_counter()
+    for title in titles:
+        add(history, title)
+    per_question_us = (time.perf_counter() - start) / QUESTIONS * 1e6
+
+    tracemalloc.start()
+    history = make_history()
+    rows = []
+    for n in range(1, QUESTIONS + 1):
+        # Build the title inside the traced region so stored strings are counted
+        add(history, fake_question(random.Random(n - 1)))
+        if n in CHECKPOINTS:
+            current, _ = tracemalloc.get_traced_memory()
+            rows.append((n, tokens(PROMPT.format(history=render(history))), current / 1024))
+    tracemalloc.stop()
+    return rows, per_question_us
+
+
+def main():
+    old, old_us = measure(list, list.append, lambda history: history)
+
+    def add_dedup(index, title):
+        # What the app does: reject near-duplicates, then remember the question
+        if title not in index:
+            index.append(title)
+
+    new, new_us = measure(DedupIndex, add_dedup, prompt_history)
+
+    print(f"{'questions':>10} | {'old prompt tok':>14} {'old mem KiB':>11} | {'new prompt tok':>14} {'new mem KiB':>11}")
+    for (n, old_tok, old_mem), (_, new_tok, new_mem) in zip(old, new):
+        print(f"{n:>10} | {old_tok:>14} {old_mem:>11.1f} | {new_tok:>14} {new_mem:>11.1f}")
+    print(f"\nper-question bookkeeping: old {old_us:.1f} us, new {new_us:.1f} us (includes near-duplicate check)")
+
+
+if __name__ == "__main__":
+    main()
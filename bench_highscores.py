@@ -0,0 +1,91 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from highscores import ScoreStore
+
+# Append and leaderboard cost with a large score history, old CSV rewrite vs ScoreStore.
+# Also the per-player aggregates behind the paginated leaderboard and "your rank", down
+# to the last page, where OFFSET pagination costs the most.
+# Usage: python bench_highscores.py [rows] [players]   (default 10,000,000 games by 1,000,000 players)
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+PLAYERS = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+NAMES = [f"player{i}" for i in range(PLAYERS)]
+THEMES = ["Bollywood", "General Knowledge", "IPL", "History"]
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_csv(folder, rng):
+    import pandas as pd
+
+    path = os.path.join(folder, "highscores.csv")
+    pd.DataFrame({"Name": [rng.choice(NAMES) for _ in range(ROWS)],
+                  "Score": [rng.randint(0, 5) for _ in range(ROWS)]}).to_csv(path, index=False)
+
+    def save():
+        # The previous save_highscore(): read everything, add one row, rewrite everything
+        df = pd.read_csv(path)
+        df = pd.concat([df, pd.DataFrame([{"Name": "bench", "Score": 3}])], ignore_index=True)
+        df.to_csv(path, index=False)
+
+    return timed(save, 3), timed(lambda: pd.read_csv(path), 3)
+
+
+def bench_store(folder, rng):
+    store = ScoreStore(os.path.join(folder, "highscores.db"), legacy_csv=None)
+    start = time.perf_counter()
+    batch = 500_000
+    for offset in range(0, ROWS, batch):
+        store.add_many([(f"g{n}", rng.choice(NAMES), rng.randint(0, 5), float(n), rng.choice(THEMES))
+                        for n in range(offset, min(offset + batch, ROWS))])
+    load_s = time.perf_counter() - start
+
+    counter = iter(range(10 ** 9))
+    append = timed(lambda: store.add(f"new{next(counter)}", "bench", rng.randint(0, 5), "IPL"), 1000)
+    duplicate = timed(lambda: store.add("new0", "bench", 5), 1000)
+    last = store.players() // 10
+    views = {
+        "top(10) games": timed(lambda: store.top(10), 100),
+        "leaderboard() page 1": timed(lambda: store.leaderboard(page=0), 1000),
+        "leaderboard() middle page": timed(lambda: store.leaderboard(page=last // 2), 20),
+        "leaderboard() last page": timed(lambda: store.leaderboard(page=last), 20),
+        "leaderboard() theme page": timed(lambda: store.leaderboard("IPL", page=3), 1000),
+        "leaderboard() theme last": timed(lambda: store.leaderboard("IPL", page=store.players("IPL") // 10), 20),
+        "standing() your rank": timed(lambda: store.standing(rng.choice(NAMES), "History"), 1000),
+        "rebuild_stats()": timed(store.rebuild_stats),
+    }
+    rows = store.count()
+    store.close()
+    return load_s, append, duplicate, views, rows
+
+
+def main():
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as folder:
+        load_s, append, duplicate, views, rows = bench_store(folder, rng)
+        print(f"ScoreStore with {rows:,} rows by {PLAYERS:,} players (bulk load {load_s:.1f} s)")
+        print(f"  add() new game            {append:8.3f} ms")
+        print(f"  add() same game again     {duplicate:8.3f} ms")
+        for label, ms in views.items():
+            print(f"  {label:26}{ms:8.3f} ms")
+        try:
+            save_ms, read_ms = bench_csv(folder, rng)
+        except ImportError:
+            print("pandas not installed, skipping the CSV baseline")
+            return
+        print(f"Old highscores.csv with {ROWS:,} rows")
+        print(f"  save_highscore()          {save_ms:8.1f} ms")
+        print(f"  load_highscores()         {read_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
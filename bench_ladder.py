@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+
+import engine
+import llm_scheduler
+import prompts
+import question_pool
+import simulate
+import verification
+from dedup import DedupIndex
+from llm_gateway import UNMETERED, LLMUnavailable
+from llm_scheduler import Saturated, Scheduler
+from question_pool import QuestionPool
+
+# Hit rate of the difficulty ladder on the shared pool's per-tier buffers. Simulated
+# players (simulate.play, with a mix of skill levels and lifeline habits) play back to
+# back on a few themes of uneven popularity, taking every question from a real
+# QuestionPool. Every call the pool's refills and the players' misses make goes through
+# one real llm_scheduler.Scheduler at the account's limits (LLM_RPM/LLM_TPM, or --rpm and
+# --tpm), refills at background priority as in the app; upstream is a sleep of realistic
+# latency. Time is compressed by --scale so a few seconds of wall time cover a busy
+# quarter of an hour; the buckets refill at the compressed rate.
+# A miss is a question generated while the player waits; a saturated miss is one the
+# scheduler refused, which the app serves from the bank's earlier games.
+#
+# Strategies, each on a fresh pool:
+#   cold        nothing is stocked until a tier is first asked for
+#   first tier  the first tier is stocked when a theme is picked (the app before the ladder)
+#   next tier   the first tier at the pick, then the next question's tier on every question (the app)
+#   ladder      every tier is stocked when a theme is picked (ensure_ladder)
+#   warm        every buffer is full before the first player arrives, outside the rate limits
+#
+#   python bench_ladder.py
+#   python bench_ladder.py --players 80 --workers 4 --duration 20 --rpm 1000 --tpm 300000
+
+STRATEGIES = ("cold", "first tier", "next tier", "ladder", "warm")
+# (share of players, skill, lifeline policy)
+MIX = ((0.3, 0.35, "unsure"), (0.5, 0.6, "unsure"), (0.2, 0.85, "late"))
+THEMES = ("General Knowledge", "Bollywood", "IPL", "History", "Chhatrapati Shivaji Maharaj")
+# Simulated seconds
+THINK = (5.0, 20.0)  # reading and answering a question
+BREAK = (5.0, 30.0)  # between two games of the same player
+BATCH_LATENCY = 2.5  # one batch call
+SINGLE_LATENCY = 1.5  # one question generated in the request
+VOTE_LATENCY = 1.0  # a parallel round of answer-key votes
+
+
+def q_data(item):
+    lines = [f"Question: {item['question']}", "Options:"]
+    lines += [f"{i}. {opt}" for i, opt in enumerate(item["options"], start=1)]
+    return "\n".join(lines)
+
+
+def scheduler(args, rpm, tpm):
+    # Bucket capacity stays one (simulated) minute of budget; only the refill is sped up
+    result = Scheduler(rpm=rpm, tpm=tpm, max_queue_wait=llm_scheduler.MAX_QUEUE_WAIT * args.scale,
+                       background_max_wait=llm_scheduler.BACKGROUND_MAX_WAIT * args.scale)
+    for bucket in (result.requests, result.tokens):
+        bucket.rate /= args.scale
+    return result
+
+
+class Run:
+    def __init__(self, strategy, args):
+        self.strategy = strategy
+        self.args = args
+        self.titles = itertools.count()
+        self.scheduler = scheduler(args, args.rpm, args.tpm)
+        self.pool = QuestionPool(produce=self.produce, target=args.target, low_water=args.low_water,
+                                 workers=args.workers, client=object(),
+                                 initial=args.target if strategy == "warm" else args.initial)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.lock = threading.Lock()
+        self.asked = Counter()  # tier -> questions
+        self.hits = Counter()  # tier -> questions served from the pool
+        self.moves = Counter()  # "asked"/"hits" for the first question after a tier change
+        self.saturated = 0  # misses the scheduler refused
+        self.games = 0
+        self.waited = 0.0  # simulated seconds players spent on cold generations
+
+    def sleep(self, seconds):
+        time.sleep(seconds * self.args.scale)
+
+    def call(self, requests, latency, background):
+        # One parallel round of upstream calls through the scheduler; raises Saturated
+        async def upstream(**kwargs):
+            await asyncio.sleep(latency * self.args.scale)
+
+        async def round_trip():
+            await asyncio.gather(*(self.scheduler.run(upstream, kwargs, coalesce=False, background=background)
+                                   for kwargs in requests))
+
+        asyncio.run_coroutine_threadsafe(round_trip(), self.loop).result()
+
+    def produce(self, client, theme, difficulty, count, exclude):
+        # What question_pool.produce_verified calls: one batch, then a round of votes
+        items = [{"question": f"{theme} {difficulty} #{next(self.titles)}?", "options": ["a", "b", "c", "d"],
+                  "correct": 1, "explanation": "Synthetic."} for _ in range(count)]
+        try:
+            self.call([prompts.batch_request(theme, count, exclude, difficulty)], BATCH_LATENCY, True)
+            self.call([vote for item in items for vote in verification.answer_requests(q_data(item))],
+                      VOTE_LATENCY, True)
+        except Saturated as error:
+            raise LLMUnavailable(str(error)) from None
+        return items
+
+    def generate(self, theme, tier, history):
+        # A miss: one question and its votes, at the player's priority
+        item = {"question": f"Generated #{next(self.titles)}?", "options": ["a", "b", "c", "d"], "correct": 1}
+        try:
+            self.call([prompts.question_request(theme, history, tier)], SINGLE_LATENCY, False)
+            self.call(verification.answer_requests(q_data(item)), VOTE_LATENCY, False)
+        except Saturated:
+            with self.lock:
+                self.saturated += 1
+        return item
+
+    def player(self, seed, deadline):
+        rng = random.Random(seed)
+        weights = [1 / (rank + 1) for rank in range(len(THEMES))]  # Zipf-like popularity
+        _, skill, policy = rng.choices(MIX, weights=[share for share, *_ in MIX])[0]
+        self.sleep(rng.uniform(*BREAK))  # players don't all arrive at once
+        while time.monotonic() < deadline:
+            theme = rng.choices(THEMES, weights=weights)[0]
+            if self.strategy in ("first tier", "next tier"):
+                self.pool.ensure(theme, engine.TIERS[0])
+            elif self.strategy in ("ladder", "warm"):
+                self.pool.ensure_ladder(theme)
+            seen = DedupIndex()
+            history = []
+            previous = [None]
+
+            def draw(state, rng):
+                self.sleep(rng.uniform(*THINK))  # the previous question (or reading the rules)
+                tier = engine.tier(state)
+                item = self.pool.take(theme, tier, seen)
+                hit = item is not None
+                if not hit:
+                    start = time.monotonic()
+                    item = self.generate(theme, tier, history)
+                    waited = (time.monotonic() - start) / self.args.scale
+                with self.lock:
+                    self.asked[tier] += 1
+                    self.hits[tier] += hit
+                    self.waited += 0 if hit else waited
+                    if previous[0] not in (None, tier):
+                        self.moves["asked"] += 1
+                        self.moves["hits"] += hit
+                previous[0] = tier
+                seen.append(item["question"])
+                history.append(item["question"])
+                question = engine.Question.from_item(item)
+                if self.strategy == "next tier" and state.q_count + 1 < state.length:
+                    self.pool.ensure(theme, engine.next_tier(engine.present(state, question)))
+                return question
+
+            simulate.play(draw, rng, skill, policy, engine.GAME_LENGTH, False, theme)
+            with self.lock:
+                self.games += 1
+            self.sleep(rng.uniform(*BREAK))
+
+    def run(self):
+        if self.strategy == "warm":
+            metered, self.scheduler = self.scheduler, scheduler(self.args, UNMETERED, UNMETERED)
+            for theme in THEMES:
+                self.pool.ensure_ladder(theme)
+            while any(row["depth"] < self.args.target for row in self.pool.stats()):
+                time.sleep(0.01)
+            self.scheduler = metered
+        deadline = time.monotonic() + self.args.duration
+        threads = [threading.Thread(target=self.player, args=(self.args.seed * 10_000 + n, deadline), daemon=True)
+                   for n in range(self.args.players)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self
+
+
+def rate(hits, asked):
+    return f"{hits / asked:7.1%}" if asked else "      -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Difficulty ladder hit rate on the per-tier pool buffers")
+    parser.add_argument("--players", type=int, default=40, help="concurrent players")
+    parser.add_argument("--duration", type=float, default=10.0, help="wall seconds per strategy")
+    parser.add_argument("--scale", type=float, default=0.01, help="wall seconds per simulated second")
+    parser.add_argument("--target", type=int, default=question_pool.TARGET, help="POOL_TARGET")
+    parser.add_argument("--low-water", type=int, default=question_pool.LOW_WATER, help="POOL_LOW_WATER")
+    parser.add_argument("--initial", type=int, default=question_pool.INITIAL, help="POOL_INITIAL")
+    parser.add_argument("--workers", type=int, default=2, help="POOL_WORKERS")
+    parser.add_argument("--rpm", type=int, default=llm_scheduler.REQUESTS_PER_MINUTE, help="LLM_RPM")
+    parser.add_argument("--tpm", type=int, default=llm_scheduler.TOKENS_PER_MINUTE, help="LLM_TPM")
+    parser.add_argument("--strategy", choices=STRATEGIES, action="append", help="repeatable; default all")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # The scheduler polls for spare budget in wall time
+    llm_scheduler.BACKGROUND_POLL *= args.scale
+
+    minutes = args.duration / args.scale / 60
+    print(f"{args.players} players, {len(THEMES)} themes, {minutes:.0f} simulated minutes per strategy, "
+          f"pool target {args.target}/initial {args.initial}/low water {args.low_water}, "
+          f"{args.workers} refill workers, {args.rpm} RPM/{args.tpm} TPM")
+    print(f"{'strategy':11} {'games':>6} {'hit rate':>8} " + " ".join(f"{tier:>7}" for tier in engine.TIERS)
+          + f" {'tier move':>9} {'wait/game':>9} {'saturated':>9} {'calls/game':>10}")
+    for strategy in args.strategy or STRATEGIES:
+        run = Run(strategy, args).run()
+        asked, hits = sum(run.asked.values()), sum(run.hits.values())
+        games = max(run.games, 1)
+        print(f"{strategy:11} {run.games:6} {rate(hits, asked):>8} "
+              + " ".join(rate(run.hits[tier], run.asked[tier]) for tier in engine.TIERS)
+              + f" {rate(run.moves['hits'], run.moves['asked']):>9} {run.waited / games:8.2f}s"
+              + f" {rate(run.saturated, asked - hits):>9} {run.scheduler.stats['upstream_calls'] / games:10.1f}")
+    print("hit rate: questions served from a warm buffer; tier move: the first question after the tier changed;")
+    print("saturated: misses the scheduler refused; calls/game: upstream calls at the account's limits")
+
+
+if __name__ == "__main__":
+    main()
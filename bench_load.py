@@ -0,0 +1,217 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fake_groq_server import start_server
+
+# Load test: N simulated players each play a full 5-question game of MillionareApp.py,
+# headless through Streamlit's AppTest, against the local fake Groq server.
+# AppTest drives a process-wide Streamlit runtime, so every player gets its own process;
+# they share the fake server and the on-disk question bank and high scores.
+#
+#   python bench_load.py --players 8 --latency 0.2 --token-delay 0.005 --error-rate 0.05 \
+#       --malformed-rate 0.1 --out bench_results.json
+#
+# Results are written as JSON; if --out already holds a previous run, medians that got
+# more than 20% slower are printed as regressions.
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MillionareApp.py")
+REGRESSION = 1.20
+
+
+def percentiles(values):
+    if not values:
+        return {"p50 ms": 0.0, "p95 ms": 0.0, "max ms": 0.0}
+    ordered = sorted(values)
+    return {
+        "p50 ms": round(statistics.median(ordered) * 1000, 1),
+        "p95 ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 1),
+        "max ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def timed_run(element, reruns):
+    start = time.perf_counter()
+    at = element.run()
+    reruns.append(time.perf_counter() - start)
+    return at
+
+
+def play(player, timeout):
+    # One player, one game; returns the timings for this session
+    from streamlit.testing.v1 import AppTest
+
+    reruns = []
+    rng = random.Random(player)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    timed_run(at, reruns)
+    first_question = None
+    answered = 0
+    if not at.exception:
+        at.text_input[0].input(f"player{player}")
+        at = timed_run(at.button[0].click(), reruns)
+    if not at.exception:
+        # Start Quiz -> first question on screen (includes the st.rerun it triggers)
+        at = timed_run(at.button[0].click(), reruns)
+        first_question = reruns[-1]
+    while not at.exception and not at.success:
+        submit = [b for b in at.button if b.label == "Submit"]
+        if not submit or answered >= 5:
+            break
+        at.radio[0].set_value(rng.choice(at.radio[0].options))
+        at = timed_run(submit[0].click(), reruns)
+        answered += 1
+    finished = any("Quiz Completed" in s.value for s in at.success)
+    error = None
+    if at.exception:
+        error = at.exception[0].message
+    elif not finished:
+        error = "; ".join(e.value for e in at.error) or "game did not finish"
+    return {"first_question": first_question, "reruns": reruns, "answered": answered,
+            "finished": finished, "error": error}, at
+
+
+def play_alone(player, timeout):
+    # Entry point in a worker process: the game plus that process's operation metrics
+    import metrics
+
+    game, _ = play(player, timeout)
+    game["ops"] = metrics.summary()
+    return game
+
+
+def session_memory(samples, timeout):
+    # Traced separately so tracemalloc overhead doesn't skew the latency numbers.
+    # Sessions are kept alive, so the delta is what N open browser tabs cost the server.
+    # One untraced game first so module imports and caches aren't billed to a session.
+    play(999_999, timeout)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    alive = [play(1_000_000 + i, timeout)[1] for i in range(samples)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del alive
+    return (after - before) / samples
+
+
+def merge_ops(per_player):
+    # Quantiles can't be combined exactly; p50 is the median of per-player medians and
+    # p95/p99 the worst player's, which is the number that matters for a regression.
+    rows = {}
+    for ops in per_player:
+        for row in ops:
+            rows.setdefault(row["op"], []).append(row)
+    merged = []
+    for op, group in sorted(rows.items()):
+        row = {key: sum(r[key] for r in group) for key in group[0] if key not in ("op", "p50 ms", "p95 ms", "p99 ms")}
+        row["p50 ms"] = statistics.median(r["p50 ms"] for r in group)
+        row["p95 ms"] = max(r["p95 ms"] for r in group)
+        row["p99 ms"] = max(r["p99 ms"] for r in group)
+        merged.append({"op": op, **row})
+    return merged
+
+
+def compare(previous, current):
+    regressions = []
+    for metric in ("time_to_first_question", "rerun_latency"):
+        old = previous.get(metric, {}).get("p50 ms")
+        new = current[metric]["p50 ms"]
+        if old and new > old * REGRESSION:
+            regressions.append(f"{metric} p50 {old} ms -> {new} ms")
+    old = previous.get("requests_per_game")
+    if old and current["requests_per_game"] > old * REGRESSION:
+        regressions.append(f"requests_per_game {old} -> {current['requests_per_game']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-player load test for MillionareApp.py")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server seconds before each response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake server seconds per token")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--wrong-key-rate", type=float, default=0.0, help="fake answerers that pick a wrong option")
+    parser.add_argument("--mode", choices=("batch", "single"), default="batch", help="GENERATION_MODE")
+    parser.add_argument("--stream", choices=("0", "1"), default="1", help="STREAM_QUESTIONS")
+    parser.add_argument("--memory-samples", type=int, default=3, help="sessions traced for memory (0 to skip)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    server, fake, url = start_server(latency=args.latency, token_delay=args.token_delay,
+                                     error_rate=args.error_rate, malformed_rate=args.malformed_rate,
+                                     wrong_key_rate=args.wrong_key_rate, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="quiz-load-")
+    # Must be set before the app's modules are first imported by AppTest
+    os.environ.update({
+        "GROQ_API_KEY": "fake",
+        "GROQ_BASE_URL": url,
+        "GENERATION_MODE": args.mode,
+        "STREAM_QUESTIONS": args.stream,
+        "QUESTION_BANK_PATH": os.path.join(workdir, "question_bank.db"),
+        "HIGHSCORES_PATH": os.path.join(workdir, "highscores.db"),
+        "METRICS_PATH": os.path.join(workdir, "metrics.prom"),
+        # Measure the app, not our own account limits
+        "LLM_RPM": os.getenv("LLM_RPM", "100000"),
+        "LLM_TPM": os.getenv("LLM_TPM", "100000000"),
+    })
+    os.chdir(workdir)  # the app still looks for highscores.csv next to it
+
+    start = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.players) as pool:
+        games = pool.starmap(play_alone, [(p, args.timeout) for p in range(args.players)])
+    wall = time.perf_counter() - start
+    requests = fake.stats["requests"]
+    memory = session_memory(args.memory_samples, args.timeout) if args.memory_samples else None
+    server.shutdown()
+
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "python": sys.version.split()[0],
+        "games": len(games),
+        "finished": sum(g["finished"] for g in games),
+        "errors": sorted({g["error"] for g in games if g["error"]}),
+        "wall_seconds": round(wall, 2),
+        "time_to_first_question": percentiles([g["first_question"] for g in games if g["first_question"]]),
+        "rerun_latency": percentiles([r for g in games for r in g["reruns"]]),
+        "requests_per_game": round(requests / len(games), 2),
+        "server": fake.stats,
+        "memory_per_session_kib": round(memory / 1024, 1) if memory is not None else None,
+        "ops": merge_ops(g["ops"] for g in games),
+    }
+
+    out = os.path.join(os.path.dirname(os.path.abspath(__file__)), args.out) if not os.path.isabs(args.out) else args.out
+    previous = {}
+    if os.path.exists(out):
+        with open(out) as f:
+            previous = json.load(f)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{result['finished']}/{result['games']} games finished in {result['wall_seconds']} s")
+    print(f"  time to first question  {result['time_to_first_question']}")
+    print(f"  rerun latency           {result['rerun_latency']}")
+    print(f"  requests per game       {result['requests_per_game']}  (server: {fake.stats})")
+    print(f"  memory per session      {result['memory_per_session_kib']} KiB")
+    for error in result["errors"]:
+        print(f"  error: {error}")
+    for line in compare(previous, result):
+        print(f"  REGRESSION {line}")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import question_pack
+
+# Import, open and sampling cost of a question pack vs loading the same JSONL with pandas.
+# Usage: python bench_pack.py [rows]
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+THEMES = ["General Knowledge", "History", "Science", "Geography", "Sports"]
+
+
+def write_dataset(path, rows):
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(rows):
+            options = [f"Answer {n}.{i}" for i in range(1, 5)]
+            f.write(json.dumps({"question": f"Licensed question number {n}?", "options": options,
+                                "answer": options[n % 4], "category": rng.choice(THEMES),
+                                "difficulty": rng.choice(["easy", "medium", "hard"]),
+                                "explanation": f"It is answer {n % 4 + 1}."}) + "\n")
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="quiz-pack-")
+    source = os.path.join(workdir, "dump.jsonl")
+    pack_path = os.path.join(workdir, "questions.pack")
+    write_dataset(source, ROWS)
+    print(f"{ROWS} rows, {os.path.getsize(source) / 2**20:.0f} MiB of JSONL")
+
+    start = time.perf_counter()
+    counts = question_pack.build([source], pack_path)
+    print(f"  import (single pass):   {time.perf_counter() - start:8.2f} s  {counts}")
+    print(f"  pack size:              {os.path.getsize(pack_path) / 2**20:8.0f} MiB")
+
+    start = time.perf_counter()
+    pack = question_pack.QuestionPack(pack_path)
+    print(f"  open pack:              {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    draws = 100_000
+    start = time.perf_counter()
+    for position in range(draws):
+        pack.sample("History", "Easy", "player-1", position % pack.count("History", "Easy"))
+    print(f"  sample w/o replacement: {(time.perf_counter() - start) / draws * 1e6:8.2f} us/question")
+
+    n = pack.count("History", "Easy")
+    walk = {pack.sample("History", "Easy", "player-2", p)["question"] for p in range(n)}
+    print(f"  full walk of {n} questions: {len(walk)} distinct, next draw -> "
+          f"{pack.sample('History', 'Easy', 'player-2', n)}")
+    pack.close()
+
+    try:
+        import pandas
+    except ImportError:
+        return
+    start = time.perf_counter()
+    pandas.read_json(source, lines=True)
+    print(f"  pandas.read_json:       {time.perf_counter() - start:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import statistics
+import time
+
+import engine
+import llm_scheduler
+import prompts
+import verification
+from fake_groq_server import FakeGroq, start_server
+from llm_gateway import Gateway, Session
+from llm_scheduler import Scheduler
+from question_bank import get_bank
+
+# Tokens and latency per game for each PROMPT_STRATEGY. Every strategy plays the same
+# games on the same question set: each question is generated (one call, or one batch
+# call per game with --batch) with the questions asked so far as history, then checked
+# with VERIFY_VOTES answer-key votes. The calls go through the gateway to the local fake
+# server, which charges time for the prompt (--prompt-delay) and for each token it writes.
+#
+# Columns: prompt and completion tokens per game as the replies report them, what the
+# scheduler reserves against LLM_TPM for a game (what actually throttles us, and what
+# prompts.Budget charges before the replies settle it to their usage), the games
+# a minute that LLM_TPM allows at that reservation, the median latency of a generation
+# and of a round of votes, and how many votes found the right option.
+# The fake server has no prompt cache, so "prefix" only gains what its shorter user
+# message saves here; on Groq the repeated system message is also cheaper to read.
+#
+#   python bench_prompts.py
+#   python bench_prompts.py --games 10 --batch
+#   python bench_prompts.py --bank --theme History --difficulty Medium
+
+THEME = "General Knowledge"
+
+
+def synthetic(theme, count, seed):
+    # Questions the fake server knows the answers to
+    fake = FakeGroq(seed=seed)
+    return [fake.question(theme)[1] for _ in range(count)]
+
+
+def q_data(item):
+    lines = [f"Question: {item['question']}", "Options:"]
+    lines += [f"{i}. {opt}" for i, opt in enumerate(item["options"], start=1)]
+    return "\n".join(lines + [f"Explanation: {item['explanation']}"])
+
+
+def usage(responses):
+    return [(r.usage.prompt_tokens, r.usage.completion_tokens) for r in responses if not isinstance(r, Exception)]
+
+
+def play(session, strategy, items, args):
+    # One game; returns ((prompt, completion) per call, reserved tokens, generation seconds,
+    # vote seconds, right votes)
+    tokens, reserved, generation, voting, right = [], 0, [], [], 0
+    history = []
+    if args.batch:
+        request = prompts.batch_request(args.theme, len(items), history, args.difficulty, strategy=strategy)
+        reserved += llm_scheduler.estimate_tokens(request)
+        start = time.perf_counter()
+        tokens += usage([session.create(**request)])
+        generation.append(time.perf_counter() - start)
+    for item in items:
+        if not args.batch:
+            request = prompts.question_request(args.theme, history, args.difficulty, strategy=strategy)
+            reserved += llm_scheduler.estimate_tokens(request)
+            start = time.perf_counter()
+            tokens += usage([session.create(**request)])
+            generation.append(time.perf_counter() - start)
+        votes = verification.answer_requests(q_data(item))
+        reserved += sum(llm_scheduler.estimate_tokens(vote) for vote in votes)
+        start = time.perf_counter()
+        replies = session.gather(votes)
+        voting.append(time.perf_counter() - start)
+        tokens += usage(replies)
+        right += sum(not isinstance(reply, Exception)
+                     and verification.parse_choice(reply.choices[0].message.content) == item["correct"]
+                     for reply in replies)
+        history.append(item["question"])
+    return tokens, reserved, generation, voting, right
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens and latency per game for each prompt strategy")
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--length", type=int, default=engine.GAME_LENGTH, help="questions per game")
+    parser.add_argument("--theme", default=THEME)
+    parser.add_argument("--difficulty", default="Easy")
+    parser.add_argument("--batch", action="store_true", help="generate each game's questions in one batch call")
+    parser.add_argument("--bank", action="store_true", help="questions from the question bank, not synthetic ones")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server: seconds before each reply")
+    parser.add_argument("--prompt-delay", type=float, default=0.0002, help="fake server: seconds per prompt token")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="fake server: seconds per written token")
+    parser.add_argument("--strategy", choices=prompts.STRATEGIES, action="append", help="repeatable; default all")
+    args = parser.parse_args()
+
+    needed = args.games * args.length
+    if args.bank:
+        items = get_bank().questions(args.theme, args.difficulty)[:needed]
+        if len(items) < needed:
+            parser.error(f"the bank has {len(items)} {args.difficulty} {args.theme} questions, {needed} needed")
+    else:
+        items = synthetic(args.theme, needed, seed=0)
+    games = [items[n:n + args.length] for n in range(0, needed, args.length)]
+
+    server, _, url = start_server(latency=args.latency, prompt_delay=args.prompt_delay, token_delay=args.token_delay)
+    session = Session(Gateway(api_key="fake", base_url=url, scheduler=Scheduler(rpm=10_000, tpm=10_000_000)))
+    calls = ("1 batch" if args.batch else f"{args.length} generations") + f" + {args.length * verification.VOTES} votes"
+    print(f"{args.games} games of {args.length} {args.difficulty} {args.theme} questions ({calls} each), "
+          f"LLM_TPM {llm_scheduler.TOKENS_PER_MINUTE}")
+    print(f"{'strategy':9} {'prompt':>7} {'reply':>6} {'reserved':>9} {'games/min':>9} {'generate':>9} "
+          f"{'votes':>7} {'key ok':>7}  (tokens per game, median ms)")
+    for strategy in args.strategy or prompts.STRATEGIES:
+        # The votes are written by verification.answer_requests, which reads the default
+        prompts.STRATEGY = strategy
+        prompt = reply = reserved = right = 0
+        generation, voting = [], []
+        for game in games:
+            tokens, game_reserved, game_generation, game_voting, game_right = play(session, strategy, game, args)
+            prompt += sum(p for p, _ in tokens)
+            reply += sum(c for _, c in tokens)
+            reserved += game_reserved
+            generation += game_generation
+            voting += game_voting
+            right += game_right
+        print(f"{strategy:9} {prompt / args.games:7.0f} {reply / args.games:6.0f} {reserved / args.games:9.0f} "
+              f"{llm_scheduler.TOKENS_PER_MINUTE / (reserved / args.games):9.1f} "
+              f"{statistics.median(generation) * 1000:9.1f} {statistics.median(voting) * 1000:7.1f} "
+              f"{'-' if args.bank else f'{right / (needed * verification.VOTES):.0%}':>7}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_groq_server import start_server
+from llm_gateway import Gateway, GatewayError, Session
+from llm_scheduler import Scheduler
+
+# Drives the gateway against the local fake server while it answers with 429s.
+# Phase 1: 30% random 429s -> retries with backoff. Even players share four
+# theme prompts (coalesced), odd players send unique prompts.
+# Phase 2: every request 429 -> the circuit opens and callers fail fast.
+# Usage: python bench_scheduler.py [players]
+
+PLAYERS = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+THEMES = ["Bollywood", "General Knowledge", "IPL", "History"]
+
+
+def request(i):
+    theme = THEMES[i % len(THEMES)]
+    extra = f" Do NOT repeat question {i}." if i % 2 else ""
+    return {"messages": [{"role": "user", "content": f"Create ONE easy question STRICTLY about: {theme}.{extra}"}],
+            "model": "llama-3.1-8b-instant", "temperature": 0.7}
+
+
+def run_phase(gateway, label):
+    def player(i):
+        start = time.perf_counter()
+        try:
+            Session(gateway).create(**request(i))
+            ok = True
+        except GatewayError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PLAYERS) as pool:
+        results = list(pool.map(player, range(PLAYERS)))
+    wall = time.perf_counter() - start
+    ok = sum(r[0] for r in results)
+    worst = max(r[1] for r in results)
+    print(f"{label}: {ok}/{PLAYERS} served in {wall:.2f}s (slowest caller {worst:.2f}s)")
+
+
+def main():
+    server, fake, url = start_server(rate_limit=0.3, retry_after=0.2, seed=3)
+    scheduler = Scheduler(rpm=600, tpm=200_000, max_retries=4, failure_threshold=5, cooldown=5)
+    gateway = Gateway(api_key="fake", scheduler=scheduler, base_url=url)
+
+    run_phase(gateway, "phase 1, 30% 429s")
+    print(f"  scheduler {scheduler.stats}")
+    print(f"  server    {fake.stats}")
+
+    fake.rate_limit = 1.0
+    for stat in scheduler.stats:
+        scheduler.stats[stat] = 0
+    fake.stats.update(requests=0, **{"429": 0, "200": 0})
+    run_phase(gateway, "phase 2, 100% 429s")
+    print(f"  scheduler {scheduler.stats}")
+    print(f"  server    {fake.stats}")
+    print(f"  circuit open: {scheduler.circuit_open}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
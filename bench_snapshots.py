@@ -0,0 +1,62 @@
+import random
+import sys
+import tempfile
+import time
+
+import engine
+import snapshots
+
+# Cost of snapshotting a game: the per-rerun check, encoding/decoding a mid-game state
+# and a save/load round trip through each store.
+# Usage: python bench_snapshots.py [history titles]   (default 10; a game resets its
+# history, 200 is the DedupIndex cap)
+
+HISTORY = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def mid_game(rng):
+    state = engine.new_game("Chhatrapati Shivaji Maharaj")
+    for n in range(3):
+        question = engine.Question(f"Which fort did Shivaji Maharaj capture in {1640 + n}?",
+                                   [f"Fort number {n}-{i} of the Sahyadri range" for i in range(4)],
+                                   rng.randint(1, 4), "Capturing it secured the Konkan coast. More detail.")
+        state = engine.answer(engine.present(state, question, rng), question.correct)
+    question = engine.Question("Which was the last fort?", ["Raigad", "Torna", "Sinhagad", "Pratapgad"], 1)
+    return engine.fifty_fifty(engine.present(state, question, rng), rng)
+
+
+def main():
+    rng = random.Random(1)
+    game = mid_game(rng)
+    history = [f"Generated question number {i} about the Maratha empire and its forts?" for i in range(HISTORY)]
+    extra = {"bank_id": 1234, "source": "pool"}
+    blob = snapshots.dumps("player", game, "f" * 32, history, extra)
+    assert snapshots.loads(blob)[1].visible == game.visible
+
+    saved = ("player", game)
+    print(f"Snapshot of a mid-game state with {HISTORY} history titles: {len(blob)} bytes")
+    check = timed(lambda: saved[1] is game, 1_000_000)
+    encode = timed(lambda: snapshots.dumps("player", game, "f" * 32, history, extra), 20_000)
+    decode = timed(lambda: snapshots.loads(blob), 20_000)
+    print(f"  rerun without a transition   {check:8.2f} us")
+    print(f"  dumps()                      {encode:8.2f} us")
+    print(f"  loads()                      {decode:8.2f} us")
+    with tempfile.TemporaryDirectory() as folder:
+        for name, store in (("sqlite", snapshots.SqliteSnapshots(f"{folder}/snapshots.db")),
+                            ("file", snapshots.FileSnapshots(f"{folder}/snapshots"))):
+            tokens = [f"{i:032x}" for i in range(1000)]
+            save = timed(lambda: store.save(rng.choice(tokens), blob), 2000)
+            load = timed(lambda: store.load(rng.choice(tokens)), 2000)
+            print(f"  {name + ' save()':28} {save:8.2f} us")
+            print(f"  {name + ' load()':28} {load:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Cold start and rerun cost of the Streamlit apps and the CLI. Each run is a fresh
+# interpreter under -X importtime, so the numbers include every import. The name
+# screen needs neither groq nor pandas; importing them there is reported as a regression.
+#
+#   python bench_startup.py                # 5 cold starts per front-end
+#   python bench_startup.py --runs 10 --reruns 50
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APPS = ("MillionareApp.py", "app.py")
+# Only needed once a question has to be generated or a table rendered
+HEAVY = ("groq", "httpx", "pandas", "pyarrow", "numpy")
+REGRESSION = 1.2  # flag anything more than 20% slower than the previous run
+
+
+def child(app, reruns):
+    # Runs inside the measured interpreter: first script run, then warm reruns
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=60).run()
+    first = time.perf_counter() - start
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    print(json.dumps({"first_run_ms": first * 1000, "rerun_ms": statistics.median(times) * 1000,
+                      "error": str(at.exception[0].value) if at.exception else None}))
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package", nested imports indented by
+    # two spaces. Returns ({top-level module: cumulative ms}, every module name imported).
+    top, names = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        names.add(name.strip())
+        if len(name) - len(name.lstrip()) == 1:
+            top[name.strip()] = int(cumulative) / 1000
+    return top, names
+
+
+def environment(workdir):
+    return dict(os.environ, GROQ_API_KEY="fake", PYTHONPATH=ROOT,
+                QUESTION_BANK_PATH=os.path.join(workdir, "question_bank.db"),
+                HIGHSCORES_PATH=os.path.join(workdir, "highscores.db"),
+                METRICS_PATH=os.path.join(workdir, "metrics.prom"),
+                QUESTION_PACK_PATH=os.path.join(workdir, "questions.pack"),
+                GAME_EVENTS_DIR=os.path.join(workdir, "game_events"))
+
+
+def measure_app(app, reruns):
+    workdir = tempfile.mkdtemp(prefix="quiz-startup-")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", app,
+                           "--reruns", str(reruns)], capture_output=True, text=True, cwd=workdir,
+                          env=environment(workdir), timeout=300)
+    wall = time.perf_counter() - start
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports, names = parse_importtime(proc.stderr)
+    result.update(process_ms=wall * 1000, imports_ms=sum(imports.values()),
+                  heavy=sorted(name for name in HEAVY if name in names))
+    result["slowest_imports"] = sorted(imports.items(), key=lambda item: -item[1])[:5]
+    return result
+
+
+def measure_cli():
+    # Until the theme prompt: empty stdin ends the CLI right there
+    workdir = tempfile.mkdtemp(prefix="quiz-startup-")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py")], input="",
+                          capture_output=True, text=True, cwd=workdir, env=environment(workdir), timeout=120)
+    imports, names = parse_importtime(proc.stderr)
+    return {"process_ms": (time.perf_counter() - start) * 1000, "imports_ms": sum(imports.values()),
+            "heavy": sorted(name for name in HEAVY if name in names),
+            "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None}
+
+
+def summarize(runs):
+    # Medians over the cold starts; heavy imports and errors from any run
+    summary = {key: round(statistics.median(run[key] for run in runs), 1)
+               for key in runs[0] if key.endswith("_ms")}
+    summary["heavy_imports"] = sorted({name for run in runs for name in run["heavy"]})
+    summary["errors"] = sorted({run["error"] for run in runs if run.get("error")})
+    if "slowest_imports" in runs[-1]:
+        summary["slowest_imports"] = [[name, round(ms, 1)] for name, ms in runs[-1]["slowest_imports"]]
+    return summary
+
+
+def compare(previous, current):
+    regressions = []
+    for target, result in current.items():
+        for metric, value in result.items():
+            old = previous.get(target, {}).get(metric)
+            if metric.endswith("_ms") and old and value > old * REGRESSION:
+                regressions.append(f"{target} {metric} {old} ms -> {value} ms")
+        if result["heavy_imports"]:
+            regressions.append(f"{target} imports {', '.join(result['heavy_imports'])} before the first question")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and rerun benchmark for the quiz front-ends")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per front-end")
+    parser.add_argument("--reruns", type=int, default=20, help="warm reruns timed after each cold start")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", default="bench_startup.json")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.reruns)
+        return
+
+    result = {app: summarize([measure_app(app, args.reruns) for _ in range(args.runs)]) for app in APPS}
+    result["main.py"] = summarize([measure_cli() for _ in range(args.runs)])
+
+    out = os.path.join(ROOT, args.out) if not os.path.isabs(args.out) else args.out
+    previous = {}
+    if os.path.exists(out):
+        with open(out) as f:
+            previous = json.load(f)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for target, summary in result.items():
+        print(target)
+        for key, value in summary.items():
+            print(f"  {key:18} {value}")
+    for line in compare(previous, result):
+        print(f"REGRESSION {line}")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
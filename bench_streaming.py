@@ -0,0 +1,74 @@
+import statistics
+import sys
+import time
+
+import output_parser
+import prompts
+import verification
+from batch_generation import format_question
+from fake_groq_server import start_server
+from llm_gateway import Gateway, Session
+from llm_scheduler import Scheduler
+from stream_parser import QuestionStreamParser
+
+# Perceived latency of one question: blocking completion vs stream=True with the
+# incremental parser, each followed by the answer-key vote the app waits for before it
+# shows the answer radio (the streamed question stays on screen meanwhile). Uses the
+# local fake server at a fixed per-token delay.
+# Usage: python bench_streaming.py [seconds_per_token] [runs]
+
+TOKEN_DELAY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.01
+RUNS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+REQUEST = prompts.question_request("History", [], "Easy")
+
+
+def answer_key(session, content):
+    # What verification.verify() does, without recording the agreement in the bank
+    q_data = format_question(output_parser.parse(content, session, "History", source="stream"))
+    replies = session.gather(verification.answer_requests(q_data))
+    return verification.tally(verification.parse_choice(r.choices[0].message.content) for r in replies)[0]
+
+
+def blocking(session):
+    start = time.perf_counter()
+    content = session.create(**REQUEST).choices[0].message.content
+    shown = time.perf_counter() - start
+    answer_key(session, content)
+    return {"full question shown": shown, "answer radio shown": time.perf_counter() - start}
+
+
+def streaming(session):
+    parser = QuestionStreamParser()
+    marks = {}
+    start = time.perf_counter()
+    for delta in session.stream(**REQUEST):
+        parser.feed(delta)
+        now = time.perf_counter() - start
+        if parser.question:
+            marks.setdefault("first visible token", now)
+        if parser.question_done:
+            marks.setdefault("question complete", now)
+        if parser.options_done:
+            marks.setdefault("4 options parsed", now)
+    content = parser.close()
+    marks["stream finished"] = time.perf_counter() - start
+    answer_key(session, content)
+    marks["answer radio shown"] = time.perf_counter() - start
+    return marks
+
+
+def main():
+    server, _, url = start_server(token_delay=TOKEN_DELAY)
+    # Generous local budget so the account rate limit doesn't skew the comparison
+    session = Session(Gateway(api_key="fake", base_url=url, scheduler=Scheduler(rpm=10_000, tpm=10_000_000)))
+    full = [blocking(session) for _ in range(RUNS)]
+    streamed = [streaming(session) for _ in range(RUNS)]
+    print(f"{RUNS} runs, {TOKEN_DELAY * 1000:.0f} ms per token, {verification.VOTES} answer-key votes (median)")
+    for label, runs in (("blocking", full), ("streaming", streamed)):
+        for mark in runs[0]:
+            print(f"  {label + ':':10} {mark:27} {statistics.median(r[mark] for r in runs) * 1000:7.0f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
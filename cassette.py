@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+import config
+import metrics
+
+# Record/replay of LLM calls at the HTTP transport under the gateway, so a bad question
+# or a crash can be reproduced without calling Groq again, and regression runs,
+# development and benchmarks spend no quota. A request is keyed by a hash of its
+# normalized body (model, messages with whitespace collapsed, sampling settings; not
+# the host or headers), and each key is one gzipped file holding every response
+# recorded for it. Replay serves a key's responses in recorded order, then starts over.
+#
+#   LLM_CASSETTE=record   call Groq and save every successful response
+#   LLM_CASSETTE=replay   serve saved responses only: no network, no API key needed;
+#                         a request that was never recorded fails like Groq being down
+#   LLM_CASSETTE=auto     replay what is saved, call Groq (and record) for the rest
+#
+#   python cassette.py stats
+#   python cassette.py show <key prefix>    # the request and its saved replies
+#   python cassette.py find <text>          # keys whose request or replies contain text
+
+MODES = ("record", "replay", "auto")
+CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", "cassettes")
+# Delay before a replayed reply: seconds, or "recorded" for the latency measured when
+# it was recorded. Streamed replies are spread over it event by event.
+REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "0")
+
+
+def normalize(method, path, body):
+    # The parts of a request that decide the reply, in a canonical form
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        data = body.decode("utf-8", "replace")
+    if isinstance(data, dict) and isinstance(data.get("messages"), list):
+        data["messages"] = [dict(m, content=" ".join(m["content"].split()))
+                            if isinstance(m, dict) and isinstance(m.get("content"), str) else m
+                            for m in data["messages"]]
+    return {"method": method, "path": path, "body": data}
+
+
+def request_key(request):
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _events(body, streamed):
+    # Server-sent events are replayed one by one, anything else in one piece
+    if not streamed:
+        return [body]
+    return [event + b"\n\n" for event in body.split(b"\n\n") if event.strip()]
+
+
+class _Replay(httpx.AsyncByteStream):
+    def __init__(self, body, delay, streamed):
+        self._parts = _events(body, streamed)
+        self._delay = delay / max(len(self._parts), 1)
+
+    async def __aiter__(self):
+        for part in self._parts:
+            if self._delay:
+                await asyncio.sleep(self._delay)
+            yield part
+
+
+class _Recording(httpx.AsyncByteStream):
+    # Passes the upstream body through as it arrives and saves it once it is complete;
+    # a reply abandoned half way (a cancelled stream) is not saved
+    def __init__(self, inner, done):
+        self._inner = inner
+        self._done = done
+
+    async def __aiter__(self):
+        chunks = []
+        async for chunk in self._inner:
+            chunks.append(chunk)
+            yield chunk
+        self._done(b"".join(chunks))
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner, cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    async def handle_async_request(self, request):
+        saved_request = normalize(request.method, request.url.path, await request.aread())
+        key = request_key(saved_request)
+        if self.cassette.mode != "record":
+            saved = self.cassette.next_reply(key)
+            if saved is not None:
+                streamed = saved["type"].startswith("text/event-stream")
+                return httpx.Response(saved["status"], headers={"content-type": saved["type"]},
+                                      stream=_Replay(saved["body"].encode(), self.cassette.delay(saved), streamed))
+            if self.cassette.mode == "replay":
+                self.cassette.count("missed")
+                return httpx.Response(404, json={"error": {"message": f"request {key} is not in the cassette",
+                                                           "type": "cassette_miss"}})
+        # Stored as sent, not as compressed on the wire; the files are gzipped anyway
+        request.headers["Accept-Encoding"] = "identity"
+        start = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+
+        def done(body):
+            self.cassette.save(key, saved_request, {
+                "status": 200, "type": response.headers.get("content-type", "application/json"),
+                "body": body.decode("utf-8", "replace"), "latency": round(time.monotonic() - start, 3)})
+
+        return httpx.Response(200, headers=response.headers, stream=_Recording(response.stream, done),
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class Cassette:
+    def __init__(self, mode, directory=CASSETTE_DIR, latency=REPLAY_LATENCY):
+        if mode not in MODES:
+            raise ValueError(f"LLM_CASSETTE must be one of {', '.join(MODES)}, not {mode!r}")
+        self.mode = mode
+        self.directory = directory
+        self.latency = latency
+        self.stats = {"replayed": 0, "recorded": 0, "missed": 0}
+        self._entries = {}  # key -> {"request", "replies"}, or None when nothing is saved
+        self._served = Counter()  # key -> replies replayed in this process
+        self._lock = threading.Lock()
+
+    @property
+    def offline(self):
+        return self.mode == "replay"
+
+    def transport(self, inner):
+        return CassetteTransport(inner, self)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def _entry(self, key):
+        # Caller holds the lock; files are read once per process
+        if key not in self._entries:
+            try:
+                with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                    self._entries[key] = json.load(f)
+            except (OSError, ValueError):
+                self._entries[key] = None
+        return self._entries[key]
+
+    def count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+        metrics.count("llm_cassette_total", outcome=outcome)
+
+    def next_reply(self, key):
+        with self._lock:
+            entry = self._entry(key)
+            if not entry:
+                return None
+            replies = entry["replies"]
+            reply = replies[self._served[key] % len(replies)]
+            self._served[key] += 1
+        self.count("replayed")
+        return reply
+
+    def delay(self, reply):
+        return reply["latency"] if self.latency == "recorded" else float(self.latency)
+
+    def save(self, key, request, reply):
+        path = self._path(key)
+        with self._lock:
+            entry = self._entry(key) or {"request": request, "replies": []}
+            entry["replies"].append(reply)
+            self._entries[key] = entry
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp, path)
+        self.count("recorded")
+
+    def keys(self):
+        for folder in sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else ():
+            for name in sorted(os.listdir(os.path.join(self.directory, folder))):
+                if name.endswith(".json.gz"):
+                    yield name[:-len(".json.gz")]
+
+    def load(self, key):
+        with self._lock:
+            return self._entry(key)
+
+
+def from_env():
+    # The cassette LLM_CASSETTE asks for, or None
+    return Cassette(config.LLM_CASSETTE) if config.LLM_CASSETTE else None
+
+
+def _content(reply):
+    # Reply text for display: the message of a completion, or the joined deltas of a stream
+    body = reply["body"]
+    if not reply["type"].startswith("text/event-stream"):
+        try:
+            return json.loads(body)["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return body
+    deltas = []
+    for line in body.splitlines():
+        if line.startswith("data: ") and line != "data: [DONE]":
+            try:
+                deltas.append(json.loads(line[6:])["choices"][0]["delta"].get("content") or "")
+            except (ValueError, KeyError, IndexError, TypeError):
+                pass
+    return "".join(deltas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect recorded LLM calls")
+    parser.add_argument("--dir", default=CASSETTE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="requests, replies and size on disk")
+    show = sub.add_parser("show", help="print the request and replies saved under a key")
+    show.add_argument("key", help="a key or the start of one")
+    find = sub.add_parser("find", help="keys whose request or replies contain some text")
+    find.add_argument("text")
+    args = parser.parse_args()
+
+    cassette = Cassette("replay", args.dir)
+    keys = list(cassette.keys())
+    if args.command == "stats":
+        replies = sum(len(cassette.load(key)["replies"]) for key in keys)
+        size = sum(os.path.getsize(cassette._path(key)) for key in keys)
+        print(f"{args.dir}: {len(keys)} requests, {replies} replies, {size / 1024:.1f} KiB")
+    elif args.command == "show":
+        for key in (key for key in keys if key.startswith(args.key)):
+            entry = cassette.load(key)
+            print(f"== {key}\n{json.dumps(entry['request'], indent=2, ensure_ascii=False)}")
+            for n, reply in enumerate(entry["replies"], start=1):
+                print(f"-- reply {n} ({reply['latency']} s)\n{_content(reply)}")
+    else:
+        for key in keys:
+            entry = cassette.load(key)
+            texts = [json.dumps(entry["request"], ensure_ascii=False)] + [_content(r) for r in entry["replies"]]
+            if any(args.text.lower() in text.lower() for text in texts):
+                print(key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import os
+
+from dotenv import load_dotenv
+
+# Imported first by the front-ends, so .env is read once per process (not on every
+# Streamlit rerun) and before the other modules read their settings from os.environ
+# at import time.
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# "record", "replay" or "auto" to route LLM calls through a cassette (see cassette.py);
+# replay needs no API key
+LLM_CASSETTE = os.getenv("LLM_CASSETTE", "")
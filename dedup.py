@@ -0,0 +1,113 @@
+import hashlib
+import re
+from array import array
+from operator import eq
+
+# MinHash signature of SIZE values. Only the low byte of each minimum is kept
+# (b-bit MinHash): two different minima share it once in 256 draws, which moves a
+# similarity estimate by under 0.004, and a signature is 32 bytes.
+SIZE = 32
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+_LOW_BITS = (1 << 8) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") | 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big"))
+    for i in range(SIZE)
+]
+
+# Questions kept per theme, and how many of them are quoted back in the prompt.
+# Four games' worth: a session rarely plays more of one theme, and the question bank
+# remembers what each player has seen beyond that.
+MAX_ITEMS = 20
+PROMPT_ITEMS = 8
+PROMPT_WIDTH = 60
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    return " ".join(_WORD.findall(text.replace("Question:", "").lower()))
+
+
+def fingerprint(text):
+    return hashlib.blake2b(normalize(text).encode(), digest_size=8).digest()
+
+
+def shingles(text, size=3):
+    words = normalize(text).split()
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles(text)]
+    return array("B", [min(((a * h + b) & _MASK) % _PRIME for h in hashes) & _LOW_BITS for a, b in _PERMUTATIONS])
+
+
+def prompt_history(titles, limit=PROMPT_ITEMS, width=PROMPT_WIDTH):
+    # Small, fixed-size reminder of recent questions for the prompt
+    recent = list(titles)[-limit:]
+    return [t if len(t) <= width else t[:width - 3] + "..." for t in recent]
+
+
+class DedupIndex:
+    # Bounded record of the questions asked for one theme.
+    # Exact repeats are caught by fingerprint, rephrased ones by MinHash. With at most
+    # max_items questions a check compares against every signature, so next to the titles
+    # the index only keeps two flat arrays: 40 bytes per question.
+    # Behaves like the old history list for iteration and append().
+
+    def __init__(self, titles=(), max_items=MAX_ITEMS, threshold=0.6):
+        self.max_items = max_items
+        self.threshold = threshold
+        self._titles = []
+        self._fingerprints = array("Q")  # one per title, in the same order
+        self._signatures = array("B")  # SIZE values per title, in the same order
+        self._last = (None, None)  # signature of the last checked text, reused by append()
+        for title in titles:
+            self.append(title)
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __iter__(self):
+        return iter(self._titles)
+
+    def __contains__(self, text):
+        return self.is_duplicate(text)
+
+    def _signature(self, fp, text):
+        if self._last[0] != fp:
+            self._last = (fp, minhash(text))
+        return self._last[1]
+
+    def is_duplicate(self, text):
+        fp = int.from_bytes(fingerprint(text), "big")
+        if fp in self._fingerprints:
+            return True
+        signature = self._signature(fp, text)
+        needed = self.threshold * SIZE
+        signatures = self._signatures
+        for start in range(0, len(signatures), SIZE):
+            if sum(map(eq, signature, signatures[start:start + SIZE])) >= needed:
+                return True
+        return False
+
+    def append(self, title):
+        fp = int.from_bytes(fingerprint(title), "big")
+        if fp in self._fingerprints:
+            return
+        self._signatures.extend(self._signature(fp, title))
+        self._fingerprints.append(fp)
+        self._titles.append(title)
+        excess = len(self._titles) - self.max_items
+        if excess > 0:
+            # Oldest first
+            del self._titles[:excess]
+            del self._fingerprints[:excess]
+            del self._signatures[:excess * SIZE]
+
+    def summary(self, limit=PROMPT_ITEMS):
+        return prompt_history(self, limit)
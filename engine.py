@@ -0,0 +1,184 @@
+import random
+
+# Game rules shared by the Streamlit apps, the CLI and the simulator. No I/O here:
+# every transition takes a GameState and returns a new one, so a front-end can keep
+# the state in st.session_state (or a local variable) and re-render from it.
+
+GAME_LENGTH = 5
+LIFELINES = ("50-50", "Skip", "Hint")
+# Difficulty ladder: the tier rises with the question number and moves one step with
+# the player's form, up after STREAK right answers in a row and down after a miss
+TIERS = ("Easy", "Medium", "Hard", "Expert")
+STREAK = 3
+# Prize for each rung, in rupees (the opening rungs of the KBC ladder, then doubling)
+PRIZES = (1_000, 2_000, 3_000, 5_000, 10_000, 20_000, 40_000, 80_000, 1_60_000, 3_20_000, 6_40_000,
+          12_50_000, 25_00_000, 50_00_000, 1_00_00_000)
+
+
+class Question:
+    # Parsed once when it enters the game; options keep the generated order and
+    # correct is 1-based like everywhere else (bank rows, batch items)
+    __slots__ = ("text", "options", "correct", "explanation")
+
+    def __init__(self, text, options, correct, explanation=""):
+        self.text = text
+        self.options = tuple(options)
+        self.correct = correct
+        self.explanation = explanation or "No explanation available."
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(item["question"], item["options"], item["correct"], item.get("explanation", ""))
+
+    def to_item(self):
+        # The dict shape the question bank and batch generation use
+        return {"question": self.text, "options": list(self.options), "correct": self.correct,
+                "explanation": self.explanation}
+
+    @property
+    def answer(self):
+        return self.options[self.correct - 1]
+
+    def __repr__(self):
+        return f"Question({self.text!r}, correct={self.correct})"
+
+
+class GameState:
+    # order: indexes into question.options in the order they are shown
+    # visible: the subset of order still on screen (50-50 removes two)
+    # last: True/False for the previous answer, None after a skip or at the start
+    # streak: right answers in a row; a skip leaves it alone
+    __slots__ = ("theme", "length", "sudden_death", "score", "q_count", "question", "order", "visible",
+                 "lifelines", "hint", "last", "over", "streak")
+
+    def __init__(self, theme, length=GAME_LENGTH, sudden_death=False):
+        self.theme = theme
+        self.length = length
+        self.sudden_death = sudden_death
+        self.score = 0
+        self.q_count = 0
+        self.question = None
+        self.order = ()
+        self.visible = ()
+        self.lifelines = frozenset(LIFELINES)
+        self.hint = None
+        self.last = None
+        self.over = False
+        self.streak = 0
+
+    def _replace(self, **changes):
+        state = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(state, name, changes[name] if name in changes else getattr(self, name))
+        return state
+
+    @property
+    def finished(self):
+        return self.over or self.q_count >= self.length
+
+    @property
+    def options(self):
+        # Option texts currently on screen, in display order
+        return [self.question.options[i] for i in self.visible]
+
+    def __repr__(self):
+        return f"GameState({self.theme!r}, score={self.score}, q_count={self.q_count}, over={self.over})"
+
+
+class InvalidMove(Exception):
+    pass
+
+
+def new_game(theme, length=GAME_LENGTH, sudden_death=False):
+    return GameState(theme, length, sudden_death)
+
+
+def present(state, question, rng=random):
+    # Put the next question on screen with its options shuffled
+    if state.finished:
+        raise InvalidMove("the game is over")
+    order = list(range(len(question.options)))
+    rng.shuffle(order)
+    return state._replace(question=question, order=tuple(order), visible=tuple(order), hint=None)
+
+
+def _advance(state, **changes):
+    changes.setdefault("q_count", state.q_count + 1)
+    return state._replace(question=None, order=(), visible=(), hint=None, **changes)
+
+
+def answer(state, choice):
+    # choice is the option text (what a radio button returns) or its 1-based number
+    if state.question is None:
+        raise InvalidMove("no question on screen")
+    number = choice if isinstance(choice, int) else state.question.options.index(choice) + 1
+    if number - 1 not in state.visible:
+        raise InvalidMove(f"option {number} is not available")
+    correct = number == state.question.correct
+    return _advance(state, score=state.score + correct, last=correct, streak=state.streak + 1 if correct else 0,
+                    over=state.over or (state.sudden_death and not correct))
+
+
+def forfeit(state):
+    # No usable answer (the clock ran out, or the input was not an option):
+    # counts as wrong and ends the game
+    if state.question is None:
+        raise InvalidMove("no question on screen")
+    return _advance(state, last=False, streak=0, over=True)
+
+
+def skip(state):
+    if state.question is None or "Skip" not in state.lifelines:
+        raise InvalidMove("skip is not available")
+    return _advance(state, lifelines=state.lifelines - {"Skip"}, last=None)
+
+
+def fifty_fifty(state, rng=random):
+    if state.question is None or "50-50" not in state.lifelines:
+        raise InvalidMove("50-50 is not available")
+    right = state.question.correct - 1
+    removed = rng.sample([i for i in state.visible if i != right], 2)
+    return state._replace(visible=tuple(i for i in state.visible if i not in removed),
+                          lifelines=state.lifelines - {"50-50"})
+
+
+def hint(state):
+    if state.question is None or "Hint" not in state.lifelines:
+        raise InvalidMove("hint is not available")
+    return state._replace(hint=state.question.explanation.split(".")[0] + "...",
+                          lifelines=state.lifelines - {"Hint"})
+
+
+def base_tier(q_count, length=GAME_LENGTH):
+    # Index of the tier a question gets from its position alone
+    return q_count * len(TIERS) // length
+
+
+def tier(state):
+    # Difficulty of the question at position q_count (the one on screen, or the next one)
+    level = base_tier(state.q_count, state.length)
+    # In a sudden-death game everyone still playing has answered everything right, so
+    # there is no form to read
+    if state.streak >= STREAK and not state.sudden_death:
+        level += 1
+    elif state.last is False:
+        level -= 1
+    return TIERS[max(0, min(level, len(TIERS) - 1))]
+
+
+def next_tier(state):
+    # Difficulty of the question after the one on screen if that one is answered right,
+    # the only way a sudden-death game goes on; lets a front-end generate it in advance
+    if state.question is None:
+        return tier(state)
+    return tier(answer(state, state.question.correct))
+
+
+def prize(state):
+    # Winnings for the right answers so far: the rung reached on the ladder
+    return PRIZES[min(state.score, len(PRIZES)) - 1] if state.score else 0
+
+
+def playing_for(state):
+    # Winnings after one more right answer
+    return PRIZES[min(state.score, len(PRIZES) - 1)]
@@ -0,0 +1,30 @@
+# Exceptions of the question pipeline, in a module of their own so the pure modules
+# (output_parser, prompts, verification) can raise and catch them without importing
+# the gateway and its event loop.
+
+
+class QuestionUnavailable(Exception):
+    # No fresh question can be had right now, whatever the reason. Front-ends catch this
+    # one exception and serve a stored question instead, so a new failure mode only needs
+    # to subclass it to get the same fallback.
+    pass
+
+
+class GatewayError(QuestionUnavailable):
+    # An LLM call failed; llm_gateway raises the subclasses
+    pass
+
+
+class MalformedOutput(QuestionUnavailable):
+    # A generated reply that can't be read as a question, even after repairs
+    pass
+
+
+class NoConsensus(QuestionUnavailable):
+    # The answer-key voters didn't agree on any fresh question
+    pass
+
+
+class BudgetExceeded(QuestionUnavailable):
+    # The game's token budget is spent (prompts.Budget)
+    pass
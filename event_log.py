@@ -0,0 +1,252 @@
+import argparse
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Append-only log of game events for analytics. emit() only puts a dict on an
+# in-memory queue, so a Streamlit rerun never waits on disk; one writer thread
+# batches the events into JSONL segment files, fsyncs every FSYNC_INTERVAL,
+# rotates segments by size/age and compacts closed segments into Parquet. Several
+# processes (replicas, bench workers) can share the directory: each writer names its
+# segments with its own id and compacts only those.
+#
+#   python event_log.py compact     # fold closed segments into a Parquet snapshot now
+#   python event_log.py stats       # events per kind, read with pandas
+
+EVENTS_DIR = os.getenv("GAME_EVENTS_DIR", "game_events")
+SEGMENT_BYTES = int(os.getenv("EVENTS_SEGMENT_BYTES", str(4 * 2**20)))
+SEGMENT_SECONDS = float(os.getenv("EVENTS_SEGMENT_SECONDS", "3600"))
+FSYNC_INTERVAL = float(os.getenv("EVENTS_FSYNC_INTERVAL", "5"))
+# Closed segments that trigger a compaction in the writer thread
+COMPACT_AFTER = 4
+FLUSH_INTERVAL = 0.5
+MAX_BATCH = 1000
+MAX_QUEUED = 100_000
+
+# Event kinds written by the front-ends
+QUESTION_SERVED = "question_served"
+ANSWER_SUBMITTED = "answer_submitted"
+LIFELINE_USED = "lifeline_used"
+GAME_FINISHED = "game_finished"
+
+
+class EventLog:
+    def __init__(self, directory=EVENTS_DIR, segment_bytes=SEGMENT_BYTES, segment_seconds=SEGMENT_SECONDS,
+                 fsync_interval=FSYNC_INTERVAL, compact_after=COMPACT_AFTER):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync_interval = fsync_interval
+        self.compact_after = compact_after
+        self.stats = {"emitted": 0, "written": 0, "dropped": 0, "fsyncs": 0, "segments": 0, "compactions": 0,
+                      "compaction_errors": 0}
+        # Not the pid: replicas in containers can all be pid 1
+        self.writer_id = uuid.uuid4().hex[:8]
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=MAX_QUEUED)
+        self._file = None
+        self._opened_at = 0.0
+        self._synced_at = time.monotonic()
+        self._dirty = False
+        self._rotated = False
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def emit(self, kind, **fields):
+        # Never blocks; if the writer can't keep up the event is counted as dropped
+        event = {"ts": time.time(), "kind": kind, **fields}
+        try:
+            self._queue.put_nowait(event)
+            self.stats["emitted"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _run(self):
+        while not self._stopped.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=FLUSH_INTERVAL))
+                while len(batch) < MAX_BATCH:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    self._write(batch)
+                if self._dirty and time.monotonic() - self._synced_at >= self.fsync_interval:
+                    self._sync()
+            except OSError:
+                # Disk trouble must not kill the writer; the batch is lost and counted
+                self.stats["dropped"] += len(batch)
+            # After the write, so a failed compaction can't cost the batch
+            if self._rotated:
+                self._rotated = False
+                if len(closed_segments(self.directory, self.writer_id)) >= self.compact_after:
+                    self._compact()
+        self._close_segment()
+
+    def _compact(self):
+        try:
+            self.stats["compactions"] += bool(compact(self.directory, self.writer_id))
+        except Exception:
+            # The segments stay where they are and the next rotation tries again
+            self.stats["compaction_errors"] += 1
+
+    def _write(self, batch):
+        if self._file is None or self._file.tell() >= self.segment_bytes or \
+                time.monotonic() - self._opened_at >= self.segment_seconds:
+            self._rotate()
+        self._file.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in batch))
+        self._file.flush()
+        self._dirty = True
+        self.stats["written"] += len(batch)
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._synced_at = time.monotonic()
+        self._dirty = False
+        self.stats["fsyncs"] += 1
+
+    def _close_segment(self):
+        if self._file is not None:
+            if self._dirty:
+                self._sync()
+            self._file.close()
+            os.replace(self._file.name, self._file.name[:-len(".open")])
+            self._file = None
+
+    def _rotate(self):
+        self._close_segment()
+        # ".open" marks the segment being written; compaction only touches closed ones
+        name = f"events-{time.strftime('%Y%m%dT%H%M%S')}-{self.writer_id}-{self.stats['segments']}.jsonl.open"
+        self._file = open(os.path.join(self.directory, name), "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+        self.stats["segments"] += 1
+        self._rotated = True
+
+    def flush(self, timeout=5.0):
+        # Wait until everything emitted so far is on disk, e.g. before reading it back with load()
+        deadline = time.monotonic() + timeout
+        while (not self._queue.empty() or self.stats["written"] + self.stats["dropped"] < self.stats["emitted"]) \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        self._stopped.set()
+        self._writer.join(timeout=10)
+
+
+def closed_segments(directory=EVENTS_DIR, writer_id="*"):
+    return sorted(glob.glob(os.path.join(directory, f"events-*-{writer_id}-*.jsonl")))
+
+
+def _read_segment(path):
+    with open(path, encoding="utf-8") as f:
+        # A crash can leave a torn last line; everything before it is kept
+        rows = []
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+        return rows
+
+
+def _claim(segments, token):
+    # Renaming is atomic, so when two compactions (a writer and the CLI) go for the same
+    # segment only one gets it; the other finds it gone and leaves it alone
+    claimed = []
+    for segment in segments:
+        try:
+            os.rename(segment, f"{segment}.{token}.compacting")
+        except FileNotFoundError:
+            continue
+        claimed.append(f"{segment}.{token}.compacting")
+    return claimed
+
+
+def compact(directory=EVENTS_DIR, writer_id="*"):
+    # Closed JSONL segments (every writer's, or one writer's) -> one Parquet snapshot; the
+    # segments are removed afterwards. Returns the snapshot path, or None if pyarrow isn't
+    # installed or there was nothing to do.
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    token = uuid.uuid4().hex[:8]
+    segments = _claim(closed_segments(directory, writer_id), token)
+    rows = [row for path in segments for row in _read_segment(path)]
+    if not rows:
+        for segment in segments:
+            os.remove(segment)
+        return None
+    path = os.path.join(directory, f"snapshot-{time.strftime('%Y%m%dT%H%M%S')}-{token}.parquet")
+    # Event kinds carry different fields: one column per field any event has, null elsewhere
+    columns = dict.fromkeys(name for row in rows for name in row)
+    try:
+        table = pa.table({name: [row.get(name) for row in rows] for name in columns})
+        pq.write_table(table, f"{path}.tmp", compression="zstd")
+        os.replace(f"{path}.tmp", path)
+    except Exception:
+        # Give the segments back so nothing is lost
+        for segment in segments:
+            os.rename(segment, segment[:-len(f".{token}.compacting")])
+        raise
+    for segment in segments:
+        os.remove(segment)
+    return path
+
+
+def load(directory=EVENTS_DIR):
+    # Every event as a pandas DataFrame: Parquet snapshots plus segments not compacted yet
+    import pandas as pd
+
+    frames = [pd.read_parquet(path) for path in sorted(glob.glob(os.path.join(directory, "snapshot-*.parquet")))]
+    tail = [row for path in closed_segments(directory) + sorted(glob.glob(os.path.join(directory, "*.open")))
+            for row in _read_segment(path)]
+    if tail:
+        frames.append(pd.DataFrame(tail))
+    if not frames:
+        return pd.DataFrame(columns=["ts", "kind"])
+    return pd.concat(frames, ignore_index=True)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    # Process-wide writer shared by all sessions
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+        return _log
+
+
+def emit(kind, **fields):
+    get_log().emit(kind, **fields)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Game event log maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("compact", help="fold closed segments into a Parquet snapshot")
+    sub.add_parser("stats", help="events per kind")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        print(compact() or "nothing to compact (or pyarrow is not installed)")
+    else:
+        events = load()
+        print(f"{len(events)} events")
+        if len(events):
+            print(events["kind"].value_counts().to_string())
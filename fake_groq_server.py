@@ -0,0 +1,242 @@
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Groq OpenAI-compatible API, for exercising the gateway
+# without spending quota. Point the app at it with GROQ_BASE_URL=http://127.0.0.1:<port>
+#
+#   python fake_groq_server.py --port 8123 --rate-limit 0.3 --rpm 60 --token-delay 0.02 \
+#       --latency 0.2 --error-rate 0.05 --malformed-rate 0.1
+
+
+class FakeGroq:
+    def __init__(self, rate_limit=0.0, rpm=None, retry_after=1.0, token_delay=0.0, latency=0.0,
+                 error_rate=0.0, malformed_rate=0.0, wrong_key_rate=0.0, seed=None, prompt_delay=0.0):
+        self.rate_limit = rate_limit
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self.latency = latency
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.wrong_key_rate = wrong_key_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.stats = {"requests": 0, "429": 0, "500": 0, "200": 0, "malformed": 0}
+
+    def throttled(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] > 60:
+                self.recent.popleft()
+            limited = self.random.random() < self.rate_limit or (self.rpm is not None and len(self.recent) >= self.rpm)
+            if not limited:
+                self.recent.append(now)
+            self.stats["429" if limited else "200"] += 1
+            return limited
+
+    def chance(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def failed(self):
+        if not self.chance(self.error_rate):
+            return False
+        with self.lock:
+            self.stats["500"] += 1
+            self.stats["200"] -= 1
+        return True
+
+    def mangle(self, content):
+        # The kinds of drift we see from the real model
+        with self.lock:
+            self.stats["malformed"] += 1
+            kind = self.random.randrange(5)
+        lines = content.split("\n")
+        if kind == 0:
+            return "Sure! Here is your question:\n\n" + content
+        if kind == 1:
+            return "\n".join(re.sub(r"^([1-4])\.", r"\1)", line) for line in lines)
+        if kind == 2:
+            return "\n".join(line for line in lines if not line.startswith("4."))
+        if kind == 3:
+            return content[: len(content) // 2]
+        if content.isdigit():
+            # Answer requests: prose instead of a bare option number
+            return f"The correct answer is option {'ABCD'[int(content) - 1]}."
+        return content.replace("Question:", "Q:").replace('"options"', '"choices"')
+
+    def question(self, theme):
+        n = next(self.counter)
+        correct = n % 4 + 1
+        options = [f"{'Right' if i == correct else 'Wrong'} answer {n}.{i}" for i in range(1, 5)]
+        return n, {"question": f"Sample question #{n} about {theme}?", "options": options,
+                   "correct": correct, "explanation": f"Option {correct} is right. It always is for #{n}."}
+
+    def reply(self, body):
+        content = self._reply(body)
+        content = self.mangle(content) if self.chance(self.malformed_rate) else content
+        # A reply longer than max_tokens is cut off, as the real model does
+        return content[:body["max_tokens"] * 4] if body.get("max_tokens") else content
+
+    def prefill(self, body):
+        # Seconds spent reading the prompt before the first token
+        return self.prompt_delay * (sum(len(m.get("content") or "") for m in body["messages"]) // 4)
+
+    def _reply(self, body):
+        prompt = body["messages"][-1]["content"]
+        # The kind of call can be told by the system message too (prompts.PROMPT_STRATEGY)
+        instructions = "\n".join(m.get("content") or "" for m in body["messages"])
+        theme = re.search(r"(?:about|theme)\W*([^.,'\n]+)", prompt)
+        theme = theme.group(1).strip() if theme else "trivia"
+        number = re.search(r"Sample question #(\d+)", prompt)
+        missing = re.search(r"Write (\d+) more answer option", prompt)
+        if missing:
+            # Follow-up for a question that lost options
+            n = number.group(1) if number else "0"
+            return "\n".join(f"Extra answer {n}.{i}" for i in range(1, int(missing.group(1)) + 1))
+        if number and "option number" in instructions:
+            # Answer request: questions generated here always have answer n % 4 + 1
+            right = int(number.group(1)) % 4 + 1
+            if self.chance(self.wrong_key_rate):
+                with self.lock:
+                    return str(self.random.choice([i for i in range(1, 5) if i != right]))
+            return str(right)
+        if "JSON" in instructions:
+            count = re.search(r"Create (\d+)", prompt)
+            items = [self.question(theme)[1] for _ in range(int(count.group(1)) if count else 5)]
+            return json.dumps({"questions": items})
+        _, item = self.question(theme)
+        lines = [f"Question: {item['question']}", "Options:"]
+        lines += [f"{i}. {opt}" for i, opt in enumerate(item["options"], start=1)]
+        lines.append(f"Explanation: {item['explanation']}")
+        return "\n".join(lines)
+
+
+def tokens(content):
+    # Roughly one token per 4 characters, which is what the model streams back
+    return [content[i:i + 4] for i in range(0, len(content), 4)]
+
+
+def chunk(body, delta, finish_reason=None):
+    return {
+        "id": "chatcmpl-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "delta": {"content": delta} if delta else {}, "finish_reason": finish_reason}],
+    }
+
+
+def completion(body, content):
+    prompt_tokens = sum(len(m.get("content") or "") for m in body["messages"]) // 4
+    return {
+        "id": f"chatcmpl-{random.getrandbits(48):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                  "total_tokens": prompt_tokens + len(content) // 4},
+    }
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, payload, headers=()):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_stream(self, body, content):
+            # Server-sent events, one chunk per token, like the real API with stream=True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            for token in tokens(content):
+                time.sleep(fake.token_delay)
+                self.wfile.write(f"data: {json.dumps(chunk(body, token))}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(f"data: {json.dumps(chunk(body, None, 'stop'))}\n\ndata: [DONE]\n\n".encode())
+            self.wfile.flush()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(fake.latency + fake.prefill(body))
+            if not self.path.endswith("/chat/completions"):
+                self.send_json(404, {"error": {"message": "not found"}})
+            elif fake.throttled():
+                self.send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens",
+                                               "code": "rate_limit_exceeded"}},
+                               [("retry-after", str(fake.retry_after))])
+            elif fake.failed():
+                self.send_json(500, {"error": {"message": "Internal server error"}})
+            elif body.get("stream"):
+                self.send_stream(body, fake.reply(body))
+            else:
+                content = fake.reply(body)
+                time.sleep(fake.token_delay * len(tokens(content)))
+                self.send_json(200, completion(body, content))
+
+    return Handler
+
+
+class Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when many players connect at once
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def start_server(port=0, **options):
+    # Runs in a background thread; returns (server, fake, base_url)
+    fake = FakeGroq(**options)
+    server = Server(("127.0.0.1", port), make_handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rpm", type=int, default=None, help="answer 429 above this many requests per minute")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds per generated token")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response starts")
+    parser.add_argument("--prompt-delay", type=float, default=0.0, help="seconds per prompt token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies that break the format")
+    parser.add_argument("--wrong-key-rate", type=float, default=0.0, help="fraction of answer replies that are wrong")
+    args = parser.parse_args()
+    server, fake, url = start_server(args.port, rate_limit=args.rate_limit, rpm=args.rpm,
+                                     retry_after=args.retry_after, token_delay=args.token_delay,
+                                     latency=args.latency, prompt_delay=args.prompt_delay, error_rate=args.error_rate,
+                                     malformed_rate=args.malformed_rate, wrong_key_rate=args.wrong_key_rate)
+    print(f"Fake Groq listening on {url} (set GROQ_BASE_URL={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
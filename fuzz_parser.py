@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import random
+import re
+from collections import Counter
+
+import output_parser
+from batch_generation import format_question
+
+# Replays the malformed-reply corpus through output_parser, then throws randomly
+# mutated replies at it. The parser may give up on a reply (MalformedOutput) but must
+# never raise anything else, and when the mutation kept every option it has to read
+# back the original question and options.
+#
+#   python fuzz_parser.py                       # corpus + 20,000 mutations
+#   python fuzz_parser.py --cases 100000 --seed 7 --save-crashes
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_corpus.jsonl")
+
+
+def outcome(reply):
+    # "ok", "fix" (the follow-up call would be made) or "fail", plus the parsed item
+    item, _ = output_parser.read(reply)
+    missing = 4 - len(item["options"])
+    if not item["question"] or missing > output_parser.MAX_MISSING:
+        return "fail", item
+    return ("fix" if missing else "ok"), item
+
+
+def replay(path):
+    failures = []
+    with open(path, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    for case in cases:
+        got, item = outcome(case["reply"])
+        if got != case["expect"]:
+            failures.append(f"{case['name']}: expected {case['expect']}, got {got} {item}")
+        elif got == "fix" and 4 - len(item["options"]) != case["missing"]:
+            failures.append(f"{case['name']}: expected {case['missing']} missing, got {item['options']}")
+        elif got == "ok" and (item["question"], item["options"]) != (case["question"], case["options"]):
+            failures.append(f"{case['name']}: read {item['question']!r} {item['options']}")
+    return len(cases), failures
+
+
+def sample_item(rng, n):
+    words = ["capital", "river", "film", "batsman", "emperor", "fort", "year", "song", "element", "king"]
+    return {"question": f"Which {rng.choice(words)} is #{n} ({rng.randint(1, 999)})?",
+            "options": [f"{rng.choice(words).title()} {n}-{i}" for i in range(1, 5)],
+            "correct": rng.randint(1, 4), "explanation": f"Because of fact {n}. Also more."}
+
+
+# Mutations that keep every option and the question intact
+LOSSLESS = {
+    "preamble": lambda r, t: "Sure! Here is your question:\n\n" + t,
+    "paren numbering": lambda r, t: re.sub(r"^([1-4])\.", r"\1)", t, flags=re.MULTILINE),
+    "letters": lambda r, t: re.sub(r"^([1-4])\.", lambda m: "ABCD"[int(m.group(1)) - 1] + ".", t, flags=re.MULTILINE),
+    "q label": lambda r, t: t.replace("Question:", r.choice(["Q:", "Question 1:", "**Question:**", "### Question:"])),
+    "crlf": lambda r, t: t.replace("\n", "\r\n"),
+    "blank lines": lambda r, t: t.replace("\n", "\n" * r.randint(1, 3)),
+    "indent": lambda r, t: "\n".join(" " * r.randint(0, 4) + line for line in t.split("\n")),
+    "fence": lambda r, t: f"```\n{t}\n```",
+    "answer line": lambda r, t: t + f"\nAnswer: {r.randint(1, 4)}",
+    "no explanation": lambda r, t: "\n".join(l for l in t.split("\n") if not l.startswith("Explanation")),
+    "bullets": lambda r, t: re.sub(r"^[1-4]\. ", "- ", t, flags=re.MULTILINE),
+    "shuffle options": lambda r, t: _shuffle_options(r, t),
+}
+# Mutations that may lose data; only crashes count for these
+LOSSY = {
+    "drop option": lambda r, t: "\n".join(l for l in t.split("\n") if not l.startswith(f"{r.randint(1, 4)}.")),
+    "truncate": lambda r, t: t[:r.randint(0, len(t))],
+    "drop line": lambda r, t: "\n".join(l for i, l in enumerate(t.split("\n")) if i != r.randrange(t.count("\n") + 1)),
+    "noise": lambda r, t: "".join(c if r.random() > 0.03 else r.choice("\n.:)(*#-1a{}[]\"é€ \t") for c in t),
+    "duplicate option": lambda r, t: t.replace("2. ", "2. " + t.split("1. ", 1)[-1].split("\n")[0] + "\n#", 1),
+    "broken json": lambda r, t: '{"question": "' + t[:r.randint(0, len(t))],
+}
+
+
+def _shuffle_options(rng, text):
+    lines = text.split("\n")
+    options = [line for line in lines if re.match(r"^[1-4]\. ", line)]
+    rng.shuffle(options)
+    shuffled = iter(options)
+    return "\n".join(next(shuffled) if re.match(r"^[1-4]\. ", line) else line for line in lines)
+
+
+def fuzz(cases, seed):
+    rng = random.Random(seed)
+    results = Counter()
+    problems = []
+    for n in range(cases):
+        item = sample_item(rng, n)
+        reply = format_question(item)
+        names = rng.sample(sorted(LOSSLESS), rng.randint(1, 3))
+        lossy = rng.random() < 0.3
+        if lossy:
+            names.append(rng.choice(sorted(LOSSY)))
+        for name in names:
+            reply = (LOSSY.get(name) or LOSSLESS[name])(rng, reply)
+        try:
+            got, parsed = outcome(reply)
+        except Exception as error:  # noqa: BLE001 - anything but a clean verdict is a finding
+            results["crashed"] += 1
+            problems.append({"name": f"crash {'+'.join(names)}: {error!r}", "reply": reply, "expect": "fail"})
+            continue
+        results[got] += 1
+        if lossy or got != "ok":
+            if not lossy:
+                results["misparsed"] += 1
+                problems.append({"name": f"lost {'+'.join(names)}", "reply": reply, "expect": "ok",
+                                 "question": item["question"], "options": item["options"]})
+            continue
+        if parsed["question"] != item["question"] or sorted(parsed["options"]) != sorted(item["options"]):
+            results["misparsed"] += 1
+            problems.append({"name": f"misread {'+'.join(names)}", "reply": reply, "expect": "ok",
+                             "question": item["question"], "options": item["options"]})
+    return results, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corpus replay and fuzzing for output_parser")
+    parser.add_argument("--cases", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--save-crashes", action="store_true", help="append crashing replies to the corpus")
+    args = parser.parse_args()
+
+    total, failures = replay(args.corpus)
+    print(f"corpus: {total - len(failures)}/{total} as expected")
+    for failure in failures:
+        print(f"  MISMATCH {failure}")
+
+    results, problems = fuzz(args.cases, args.seed)
+    print(f"fuzz: {args.cases} mutated replies, seed {args.seed}")
+    for key in ("ok", "fix", "fail", "misparsed", "crashed"):
+        print(f"  {key:10} {results[key]:7}  {results[key] / args.cases:7.2%}")
+    for problem in problems[:10]:
+        print(f"  {problem['name']}: {problem['reply'][:120]!r}")
+    if args.save_crashes:
+        crashes = [p for p in problems if p["name"].startswith("crash")]
+        with open(args.corpus, "a", encoding="utf-8") as f:
+            for problem in crashes:
+                f.write(json.dumps(problem) + "\n")
+        print(f"{len(crashes)} crashing replies appended to {args.corpus}")
+    raise SystemExit(1 if failures or results["crashed"] or results["misparsed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+
+import player_stats
+
+SCORES_PATH = os.getenv("HIGHSCORES_PATH", "highscores.db")
+LEGACY_CSV = "highscores.csv"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    game_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    theme TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_scores_rank ON scores (score DESC, created_at);
+"""
+
+
+class ScoreStore:
+    # Append-only score log in SQLite (WAL). Each finished game is written once,
+    # keyed by its game id, so re-running the "Quiz Completed" screen is harmless.
+    # SQLite's own file locks keep concurrent Streamlit sessions and processes safe.
+
+    def __init__(self, path=SCORES_PATH, legacy_csv=LEGACY_CSV):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if "theme" not in [row[1] for row in self._conn.execute("PRAGMA table_info(scores)")]:
+            self._conn.execute("ALTER TABLE scores ADD COLUMN theme TEXT NOT NULL DEFAULT ''")
+        self._conn.executescript(player_stats.SCHEMA)
+        if legacy_csv and os.path.exists(legacy_csv) and self.count() == 0:
+            self._import_csv(legacy_csv)
+        elif player_stats.is_empty(self._conn) and self.count():
+            # Database from before the aggregates existed
+            with self._lock, self._conn:
+                player_stats.rebuild(self._conn)
+
+    def _import_csv(self, path):
+        # One-off migration of the old Name,Score file; row numbers become the game ids
+        with open(path, newline="") as f:
+            rows = [(f"legacy-{n}", row["Name"], int(row["Score"]), float(n))
+                    for n, row in enumerate(csv.DictReader(f)) if row.get("Score", "").strip().isdigit()]
+        self.add_many(rows)
+
+    def add(self, game_id, name, score, theme=""):
+        # O(log n) insert plus the player's aggregates; returns False if this game was already recorded
+        now = time.time()
+        with self._lock, self._conn:
+            added = self._conn.execute(
+                "INSERT OR IGNORE INTO scores (game_id, name, score, created_at, theme) VALUES (?, ?, ?, ?, ?)",
+                (game_id, name, int(score), now, theme),
+            ).rowcount == 1
+            if added:
+                player_stats.record(self._conn, name, theme, int(score), now)
+        return added
+
+    def add_many(self, rows):
+        # rows: iterable of (game_id, name, score, created_at[, theme]). Rows are appended,
+        # so the ones actually inserted are those past the previous last rowid.
+        rows = [row if len(row) == 5 else (*row, "") for row in rows]
+        with self._lock, self._conn:
+            last = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM scores").fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO scores (game_id, name, score, created_at, theme) VALUES (?, ?, ?, ?, ?)", rows)
+            self._merge_since(last)
+
+    def _merge_since(self, rowid):
+        import pandas as pd
+
+        player_stats.merge(self._conn, pd.read_sql_query(
+            "SELECT name, theme, score, created_at FROM scores WHERE rowid > ?", self._conn, params=(rowid,)))
+
+    def top(self, limit=10):
+        # Best single games, earliest game breaking ties (the app ranks players: leaderboard())
+        with self._lock:
+            rows = self._conn.execute("SELECT name, score FROM scores ORDER BY score DESC, created_at LIMIT ?",
+                                      (limit,)).fetchall()
+        return [{"Name": name, "Score": score} for name, score in rows]
+
+    def leaderboard(self, theme=player_stats.ALL, page=0, size=10):
+        with self._lock:
+            return player_stats.leaderboard(self._conn, theme, page, size)
+
+    def standing(self, name, theme=player_stats.ALL):
+        with self._lock:
+            return player_stats.standing(self._conn, name, theme)
+
+    def players(self, theme=player_stats.ALL):
+        with self._lock:
+            return player_stats.players(self._conn, theme)
+
+    def themes(self):
+        with self._lock:
+            return player_stats.themes(self._conn)
+
+    def rebuild_stats(self):
+        with self._lock, self._conn:
+            player_stats.rebuild(self._conn)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_scores():
+    # Process-wide store shared by every session
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ScoreStore()
+        return _store
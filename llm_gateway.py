@@ -0,0 +1,255 @@
+import asyncio
+import os
+import queue
+import threading
+import weakref
+from concurrent.futures import CancelledError
+from functools import partial
+from types import SimpleNamespace
+
+import metrics
+from errors import GatewayError
+from llm_scheduler import Saturated, Scheduler
+
+# Process-wide limits shared by every player
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+# Rate-limit budget for replayed calls, which spend no quota
+UNMETERED = 10 ** 9
+
+
+class LLMTimeout(GatewayError):
+    pass
+
+
+class LLMCancelled(GatewayError):
+    pass
+
+
+class LLMUnavailable(GatewayError):
+    # Upstream is rate limited or failing; serve a stored question instead
+    pass
+
+
+class Gateway:
+    # One AsyncGroq client on a private event loop thread. Keep-alive connections
+    # are pooled by httpx, and a semaphore caps how many requests are in flight.
+    # Blocking callers (Streamlit script, prefetch workers, CLI) use create(),
+    # async code can await acreate() on the gateway loop. Rate limits, retries,
+    # coalescing and the circuit breaker are handled by llm_scheduler. With a cassette
+    # (cassette.py) the HTTP transport records or replays the calls.
+
+    def __init__(self, api_key=None, max_concurrency=MAX_CONCURRENCY, pool_size=POOL_SIZE,
+                 timeout=REQUEST_TIMEOUT, scheduler=None, base_url=None, cassette=None):
+        self.timeout = timeout
+        self.cassette = cassette
+        offline = cassette is not None and cassette.offline
+        self.scheduler = scheduler or (Scheduler(rpm=UNMETERED, tpm=UNMETERED) if offline else Scheduler())
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+        self._client, self._semaphore = asyncio.run_coroutine_threadsafe(
+            self._setup(api_key, max_concurrency, pool_size, base_url), self.loop).result()
+
+    async def _setup(self, api_key, max_concurrency, pool_size, base_url):
+        import httpx
+        from groq import AsyncGroq
+
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                keepalive_expiry=60),
+        )
+        if self.cassette is not None:
+            transport = self.cassette.transport(transport)
+        http_client = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+        # Retries are left to the scheduler so they respect the shared rate-limit budget.
+        # A replaying cassette never sends the key, so any placeholder will do.
+        if self.cassette is not None and self.cassette.offline:
+            api_key = api_key or os.getenv("GROQ_API_KEY") or "replay"
+        client = AsyncGroq(api_key=api_key or os.getenv("GROQ_API_KEY"), base_url=base_url,
+                           http_client=http_client, max_retries=0)
+        return client, asyncio.Semaphore(max_concurrency)
+
+    async def _call(self, timeout=None, **kwargs):
+        async with self._semaphore:
+            return await asyncio.wait_for(self._client.chat.completions.create(**kwargs), timeout or self.timeout)
+
+    async def acreate(self, timeout=None, info=None, background=False, **kwargs):
+        # Same arguments as client.chat.completions.create(); background=True only spends
+        # rate-limit budget players leave over (see llm_scheduler.Scheduler)
+        return await self.scheduler.run(partial(self._call, timeout=timeout), kwargs, info=info, background=background)
+
+    def submit(self, timeout=None, info=None, background=False, **kwargs):
+        return asyncio.run_coroutine_threadsafe(
+            self.acreate(timeout=timeout, info=info, background=background, **kwargs), self.loop)
+
+    async def _pump(self, out, timeout, kwargs, info):
+        # Streams the deltas of one completion into a thread-safe queue
+        async def open_stream(**kw):
+            async with self._semaphore:
+                return await asyncio.wait_for(self._client.chat.completions.create(stream=True, **kw),
+                                              timeout or self.timeout)
+
+        stream = await self.scheduler.run(open_stream, kwargs, coalesce=False, info=info)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                out.put(chunk.choices[0].delta.content)
+
+    def start_stream(self, timeout=None, info=None, **kwargs):
+        out = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._pump(out, timeout, kwargs, info or {}), self.loop)
+        future.add_done_callback(lambda _: out.put(_END))
+        return future, out
+
+    def iter_stream(self, future, out):
+        while True:
+            delta = out.get()
+            if delta is _END:
+                break
+            yield delta
+        self.wait(future)
+
+    def wait(self, future):
+        try:
+            return future.result()
+        except CancelledError:
+            raise LLMCancelled("request was cancelled") from None
+        except TimeoutError:
+            raise LLMTimeout("LLM request timed out") from None
+        except Saturated as error:
+            raise LLMUnavailable(str(error)) from None
+        except Exception as error:
+            from groq import APIError
+
+            if isinstance(error, APIError):
+                raise LLMUnavailable(f"Groq request failed: {error}") from error
+            raise
+
+    def create(self, timeout=None, **kwargs):
+        return self.wait(self.submit(timeout=timeout, **kwargs))
+
+
+_END = object()
+
+
+def _cancel_all(inflight):
+    for future in list(inflight):
+        future.cancel()
+
+
+class Session:
+    # Per-player view of the gateway. Looks like a Groq client
+    # (session.chat.completions.create(...)) so existing call sites keep working,
+    # and remembers its in-flight requests so an abandoned session can cancel them.
+    # With a budget (prompts.Budget, set per game) every call is charged to it first.
+    # A background session (the shared pool's refills) queues behind the players' calls.
+
+    def __init__(self, gateway=None, background=False):
+        self._gateway = gateway
+        self._inflight = set()
+        self.budget = None
+        self.background = background
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        # Runs when Streamlit drops the session state holding this object
+        weakref.finalize(self, _cancel_all, self._inflight)
+
+    @property
+    def gateway(self):
+        # Resolved on the first request, so a session that is only served stored
+        # questions never imports groq or starts the gateway thread
+        if self._gateway is None:
+            self._gateway = get_gateway()
+        return self._gateway
+
+    def _charge(self, requests):
+        # Reserves the calls' estimated tokens; raises errors.BudgetExceeded once the game's
+        # budget is spent. Returns what _settle() needs, even if the budget is swapped meanwhile.
+        budget = self.budget
+        return (budget, budget.reserve(requests)) if budget is not None else None
+
+    def _settle(self, charge, results):
+        if charge is not None:
+            budget, costs = charge
+            budget.settle(costs, results)
+
+    def create(self, timeout=None, **kwargs):
+        charge = self._charge([kwargs])
+        info = {}
+        future = self.gateway.submit(timeout=timeout, info=info, background=self.background, **kwargs)
+        self._inflight.add(future)
+        try:
+            response = self.gateway.wait(future)
+        except Exception as error:
+            self._settle(charge, [error])
+            raise
+        finally:
+            self._inflight.discard(future)
+            metrics.note(retries=info.get("retries", 0), cache_hits=int(info.get("coalesced", False)))
+        self._settle(charge, [response])
+        metrics.note_usage(response)
+        return response
+
+    def gather(self, requests, timeout=None):
+        # Several completions in flight at once (list of create() kwargs). Returns, in order,
+        # each response or the GatewayError it failed with, so one bad call doesn't sink the rest.
+        charge = self._charge(requests)
+        infos = [{} for _ in requests]
+        futures = [self.gateway.submit(timeout=timeout, info=info, background=self.background, **kwargs)
+                   for kwargs, info in zip(requests, infos)]
+        self._inflight.update(futures)
+        results = []
+        try:
+            for future in futures:
+                try:
+                    response = self.gateway.wait(future)
+                except GatewayError as error:
+                    results.append(error)
+                else:
+                    metrics.note_usage(response)
+                    results.append(response)
+        finally:
+            self._inflight.difference_update(futures)
+            metrics.note(retries=sum(info.get("retries", 0) for info in infos),
+                         cache_hits=sum(int(info.get("coalesced", False)) for info in infos))
+            # Calls not waited for (an unexpected error) keep their estimate
+            self._settle(charge, results + [None] * (len(requests) - len(results)))
+        return results
+
+    def stream(self, timeout=None, **kwargs):
+        # Yields text deltas as they arrive; closing the generator early cancels the request.
+        # Streams report no usage, so they stay charged at their estimate unless they fail.
+        charge = self._charge([kwargs])
+        info = {}
+        future, out = self.gateway.start_stream(timeout=timeout, info=info, **kwargs)
+        self._inflight.add(future)
+        try:
+            yield from self.gateway.iter_stream(future, out)
+        except Exception as error:
+            self._settle(charge, [error])
+            raise
+        finally:
+            future.cancel()
+            self._inflight.discard(future)
+            metrics.note(retries=info.get("retries", 0))
+
+    def cancel(self):
+        _cancel_all(self._inflight)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            import cassette
+
+            _gateway = Gateway(cassette=cassette.from_env())
+        return _gateway
+
+
+def session(background=False):
+    return Session(background=background)
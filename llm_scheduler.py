@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+
+# Provider limits for the account, per minute
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_RPM", "30"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TPM", "6000"))
+# Longest a request may queue for rate-limit budget before we treat upstream as saturated
+MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "10"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Consecutive failed upstream calls that open the circuit, and how long it stays open
+FAILURE_THRESHOLD = 5
+COOLDOWN = 30.0
+# Completion tokens assumed per request when the caller doesn't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 300
+# Background calls (pool refills) only spend budget while this share of each bucket
+# stays free for players, and give up after waiting this long for it
+BACKGROUND_HEADROOM = float(os.getenv("LLM_BACKGROUND_HEADROOM", "0.8"))
+BACKGROUND_MAX_WAIT = float(os.getenv("LLM_BACKGROUND_MAX_WAIT", "60"))
+BACKGROUND_POLL = 0.25
+
+
+class SchedulerError(Exception):
+    pass
+
+
+class Saturated(SchedulerError):
+    # Raised instead of calling upstream; callers should serve a stored question
+    pass
+
+
+def prompt_tokens(messages):
+    # About one token per 4 characters of English text
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+def estimate_tokens(kwargs):
+    # Tokens a call can use; the TPM bucket and the per-game budget (prompts.Budget) both
+    # reserve this, and settle with the usage the reply reports
+    return prompt_tokens(kwargs.get("messages", ())) + kwargs.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+
+
+def request_key(kwargs):
+    # Identical model + messages + sampling settings -> one upstream call
+    payload = json.dumps({k: v for k, v in kwargs.items() if k != "timeout"}, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, keep=0.0):
+        # Seconds until amount can be taken with keep tokens still left over
+        self._refill()
+        amount = min(amount + keep, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError")
+
+
+class Scheduler:
+    # Sits between the gateway and the Groq client, on the gateway's event loop:
+    # local RPM/TPM budget, retries with jittered backoff, coalescing of identical
+    # in-flight requests and a circuit breaker that fails fast when upstream is saturated.
+    # Background requests get the budget players leave over: they wait while a player's
+    # request is queued, and never dig into the last BACKGROUND_HEADROOM of a bucket.
+
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES,
+                 max_queue_wait=MAX_QUEUE_WAIT, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+                 background_headroom=BACKGROUND_HEADROOM, background_max_wait=BACKGROUND_MAX_WAIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.max_queue_wait = max_queue_wait
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.background_headroom = background_headroom
+        self.background_max_wait = background_max_wait
+        self.failures = 0
+        self.open_until = 0.0
+        self._inflight = {}
+        self._queued = 0  # foreground requests sleeping for budget
+        self.stats = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0,
+                      "rate_limited": 0, "saturated": 0, "circuit_opened": 0, "background": 0, "deferred": 0}
+
+    @property
+    def circuit_open(self):
+        return time.monotonic() < self.open_until
+
+    async def run(self, call, kwargs, coalesce=True, info=None, background=False):
+        # call(**kwargs) is the coroutine function doing the upstream request.
+        # Streams can't be shared between callers, so they pass coalesce=False.
+        # info, if given, receives "retries" and "coalesced" for this caller.
+        # background=True queues the request behind every foreground one (see _reserve_spare).
+        self.stats["requests"] += 1
+        self.stats["background"] += background
+        info = info if info is not None else {}
+        if not coalesce:
+            return await self._run(call, kwargs, info, background)
+        # A player's request never waits on a background one at background priority
+        key = (background, request_key(kwargs))
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.stats["coalesced"] += 1
+            info["coalesced"] = True
+        else:
+            task = asyncio.ensure_future(self._run(call, kwargs, info, background))
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            # Cancel the shared request only once every caller waiting on it has gone
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    async def _reserve(self, cost):
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+        if wait > self.max_queue_wait:
+            self.stats["saturated"] += 1
+            raise Saturated(f"rate limit budget exhausted for {wait:.0f}s")
+        # Take the budget before sleeping so later requests queue up behind this one
+        self.requests.take(1)
+        self.tokens.take(cost)
+        if wait:
+            self._queued += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._queued -= 1
+
+    async def _reserve_spare(self, cost):
+        # Background budget: taken only when no foreground request is queued and the
+        # buckets keep their headroom afterwards; polled until then
+        deadline = time.monotonic() + self.background_max_wait
+        for polls in itertools.count():
+            wait = max(self.requests.wait_time(1, self.requests.capacity * self.background_headroom),
+                       self.tokens.wait_time(cost, self.tokens.capacity * self.background_headroom))
+            if not wait and not self._queued:
+                self.requests.take(1)
+                self.tokens.take(cost)
+                return
+            if time.monotonic() >= deadline:
+                self.stats["saturated"] += 1
+                raise Saturated(f"no spare rate limit budget for {self.background_max_wait:.0f}s")
+            self.stats["deferred"] += polls == 0
+            await asyncio.sleep(min(wait, BACKGROUND_POLL) or BACKGROUND_POLL)
+
+    async def _run(self, call, kwargs, info, background=False):
+        cost = estimate_tokens(kwargs)
+        for attempt in range(self.max_retries + 1):
+            info["retries"] = attempt
+            # Checked before every attempt so queued retries stop once the circuit opens
+            if self.circuit_open:
+                self.stats["saturated"] += 1
+                raise Saturated("circuit open: upstream is failing or rate limited")
+            await (self._reserve_spare(cost) if background else self._reserve(cost))
+            self.stats["upstream_calls"] += 1
+            try:
+                result = await call(**kwargs)
+            except Exception as error:
+                if getattr(error, "status_code", None) == 429:
+                    self.stats["rate_limited"] += 1
+                if not _retryable(error):
+                    raise
+                self._record_failure()
+                if attempt == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                delay = _retry_after(error)
+                if delay is None:
+                    # Full jitter: spread retries out so sessions don't retry in lockstep
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                await asyncio.sleep(delay)
+            else:
+                self.failures = 0
+                return result
+
+    def _record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.failures = 0
+            if not self.circuit_open:
+                self.stats["circuit_opened"] += 1
+            self.open_until = time.monotonic() + self.cooldown
@@ -1,171 +1,275 @@
-import time
+import config  # loads .env once, before the modules below read their settings
+import argparse
+import asyncio
+import math
+import sys
 import threading
+import uuid
+from functools import partial
 
-from groq import Groq
-from dotenv import load_dotenv
+import llm_gateway
 import os
+import getpass
+from question_bank import get_bank
+import question_pack
+from dedup import DedupIndex
+import engine
+import errors
+import output_parser
+import verification
+import event_log
+import prompts
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+client = llm_gateway.session()
 
 # Available themes
-themes = ["Science", "Movies", "Sports", "History", "Geography", 
-          "Chhatrapati Shivaji Maharaj", "Chhatrapati Sambhaji Maharaj"]
+themes = question_pack.with_pack_themes(["Science", "Movies", "Sports", "History", "Geography",
+                                         "Chhatrapati Shivaji Maharaj", "Chhatrapati Sambhaji Maharaj"],
+                                        engine.TIERS[0])
 
 # history_questions = []
 # Initialize history for each theme
-history_questions = {theme: [] for theme in themes}
-
-
-def generate_question(selected_theme):
-    prompt = f"""Generate one easy multiple-choice trivia question on the theme '{selected_theme}'. Take care that you don't repeat the question in {history_questions[selected_theme]}.
-    Do not give anything else than question and its options. No headings and greetings required
-    Output format:
-    Question: <text>
-    Options:
-    1. <option1>
-    2. <option2>
-    3. <option3>
-    4. <option4>
-    """
-
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a trivia quiz generator."},
-            {"role": "user", "content": prompt}
-        ],
-        model="llama3-8b-8192"
-    )
-    generate_question = chat_completion.choices[0].message.content
+history_questions = {theme: DedupIndex() for theme in themes}
+bank = get_bank()
+player = getpass.getuser()
+
+
+def generate_question(selected_theme, difficulty="Easy"):
+    # Prompt written by prompts.py (PROMPT_STRATEGY)
+    request = prompts.question_request(selected_theme, history_questions[selected_theme], difficulty,
+                                       model="llama3-8b-8192")
+
+    # Only a few recent questions go into the prompt, so reject repeats here
+    for _ in range(3):
+        chat_completion = client.chat.completions.create(**request)
+        generate_question = chat_completion.choices[0].message.content
+        if generate_question.strip().split("\n")[0] not in history_questions[selected_theme]:
+            break
     return generate_question
 
-def generate_answer(question):
-    prompt = f"""Please answer this question = {question}
-    output format:
-    <1-4>
-    
-    Do not give anything else than the option number of correct answer. I want only the option number
-    
-    For example, if 2nd option is correct then reply with '2' only
-    """
-
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a trivia quiz answerer."},
-            {"role": "user", "content": prompt}
-        ],
-        model="llama3-8b-8192"
-    )
-
-    correct_answer = chat_completion.choices[0].message.content
-    return correct_answer
-
-
-# Shared variables
+def next_question(selected_theme, difficulty):
+    # Runs in a worker thread while the previous question's clock is running.
+    # Returns None when neither Groq nor the question bank can provide a question.
+    item = question_pack.draw(player, selected_theme, difficulty)
+    if item is not None:
+        return engine.Question.from_item(item)
+    drawn = bank.draw(player, selected_theme, difficulty, exclude=history_questions[selected_theme])
+    if drawn:
+        return engine.Question.from_item(drawn[0])
+    try:
+        # The answer key is a majority vote of parallel answer calls; no consensus means a new question
+        question = engine.Question.from_item(output_parser.parse_question(*verification.generate_verified(
+            client, lambda: generate_question(selected_theme, difficulty), selected_theme, difficulty)))
+        bank.record(player, selected_theme, difficulty, question.to_item())
+        return question
+    except errors.QuestionUnavailable:
+        # Groq is saturated or down (or the game's token budget is spent): replay a stored question from an earlier game
+        drawn = bank.draw(player, selected_theme, difficulty, exclude=history_questions[selected_theme],
+                          include_seen=True)
+        return engine.Question.from_item(drawn[0]) if drawn else None
+
+
+# Seconds to answer each question
 time_limit = 20
-user_answer = None
-time_up = False
-stop_timer = False
-
-def countdown():
-    global time_up
-    for t in range(time_limit, 0, -1):
-        if stop_timer:  # stop counting if answer given
+
+
+class Terminal:
+    # Line input as awaitables on the event loop. stdin goes through the selector
+    # (loop.add_reader) where the platform supports it, otherwise one reader thread
+    # for the whole run. With a script, lines are typed by a timed feeder instead.
+
+    def __init__(self, script=None):
+        self.loop = asyncio.get_running_loop()
+        self.lines = asyncio.Queue()
+        self.script = script
+        self.started = self.loop.time()
+        self.prompts = 0  # bumped on every ask(), so the script knows which prompt it answers
+        self._asking = asyncio.Event()
+        self._buffer = b""
+        if script is not None:
+            self._feeder = self.loop.create_task(self._type_script())
+            return
+        try:
+            self.loop.add_reader(sys.stdin.fileno(), self._readable)
+        except (NotImplementedError, OSError, ValueError):
+            # Windows consoles and regular files can't be watched by the selector
+            threading.Thread(target=self._read_blocking, daemon=True).start()
+
+    def _readable(self):
+        data = os.read(sys.stdin.fileno(), 4096)
+        if not data:
+            self.loop.remove_reader(sys.stdin.fileno())
+            self.lines.put_nowait(None)
             return
-        print(f"⏳ Time left: {t} seconds", end='\r', flush=True)
-        time.sleep(1)
-    # print("I AM HERE")
-    time_up = True
-    print("\n⏰ Time's up!")
+        *complete, self._buffer = (self._buffer + data).split(b"\n")
+        for line in complete:
+            self.lines.put_nowait(line.decode(errors="replace").rstrip("\r"))
 
+    def _read_blocking(self):
+        for line in sys.stdin:
+            self.loop.call_soon_threadsafe(self.lines.put_nowait, line.rstrip("\r\n"))
+        self.loop.call_soon_threadsafe(self.lines.put_nowait, None)
 
-def get_answer():
-    global user_answer, stop_timer
-    try:
-        ans = input("\nEnter your answer (1-4): ")
-        if not time_up:
-            stop_timer = True  # stop the countdown when user answers
-            if ans.strip().isdigit():
-                user_answer = int(ans)
+    async def _type_script(self):
+        # Each script line is "<seconds after the prompt appears> <text>"
+        for entry in self.script:
+            delay, _, text = entry.strip().partition(" ")
+            await self._asking.wait()
+            self._asking.clear()
+            prompt = self.prompts
+            await asyncio.sleep(float(delay))
+            if prompt != self.prompts or self.lines.qsize():
+                # The prompt timed out before we "typed": the keystrokes are lost
+                self.trace(f"input {text!r} arrived after its prompt closed")
+                continue
+            self.lines.put_nowait(text)
+        self.lines.put_nowait(None)
+
+    def trace(self, event):
+        # Timestamped events, printed in scripted mode so timing can be checked
+        if self.script is not None:
+            print(f"\n[{self.loop.time() - self.started:9.3f}s] {event}", flush=True)
+
+    def discard(self):
+        # Drop anything typed while no prompt was open (e.g. after "Time's up!")
+        if sys.stdin.isatty():
+            while not self.lines.empty():
+                self.lines.get_nowait()
+
+    async def ask(self, prompt, deadline=None):
+        # Raises asyncio.TimeoutError at the deadline (loop.time() based) and EOFError
+        # when input ends; a timed-out prompt stops waiting immediately
+        self.discard()
+        print(prompt, end="", flush=True)
+        self.prompts += 1
+        self._asking.set()
+        if deadline is None:
+            line = await self.lines.get()
         else:
-            user_answer = None
-    except:
-        user_answer = None
-
-# Game logic
-question_count=1
-while True:
-    question_count+=1
+            line = await asyncio.wait_for(self.lines.get(), max(0.0, deadline - self.loop.time()))
+        if line is None:
+            raise EOFError
+        if self.script is not None:
+            print(line)
+        return line.strip()
+
+
+async def countdown(deadline):
+    # Redraws on whole seconds of the time left; the deadline itself is enforced by ask()
+    loop = asyncio.get_running_loop()
+    while (left := deadline - loop.time()) > 0:
+        print(f"\r⏳ Time left: {math.ceil(left):2d} seconds ", end="", flush=True)
+        await asyncio.sleep(left - math.floor(left) or 1.0)
+
+
+async def choose_theme(terminal):
     print("Available themes:")
     for idx, theme in enumerate(themes, start=1):
         print(f"{idx}. {theme}")
 
-    selected_theme = ""
-    theme_choice = input("Choose a theme by entering its number: ").strip()
+    theme_choice = await terminal.ask("Choose a theme by entering its number: ")
     if theme_choice.isdigit() and 1 <= int(theme_choice) <= len(themes):
         selected_theme = themes[int(theme_choice)-1]
-        print(f"\nYou selected: {selected_theme}\n")
     else:
         print("Invalid choice, defaulting to 'Science'")
         selected_theme = "Science"
-        print(f"\nYou selected: {selected_theme}\n")
-
-    winnings = 0
-    for i in range(5):  # for example, 5 questions
-    # Reset variables for new question
-        user_answer = None
-        time_up = False
-        stop_timer = False  # important
-    
-    print(selected_theme)
-    generated_question = generate_question(selected_theme)
-    if generated_question:
-        history_questions[selected_theme].append(generated_question)
-    
-    correct_answer =int(generate_answer(generated_question))
-
-    #user_answer = None
-    #time_up = False
-     # Parse the question to get correct_answer
-
-# print("\n--------------------------------")
-    print(f"Question {i+1}")
-# print(question[0:-10])
-    print("\n--------------------------------")
-    print(generated_question)
-    print("\n--------------------------------")
-    
-    # Start timer in parallel
-    timer_thread = threading.Thread(target=countdown)
-    timer_thread.start()
-    
-    # <<< change: start input in a separate thread (so timer can stop it)
-    input_thread = threading.Thread(target=get_answer)
-    input_thread.start()
-
-    # Wait for timer to finish
-    timer_thread.join()
-    input_thread.join()
-    
-     # Check the answer
-    if time_up and user_answer is None:
-        print("❌ You ran out of time!")
-        print(f"You won ₹{winnings}.")
-        play_again = input("\nDo you want to play again? (y/n): ").strip().lower()
-        if play_again != "y":
-            exit()  # Stop everything
-        else:
-            break  # just exit silently
-    elif user_answer == correct_answer:
-        print("✅ Correct Answer!")
-        winnings += 1000
-    else:
-        print(f"❌ Wrong Answer! The correct answer was {correct_answer}.")
-        print(f"You won ₹{winnings}.")    
+    print(f"\nYou selected: {selected_theme}\n")
+    return selected_theme
 
 
-        play_again = input("\nDo you want to play again? (y/n): ").strip().lower()
-        if play_again != "y":
-          exit()  # Stop everything
-        else:
-            break  # just exit silently
+async def play_game(terminal, selected_theme):
+    # A wrong answer or running out of time ends the game
+    game = engine.new_game(selected_theme, sudden_death=True)
+    # Calls made for this game count against GAME_TOKEN_BUDGET
+    client.budget = prompts.Budget()
+    log = partial(event_log.emit, game_id=uuid.uuid4().hex, player=player, theme=selected_theme)
+    upcoming = asyncio.ensure_future(asyncio.to_thread(next_question, selected_theme, engine.tier(game)))
+    try:
+        while not game.finished:
+            question = await upcoming
+            if question is None:
+                print("⚠️ The question service is busy right now. Please try again in a minute.")
+                break
+            game = engine.present(game, question)
+            history_questions[selected_theme].append(question.text)
+            # Generate the next question while the player thinks about this one. A wrong answer
+            # ends the game, so its tier is the one that follows a right answer.
+            if game.q_count + 1 < game.length:
+                upcoming = asyncio.ensure_future(asyncio.to_thread(next_question, selected_theme,
+                                                                   engine.next_tier(game)))
+
+            print(f"Question {game.q_count + 1} ({engine.tier(game)}, for ₹{engine.playing_for(game):,})")
+            print("\n--------------------------------")
+            print(f"Question: {question.text}")
+            print("Options:")
+            for number, option in enumerate(game.options, start=1):
+                print(f"{number}. {option}")
+            print("\n--------------------------------")
+
+            deadline = terminal.loop.time() + time_limit
+            terminal.trace("question shown")
+            log(event_log.QUESTION_SERVED, q_index=game.q_count, question=question.text, difficulty=engine.tier(game))
+            ticker = asyncio.ensure_future(countdown(deadline)) if sys.stdout.isatty() else None
+            try:
+                reply = await terminal.ask("\nEnter your answer (1-4): ", deadline)
+            except asyncio.TimeoutError:
+                reply = None
+            finally:
+                if ticker is not None:
+                    ticker.cancel()
+
+            if reply is None:
+                terminal.trace("time up")
+                game = engine.forfeit(game)
+                log(event_log.ANSWER_SUBMITTED, q_index=game.q_count - 1, choice=None, correct=False,
+                    latency_ms=round(time_limit * 1000))
+                print("\n⏰ Time's up!")
+                print("❌ You ran out of time!")
+                break
+            terminal.trace(f"answer {reply!r} with {deadline - terminal.loop.time():.3f}s left")
+            # Options are numbered in the order they were shown
+            shown = int(reply) if reply.isdigit() and 1 <= int(reply) <= len(game.visible) else 0
+            game = engine.answer(game, game.visible[shown - 1] + 1) if shown else engine.forfeit(game)
+            log(event_log.ANSWER_SUBMITTED, q_index=game.q_count - 1, choice=reply, correct=game.last,
+                latency_ms=round((time_limit - (deadline - terminal.loop.time())) * 1000))
+            if game.last:
+                print("✅ Correct Answer!")
+            else:
+                print(f"❌ Wrong Answer! The correct answer was {question.answer}.")
+    finally:
+        # The game ended early: drop the question being generated for it
+        if not upcoming.done():
+            upcoming.cancel()
+            client.cancel()
+        log(event_log.GAME_FINISHED, score=game.score, length=game.length, questions=game.q_count,
+            tokens=client.budget.spent)
+    return game
+
+
+async def run(script=None):
+    terminal = Terminal(script)
+    try:
+        while True:
+            game = await play_game(terminal, await choose_theme(terminal))
+            print(f"You won ₹{engine.prize(game):,}.")
+            play_again = await terminal.ask("\nDo you want to play again? (y/n): ")
+            if play_again.lower() != "y":
+                break
+    except EOFError:
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Millionaire quiz in the terminal")
+    parser.add_argument("--time-limit", type=float, default=time_limit, help="seconds to answer each question")
+    parser.add_argument("--script", help="test mode: read timed input lines ('<delay> <text>') from this file")
+    args = parser.parse_args()
+    time_limit = args.time_limit
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = [line for line in f if line.strip()]
+    try:
+        asyncio.run(run(script))
+    except KeyboardInterrupt:
+        print()
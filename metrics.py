@@ -0,0 +1,175 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+# Samples kept per operation; older ones drop off the ring buffer
+BUFFER_SIZE = int(os.getenv("METRICS_BUFFER", "1024"))
+METRICS_PATH = os.getenv("METRICS_PATH", "metrics.prom")
+DUMP_INTERVAL = 15.0
+
+FIELDS = ("prompt_tokens", "completion_tokens", "retries", "cache_hits")
+
+_lock = threading.Lock()
+_samples = {}  # op -> deque of (seconds, fields dict, ok)
+_totals = {}  # op -> {"count", "seconds", field...} since process start
+_gauges = {}  # (name, sorted label items) -> latest value
+_counters = {}  # (name, sorted label items) -> total since process start
+_current = contextvars.ContextVar("metrics_span", default=None)
+_last_dump = 0.0
+
+
+class Span:
+    def __init__(self, name):
+        self.name = name
+        self.fields = dict.fromkeys(FIELDS, 0)
+        self.parent = _current.get()
+        self._token = None
+        self._start = 0.0
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        _current.reset(self._token)
+        # st.rerun()/st.stop() exit through exceptions, so only real errors count as failures
+        ok = exc_type is None or not issubclass(exc_type, Exception)
+        record(self.name, elapsed, ok=ok, **self.fields)
+        if self.parent is not None:
+            for field, value in self.fields.items():
+                self.parent.fields[field] += value
+        return False
+
+
+def timed(name):
+    # with metrics.timed("save_highscore"): ...
+    return Span(name)
+
+
+def instrument(name=None):
+    # Decorator form of timed()
+    def wrap(fn):
+        op = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with Span(op):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def note(**fields):
+    # Attach token counts, retries or cache hits to the innermost open span
+    span = _current.get()
+    if span is not None:
+        for field, value in fields.items():
+            span.fields[field] = span.fields.get(field, 0) + value
+
+
+def note_usage(response):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        note(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+
+
+def record(op, seconds, ok=True, **fields):
+    with _lock:
+        _samples.setdefault(op, deque(maxlen=BUFFER_SIZE)).append((seconds, fields, ok))
+        totals = _totals.setdefault(op, {"count": 0, "errors": 0, "seconds": 0.0, **dict.fromkeys(FIELDS, 0)})
+        totals["count"] += 1
+        totals["errors"] += not ok
+        totals["seconds"] += seconds
+        for field, value in fields.items():
+            totals[field] = totals.get(field, 0) + value
+
+
+def gauge(name, value, **labels):
+    # Point-in-time values (queue depths and the like), exported as Prometheus gauges
+    with _lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = value
+
+
+def count(name, value=1, **labels):
+    # Event totals (parse outcomes and the like), exported as Prometheus counters
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summary():
+    # One row per operation: latency percentiles over the ring buffer plus lifetime totals
+    with _lock:
+        snapshot = {op: sorted(s for s, _, _ in samples) for op, samples in _samples.items()}
+        totals = {op: dict(t) for op, t in _totals.items()}
+    rows = []
+    for op in sorted(snapshot):
+        ordered = snapshot[op]
+        rows.append({
+            "op": op,
+            "calls": totals[op]["count"],
+            "errors": totals[op]["errors"],
+            "p50 ms": round(_quantile(ordered, 0.50) * 1000, 1),
+            "p95 ms": round(_quantile(ordered, 0.95) * 1000, 1),
+            "p99 ms": round(_quantile(ordered, 0.99) * 1000, 1),
+            **{field: totals[op].get(field, 0) for field in FIELDS},
+        })
+    return rows
+
+
+def prometheus_text():
+    lines = [
+        "# HELP quiz_latency_seconds Wall time per operation over the recent sample window.",
+        "# TYPE quiz_latency_seconds summary",
+    ]
+    with _lock:
+        snapshot = {op: sorted(s for s, _, _ in samples) for op, samples in _samples.items()}
+        totals = {op: dict(t) for op, t in _totals.items()}
+        gauges = dict(_gauges)
+        counters = dict(_counters)
+    for op in sorted(snapshot):
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f'quiz_latency_seconds{{op="{op}",quantile="{q}"}} {_quantile(snapshot[op], q):.6f}')
+        lines.append(f'quiz_latency_seconds_sum{{op="{op}"}} {totals[op]["seconds"]:.6f}')
+        lines.append(f'quiz_latency_seconds_count{{op="{op}"}} {totals[op]["count"]}')
+    lines += ["# HELP quiz_errors_total Operations that raised.", "# TYPE quiz_errors_total counter"]
+    lines += [f'quiz_errors_total{{op="{op}"}} {totals[op]["errors"]}' for op in sorted(totals)]
+    for field in FIELDS:
+        lines += [f"# TYPE quiz_{field}_total counter"]
+        lines += [f'quiz_{field}_total{{op="{op}"}} {totals[op].get(field, 0)}' for op in sorted(totals)]
+    for kind, values in (("gauge", gauges), ("counter", counters)):
+        for name in sorted({name for name, _ in values}):
+            lines.append(f"# TYPE {name} {kind}")
+            for (value_name, labels), value in sorted(values.items()):
+                if value_name == name:
+                    label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                    lines.append(f"{name}{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path=METRICS_PATH):
+    # Atomic replace so a scraper never reads a half-written file; the temp name is per
+    # writer because several sessions (or bench processes) can dump at the same moment
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def maybe_dump(path=METRICS_PATH, interval=DUMP_INTERVAL):
+    global _last_dump
+    now = time.monotonic()
+    if now - _last_dump >= interval:
+        _last_dump = now
+        dump(path)
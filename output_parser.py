@@ -0,0 +1,222 @@
+import json
+import re
+import threading
+from collections import Counter
+
+import metrics
+from errors import MalformedOutput, QuestionUnavailable
+
+# Tolerant parsing of generated questions. Replies are read with a small line grammar
+# (or as JSON when they look like JSON) that accepts the usual drift: a chatty preamble,
+# "Q:" or **Question:** labels, "1)" / "A." / "(b)" numbering, bullets, code fences,
+# options out of order. What can be repaired locally is; when only options are missing
+# one short call asks for just those. Outcomes are counted per source so the debug
+# panel can show how often replies needed repair or were lost.
+#
+#   python fuzz_parser.py      # replays parser_corpus.jsonl plus random mutations
+
+DEFAULT_EXPLANATION = "No explanation available."
+FIX_MODEL = "llama-3.1-8b-instant"
+OUTCOMES = ("clean", "repaired", "fixed", "failed")
+# Replies missing more options than this are regenerated rather than patched
+MAX_MISSING = 2
+
+_FENCE = re.compile(r"^```[\w-]*\s*$")
+_MARKUP = re.compile(r"^[#>\s]+|\*\*|__")
+_QUESTION = re.compile(r"^(?:question|q)\s*\d*\s*[:.)-]\s*(.*)$", re.IGNORECASE)
+_OPTION = re.compile(r"^(?:[-*•]\s*)?(?:option\s*)?\(?([1-4a-dA-D])\s*[.):\]-]\s*(.+)$", re.IGNORECASE)
+_BULLET = re.compile(r"^[-*•]\s+(.+)$")
+_OPTIONS_HEADER = re.compile(r"^(?:options|choices)\s*:?$", re.IGNORECASE)
+_EXPLANATION = re.compile(r"^(?:explanation|reason|rationale)\s*[:.-]\s*(.*)$", re.IGNORECASE)
+_ANSWER = re.compile(r"^(?:correct\s+)?answer\s*[:.-]", re.IGNORECASE)
+_ALIASES = {
+    "question": ("question", "q", "prompt", "text"),
+    "options": ("options", "choices", "answers"),
+    "explanation": ("explanation", "reason", "rationale"),
+}
+
+_lock = threading.Lock()
+_outcomes = Counter()  # (source, outcome) -> replies
+
+
+def _slot(label):
+    return int(label) - 1 if label.isdigit() else "abcd".index(label.lower())
+
+
+def entry(data):
+    # One JSON question with renamed keys, options as a dict or "a|b|c|d", and the answer
+    # as a letter or the option text, mapped to the shape validate_item() expects
+    field = {name: next((data[key] for key in keys if data.get(key) not in (None, "")), None)
+             for name, keys in _ALIASES.items()}
+    options = field["options"]
+    if isinstance(options, dict):
+        options = [options[key] for key in sorted(options)]
+    if isinstance(options, str):
+        options = options.split("|")
+    options = [str(opt).strip() for opt in options or [] if str(opt).strip()] if isinstance(options, list) else []
+    correct = next((data[key] for key in ("correct", "answer", "correct_answer") if key in data), None)
+    if isinstance(correct, str):
+        correct = correct.strip()
+        if correct in options:
+            correct = options.index(correct) + 1
+        elif len(correct) == 1 and correct.lower() in "abcd1234":
+            correct = _slot(correct) + 1
+    return {"question": str(field["question"] or "").strip(), "options": options, "correct": correct,
+            "explanation": str(field["explanation"] or "").strip()}
+
+
+def _from_json(content):
+    # First entry of a JSON reply: {"question": ...}, {"questions": [...]} or a bare list
+    start = min((i for i in (content.find("{"), content.find("[")) if i != -1), default=-1)
+    try:
+        data = json.loads(content[start:]) if start != -1 else None
+    except json.JSONDecodeError:
+        return None
+    if isinstance(data, dict) and isinstance(data.get("questions"), list):
+        data = data["questions"]
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return entry(data) if isinstance(data, dict) else None
+
+
+def _from_text(content):
+    question, explanation = "", []
+    options = []  # (slot, text); slot is None for bullets
+    loose = []  # unlabelled lines before the options, the last one is usually the question
+    section = "question"
+    for raw in content.splitlines():
+        line = _MARKUP.sub("", raw).strip()
+        if not line or _FENCE.match(line) or _ANSWER.match(line):
+            continue
+        label = _QUESTION.match(line)
+        if label and not question:
+            # The text can also be on the line after a bare "Question:"
+            question, section = label.group(1).strip(), "question"
+            continue
+        if _OPTIONS_HEADER.match(line):
+            section = "options"
+            continue
+        label = _EXPLANATION.match(line)
+        if label:
+            explanation, section = [label.group(1).strip()], "explanation"
+            continue
+        option = _OPTION.match(line)
+        if option and section != "explanation" and (question or loose or section == "options"):
+            slot = _slot(option.group(1))
+            if slot not in {s for s, _ in options}:
+                options.append((slot, option.group(2).strip()))
+            section = "options"
+            continue
+        bullet = _BULLET.match(line)
+        if bullet and section == "options":
+            options.append((None, bullet.group(1).strip()))
+        elif section == "explanation":
+            explanation.append(line)
+        elif not options and not question:
+            loose.append(line)
+        elif section == "question" and not options:
+            question = f"{question} {line}"
+    if not question and loose:
+        asked = [line for line in loose if line.endswith("?")]
+        question = (asked or loose)[-1]
+    if all(slot is not None for slot, _ in options):
+        options.sort()  # numbered out of order
+    return {"question": question.strip(), "options": [text for _, text in options],
+            "explanation": " ".join(explanation).strip()}
+
+
+def read(content):
+    # Best-effort parse with local repairs only. Returns (item, repairs): item has question,
+    # options (0-4, deduplicated) and explanation; repairs names what had to be fixed.
+    content = (content or "").strip()
+    repairs = []
+    item = None
+    if content.startswith(("{", "[", "```json")):
+        item = _from_json(content.replace("```json", "").replace("```", ""))
+        if item is None:
+            repairs.append("json")
+    if item is None:
+        item = _from_text(content)
+        if not content.startswith("Question:") or not re.search(r"^1\. ", content, re.MULTILINE):
+            repairs.append("layout")
+    unique = []
+    for option in item["options"]:
+        if option.lower() not in {o.lower() for o in unique}:
+            unique.append(option)
+    if len(unique) < len(item["options"]):
+        repairs.append("duplicates")
+    if len(unique) > 4:
+        repairs.append("extra options")
+    item["options"] = unique[:4]
+    # Some prompts don't ask for one, so a missing explanation isn't a repair
+    item["explanation"] = item["explanation"] or DEFAULT_EXPLANATION
+    return item, repairs
+
+
+def parse_question(q_data, correct):
+    # A question dict from text in the format_question() layout (or a drifted one read()
+    # repairs) and its answer key
+    item, _ = read(q_data)
+    if not item["question"] or len(item["options"]) != 4 or correct not in (1, 2, 3, 4):
+        raise MalformedOutput(f"not a complete question: {q_data[:80]!r}")
+    return dict(item, correct=correct)
+
+
+def fix_request(item, theme):
+    # Just the missing options, not a whole new question
+    missing = 4 - len(item["options"])
+    listed = "\n".join(f"- {opt}" for opt in item["options"]) or "(none)"
+    prompt = (f"This multiple-choice question about {theme} lost some of its options.\n"
+              f"Question: {item['question']}\nOptions it still has:\n{listed}\n"
+              f"Write {missing} more answer option(s), one per line, no numbering. If none of the "
+              f"options above is the right answer, one of yours must be.")
+    return {
+        "messages": [{"role": "system", "content": "You complete trivia questions."},
+                     {"role": "user", "content": prompt}],
+        "model": FIX_MODEL,
+        "temperature": 0.3,
+        "max_tokens": 20 * missing,
+    }
+
+
+def record(source, outcome):
+    with _lock:
+        _outcomes[(source, outcome)] += 1
+    metrics.count("quiz_parse_outcomes_total", source=source, outcome=outcome)
+
+
+def parse(content, client=None, theme="trivia", source="text"):
+    # A complete question dict (question, 4 options, explanation; no answer key).
+    # Raises MalformedOutput when the reply can't be saved, so the caller regenerates.
+    item, repairs = read(content)
+    outcome = "repaired" if repairs else "clean"
+    if item["question"] and 4 - MAX_MISSING <= len(item["options"]) < 4 and client is not None:
+        try:
+            reply = client.chat.completions.create(**fix_request(item, theme)).choices[0].message.content
+        except QuestionUnavailable:
+            reply = ""
+        extra, _ = read("Options:\n" + "\n".join(f"- {line}" for line in (reply or "").splitlines()))
+        for option in extra["options"]:
+            if len(item["options"]) < 4 and option.lower() not in {o.lower() for o in item["options"]}:
+                item["options"].append(option)
+        outcome = "fixed"
+    if not item["question"] or len(item["options"]) < 4:
+        record(source, "failed")
+        raise MalformedOutput(f"unusable {source} reply: {len(item['options'])} options, "
+                              f"question {'found' if item['question'] else 'missing'}")
+    record(source, outcome)
+    return item
+
+
+def stats():
+    # One row per source for the debug panel
+    with _lock:
+        counts = dict(_outcomes)
+    rows = []
+    for source in sorted({source for source, _ in counts}):
+        row = {"source": source, **{outcome: counts.get((source, outcome), 0) for outcome in OUTCOMES}}
+        total = sum(row[outcome] for outcome in OUTCOMES)
+        row["repair rate"] = round((row["repaired"] + row["fixed"]) / total, 3)
+        row["failure rate"] = round(row["failed"] / total, 3)
+        rows.append(row)
+    return rows
@@ -0,0 +1,145 @@
+# Per-player aggregates over the score log, kept next to it in the highscores database.
+# Every saved game updates its player's (name, theme) row and the "all themes" row in
+# the same transaction, so the leaderboard never has to scan the scores. best_counts
+# holds how many players have each best score per theme; scores only go up to the
+# game length, so a player's rank and percentile come from a handful of rows.
+# Bulk loads and rebuilds aggregate with pandas groupbys instead of row by row.
+
+ALL = "*"  # theme key of the aggregates over every theme
+REBUILD_CHUNK = 500_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_stats (
+    name TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    best INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    last_at REAL NOT NULL,
+    PRIMARY KEY (name, theme)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_player_stats_rank ON player_stats (theme, best DESC, mean DESC, name);
+CREATE TABLE IF NOT EXISTS best_counts (
+    theme TEXT NOT NULL,
+    best INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    PRIMARY KEY (theme, best)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO player_stats (name, theme, games, total, best, mean, last_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (name, theme) DO UPDATE SET
+    games = games + excluded.games,
+    total = total + excluded.total,
+    best = max(best, excluded.best),
+    mean = (total + excluded.total) * 1.0 / (games + excluded.games),
+    last_at = max(last_at, excluded.last_at)
+"""
+
+
+def _bump(conn, theme, best, delta):
+    conn.execute("INSERT INTO best_counts (theme, best, players) VALUES (?, ?, ?) "
+                 "ON CONFLICT (theme, best) DO UPDATE SET players = players + excluded.players",
+                 (theme, best, delta))
+
+
+def record(conn, name, theme, score, created_at):
+    # One finished game; the caller holds the transaction the score row was written in
+    for key in (ALL, theme) if theme else (ALL,):
+        old = conn.execute("SELECT best FROM player_stats WHERE name = ? AND theme = ?", (name, key)).fetchone()
+        conn.execute(UPSERT, (name, key, 1, score, score, float(score), created_at))
+        if old is None:
+            _bump(conn, key, score, 1)
+        elif score > old[0]:
+            _bump(conn, key, old[0], -1)
+            _bump(conn, key, score, 1)
+
+
+def _upsert(conn, frame):
+    # frame: name, theme, score, created_at columns. Returns the themes it touched.
+    import pandas as pd
+
+    frame = pd.concat([frame.assign(theme=ALL), frame[frame["theme"] != ""]], ignore_index=True)
+    agg = frame.groupby(["name", "theme"], sort=False).agg(
+        games=("score", "size"), total=("score", "sum"), best=("score", "max"), last_at=("created_at", "max"))
+    agg["mean"] = agg["total"] / agg["games"]
+    agg = agg.reset_index()[["name", "theme", "games", "total", "best", "mean", "last_at"]]
+    conn.executemany(UPSERT, agg.itertuples(index=False, name=None))
+    return set(agg["theme"].unique())
+
+
+def _recount(conn, themes):
+    for theme in themes:
+        conn.execute("DELETE FROM best_counts WHERE theme = ?", (theme,))
+        conn.execute("INSERT INTO best_counts (theme, best, players) "
+                     "SELECT theme, best, COUNT(*) FROM player_stats WHERE theme = ? GROUP BY best", (theme,))
+
+
+def merge(conn, frame):
+    # Adds a batch of new games (a DataFrame) in one vectorized pass
+    if len(frame):
+        _recount(conn, _upsert(conn, frame))
+
+
+def rebuild(conn):
+    # Recomputes every aggregate from the score log, a chunk at a time
+    import pandas as pd
+
+    conn.execute("DELETE FROM player_stats")
+    conn.execute("DELETE FROM best_counts")
+    themes = set()
+    for chunk in pd.read_sql_query("SELECT name, theme, score, created_at FROM scores", conn,
+                                   chunksize=REBUILD_CHUNK):
+        themes |= _upsert(conn, chunk)
+    _recount(conn, themes)
+
+
+def is_empty(conn):
+    return conn.execute("SELECT 1 FROM player_stats LIMIT 1").fetchone() is None
+
+
+def _counts(conn, theme):
+    return conn.execute("SELECT best, players FROM best_counts WHERE theme = ? AND players > 0",
+                        (theme,)).fetchall()
+
+
+def players(conn, theme=ALL):
+    return sum(n for _, n in _counts(conn, theme))
+
+
+def themes(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT theme FROM best_counts WHERE theme != ?", (ALL,))]
+
+
+def leaderboard(conn, theme=ALL, page=0, size=10):
+    # One page of players, best score first, then the better average. Players with
+    # the same best score share a rank. The OFFSET walks the rank index alone (it covers
+    # name); only the page's rows are then read from the table, which keeps the last page
+    # of a million players in tens of milliseconds instead of seconds.
+    counts = _counts(conn, theme)
+    rows = conn.execute("SELECT p.name, p.best, p.mean, p.games FROM "
+                        "(SELECT name FROM player_stats WHERE theme = ? "
+                        " ORDER BY best DESC, mean DESC, name LIMIT ? OFFSET ?) AS page "
+                        "JOIN player_stats AS p ON p.theme = ? AND p.name = page.name "
+                        "ORDER BY p.best DESC, p.mean DESC, p.name",
+                        (theme, size, page * size, theme)).fetchall()
+    return [{"Rank": 1 + sum(n for b, n in counts if b > best), "Name": name, "Best": best,
+             "Average": round(mean, 2), "Games": games} for name, best, mean, games in rows]
+
+
+def standing(conn, name, theme=ALL):
+    # The player's row plus their rank and percentile rank among all players, or None
+    row = conn.execute("SELECT games, best, mean FROM player_stats WHERE name = ? AND theme = ?",
+                       (name, theme)).fetchone()
+    if row is None:
+        return None
+    games, best, mean = row
+    counts = _counts(conn, theme)
+    total = sum(n for _, n in counts)
+    above = sum(n for b, n in counts if b > best)
+    below = sum(n for b, n in counts if b < best)
+    ties = total - above - below
+    return {"rank": above + 1, "players": total, "percentile": round(100 * (below + ties / 2) / total, 1),
+            "best": best, "mean": round(mean, 2), "games": games}
@@ -0,0 +1,120 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from dedup import DedupIndex
+
+# One pool for the whole process; every session queues its look-ahead jobs here
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+
+
+def _title(q_data):
+    return q_data.split("\n")[0].replace("Question:", "").strip()
+
+
+class QuestionPrefetcher:
+    # Generates the next questions of a session in the background.
+    # produce(theme, history, difficulty=...) must return (question_data, correct_answer) and
+    # must not touch st.session_state, because it runs outside the script thread.
+    # Questions are queued per difficulty tier and only served at the tier they were made for;
+    # depth caps the look-ahead across all tiers, since only the next tier is known in advance.
+
+    def __init__(self, produce, depth=2):
+        self.produce = produce
+        self.depth = depth
+        self.theme = None
+        self._ready = {}  # difficulty -> deque of (question_data, correct_answer)
+        self._pending = {}  # difficulty -> deque of (future, number of questions it will return)
+        self._lock = threading.Lock()
+
+    def _job(self, produce, theme, difficulty, history, previous):
+        exclude = list(history)
+        if previous is not None:
+            # Chain jobs so each one knows what the job before it produced
+            try:
+                exclude.extend(_title(q_data) for q_data, _ in previous.result())
+            except Exception:
+                pass
+        result = produce(theme, exclude, difficulty=difficulty)
+        return result if isinstance(result, list) else [result]
+
+    def _queued(self, difficulty=None):
+        # Questions queued for one tier, or for all of them
+        tiers = self._ready.keys() | self._pending.keys() if difficulty is None else (difficulty,)
+        return sum(len(self._ready.get(tier, ())) + sum(size for _, size in self._pending.get(tier, ()))
+                   for tier in tiers)
+
+    def _submit(self, produce, theme, difficulty, history, size):
+        if theme != self.theme:
+            self._clear()
+            self.theme = theme
+        pending = self._pending.setdefault(difficulty, deque())
+        previous = pending[-1][0] if pending else None
+        future = _executor.submit(self._job, produce, theme, difficulty, list(history), previous)
+        pending.append((future, size))
+
+    def fill(self, theme, difficulty, history, limit=None, produce=None):
+        # Top up the look-ahead for one tier; limit caps it to the questions left in the game.
+        # Questions still queued for other tiers count towards depth, but the tier asked for
+        # always gets one. produce replaces the default for these jobs.
+        target = self.depth if limit is None else min(self.depth, max(limit, 0))
+        with self._lock:
+            if theme != self.theme:
+                self._clear()
+                self.theme = theme
+            while self._queued(difficulty) < min(target, 1) or self._queued() < target:
+                self._submit(produce or self.produce, theme, difficulty, history, 1)
+
+    def fill_batch(self, theme, difficulty, history, produce_batch, count):
+        # Queue one job that returns a whole list of questions at once
+        with self._lock:
+            self._submit(produce_batch, theme, difficulty, history, count)
+
+    def has_ready(self, theme, difficulty):
+        # True if take() can return without waiting on a generation
+        with self._lock:
+            if theme != self.theme:
+                return False
+            pending = self._pending.get(difficulty)
+            return bool(self._ready.get(difficulty)) or bool(pending and pending[0][0].done())
+
+    def take(self, theme, difficulty, history, produce=None):
+        # Return the next ready question of this tier that the player has not seen yet,
+        # generating one on the spot (with produce, if given) if nothing usable was prefetched.
+        # Questions queued for other tiers stay queued for when the ladder gets there.
+        seen = history if isinstance(history, DedupIndex) else DedupIndex(history)
+        while True:
+            with self._lock:
+                if theme != self.theme:
+                    break
+                ready = self._ready.get(difficulty)
+                if ready:
+                    q_data, correct = ready.popleft()
+                    if _title(q_data) not in seen:
+                        return q_data, correct
+                    continue
+                pending = self._pending.get(difficulty)
+                if not pending:
+                    break
+                future, _ = pending[0]
+            try:
+                results = future.result()
+            except Exception:
+                results = []
+            with self._lock:
+                if pending and pending[0][0] is future:
+                    pending.popleft()
+                    self._ready.setdefault(difficulty, deque()).extend(results)
+        return (produce or self.produce)(theme, list(history), difficulty=difficulty)
+
+    def _clear(self):
+        self._ready.clear()
+        for pending in self._pending.values():
+            while pending:
+                pending.popleft()[0].cancel()
+        self._pending.clear()
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+            self.theme = None
@@ -0,0 +1,210 @@
+import os
+import re
+import threading
+
+import metrics
+import output_parser
+from dedup import prompt_history
+from errors import BudgetExceeded
+from llm_scheduler import estimate_tokens, prompt_tokens
+
+# Prompts of the question calls (single, streamed, batch and the answer-key votes) and
+# their token cost. PROMPT_STRATEGY picks how they are written:
+#   verbose  instructions, format and history all in the user message (the original prompts)
+#   prefix   instructions and format in a system message that is the same for every call
+#            of a kind, so a provider prompt cache can reuse it; the user message only
+#            carries theme, difficulty and history
+#   compact  prefix, plus the history as a few keywords per past question, votes sent the
+#            question and options only (not the explanation, which gives the answer away)
+#            and every call capped with max_tokens
+# Each front-end gives a game a Budget on its LLM session; past GAME_TOKEN_BUDGET the
+# session refuses further calls and the game goes on with stored questions.
+#
+#   python bench_prompts.py      # tokens and latency per game for each strategy
+
+STRATEGIES = ("verbose", "prefix", "compact")
+STRATEGY = os.getenv("PROMPT_STRATEGY", "compact")
+# Tokens a game may spend on calls made for it; 0 only measures. bench_prompts puts a compact
+# game at ~2,600 tokens reserved (~1,600 used) and a CLI game spends ~2,600: the default
+# leaves room for regenerated and prefetched questions, not for a runaway loop.
+GAME_TOKEN_BUDGET = int(os.getenv("GAME_TOKEN_BUDGET", "6000"))
+MODEL = "llama-3.1-8b-instant"
+# compact: past questions quoted back, and content words kept of each
+COMPACT_ITEMS = 6
+COMPACT_WORDS = 5
+# compact: caps per call; a question with its explanation is ~100 tokens
+QUESTION_MAX_TOKENS = 250
+BATCH_MAX_TOKENS = 160  # per question
+ANSWER_MAX_TOKENS = 4
+
+_WORD = re.compile(r"[\w'-]+")
+_FILLER = frozenset("""a an the of in on at to for by with from and or as is was were are be been did does do
+    which what who whom whose when where why how name named this that these those its it his her their
+    first famous known called following""".split())
+
+FORMAT = """Output exactly in this format:
+Question: <question>
+Options:
+1. <option1>
+2. <option2>
+3. <option3>
+4. <option4>
+Explanation: <short explanation>"""
+
+BATCH_FORMAT = """Reply with JSON only, in exactly this shape:
+{"questions": [
+  {"question": "<question>",
+   "options": ["<option1>", "<option2>", "<option3>", "<option4>"],
+   "correct": <number 1-4 of the correct option>,
+   "explanation": "<short explanation>"}
+]}"""
+
+# Same text on every call of a kind: the stable prefix
+QUESTION_SYSTEM = ("You are a strict trivia question generator. Write ONE multiple-choice question that is "
+                   "factual, strictly about the theme and at the difficulty you are given, and different from "
+                   "the questions already asked.\n" + FORMAT)
+BATCH_SYSTEM = ("You are a strict trivia question generator that replies in JSON. Write multiple-choice "
+                "questions that are factual, strictly about the theme and at the difficulty you are given, "
+                "different from each other and from the questions already asked.\n" + BATCH_FORMAT)
+ANSWER_SYSTEM = "You are a trivia answerer. Output only the correct option number (1-4)."
+
+
+def history_keywords(titles, limit=COMPACT_ITEMS, words=COMPACT_WORDS):
+    # "Which fort did Shivaji Maharaj capture in 1646?" -> "fort Shivaji Maharaj capture 1646"
+    digests = []
+    for title in list(titles)[-limit:]:
+        kept = [word for word in _WORD.findall(title) if word.lower() not in _FILLER]
+        digests.append(" ".join(kept[:words]))
+    return "; ".join(digests) or "none"
+
+
+def answer_context(q_data):
+    # The question and its options; the explanation would give the answer away
+    item, _ = output_parser.read(q_data)
+    if not item["question"] or len(item["options"]) != 4:
+        return q_data
+    return "\n".join([item["question"]] + [f"{i}. {opt}" for i, opt in enumerate(item["options"], start=1)])
+
+
+def _request(kind, strategy, messages, **settings):
+    metrics.count("quiz_prompt_tokens_total", prompt_tokens(messages), kind=kind, strategy=strategy)
+    return {"messages": messages, **settings}
+
+
+def question_request(theme, history, difficulty="Easy", model=MODEL, strategy=None):
+    # create()/stream() arguments for one question in the output_parser layout
+    strategy = strategy or STRATEGY
+    if strategy == "verbose":
+        prompt = f"""
+    You are a quiz generator. Create ONE {difficulty.lower()} multiple-choice question
+    STRICTLY about: {theme}.
+    It MUST be factual and relevant to the theme.
+    Do NOT repeat these questions: {prompt_history(history)}
+
+    Output exactly in this format:
+    Question: <question>
+    Options:
+    1. <option1>
+    2. <option2>
+    3. <option3>
+    4. <option4>
+    Explanation: <short explanation>
+    """
+        messages = [{"role": "system", "content": "You are a strict trivia question generator."},
+                    {"role": "user", "content": prompt}]
+        return _request("question", strategy, messages, model=model, temperature=0.7)
+    asked = prompt_history(history) if strategy == "prefix" else history_keywords(history)
+    messages = [{"role": "system", "content": QUESTION_SYSTEM},
+                {"role": "user", "content": f"A {difficulty.lower()} question about {theme}.\nAlready asked: {asked}"}]
+    if strategy == "prefix":
+        return _request("question", strategy, messages, model=model, temperature=0.7)
+    return _request("question", strategy, messages, model=model, temperature=0.7, max_tokens=QUESTION_MAX_TOKENS)
+
+
+def batch_request(theme, count, history, difficulty="Easy", model=MODEL, strategy=None):
+    # create() arguments for count questions at once, as JSON
+    strategy = strategy or STRATEGY
+    settings = {"model": model, "temperature": 0.7, "response_format": {"type": "json_object"}}
+    if strategy == "verbose":
+        prompt = f"""
+    You are a quiz generator. Create {count} {difficulty.lower()} multiple-choice questions
+    STRICTLY about: {theme}.
+    They MUST be factual, relevant to the theme and different from each other.
+    Do NOT repeat these questions: {prompt_history(history)}
+
+    Reply with JSON only, in exactly this shape:
+    {{"questions": [
+      {{"question": "<question>",
+        "options": ["<option1>", "<option2>", "<option3>", "<option4>"],
+        "correct": <number 1-4 of the correct option>,
+        "explanation": "<short explanation>"}}
+    ]}}
+    """
+        messages = [{"role": "system", "content": "You are a strict trivia question generator that replies in JSON."},
+                    {"role": "user", "content": prompt}]
+        return _request("batch", strategy, messages, **settings)
+    asked = prompt_history(history) if strategy == "prefix" else history_keywords(history)
+    messages = [{"role": "system", "content": BATCH_SYSTEM},
+                {"role": "user", "content": f"Create {count} {difficulty.lower()} questions about {theme}, as JSON."
+                                            f"\nAlready asked: {asked}"}]
+    if strategy == "compact":
+        settings["max_tokens"] = BATCH_MAX_TOKENS * count
+    return _request("batch", strategy, messages, **settings)
+
+
+def answer_request(q_data, strategy=None):
+    # create() arguments for one answer-key vote, without model and sampling settings
+    strategy = strategy or STRATEGY
+    if strategy == "verbose":
+        messages = [{"role": "system", "content": "You are a trivia answerer."},
+                    {"role": "user", "content": f"Answer this question: {q_data}\n"
+                                                f"Output only the correct option number (1-4)."}]
+        return _request("answer", strategy, messages)
+    if strategy == "prefix":
+        return _request("answer", strategy, [{"role": "system", "content": ANSWER_SYSTEM},
+                                             {"role": "user", "content": q_data}])
+    return _request("answer", strategy, [{"role": "system", "content": ANSWER_SYSTEM},
+                                         {"role": "user", "content": answer_context(q_data)}],
+                    max_tokens=ANSWER_MAX_TOKENS)
+
+
+class Budget:
+    # Tokens spent on one game's calls, capped at limit (0: no cap). A call is charged its
+    # estimate before it goes out and settled with the usage its reply reports; a call
+    # that failed costs nothing. Set as session.budget; llm_gateway.Session does the rest.
+
+    def __init__(self, limit=GAME_TOKEN_BUDGET):
+        self.limit = limit
+        self.spent = 0
+        self.calls = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, requests):
+        # Estimates for a list of create() kwargs, all charged or none
+        costs = [estimate_tokens(kwargs) for kwargs in requests]
+        with self._lock:
+            if self.limit and self.spent + sum(costs) > self.limit:
+                self.refused += len(costs)
+                raise BudgetExceeded(f"game token budget spent ({self.spent} of {self.limit})")
+            self.spent += sum(costs)
+            self.calls += len(costs)
+        return costs
+
+    def settle(self, costs, results):
+        # results: a reply, an exception, or None to keep the estimate (streams report no usage)
+        actual = 0
+        for cost, result in zip(costs, results):
+            if isinstance(result, Exception):
+                continue
+            usage = getattr(result, "usage", None)
+            if usage is not None:
+                actual += (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+            else:
+                actual += cost
+        with self._lock:
+            self.spent += actual - sum(costs)
+
+    @property
+    def stats(self):
+        return {"limit": self.limit, "spent": self.spent, "calls": self.calls, "refused": self.refused}
@@ -0,0 +1,285 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from batch_generation import validate_item
+
+BANK_PATH = os.getenv("QUESTION_BANK_PATH", "question_bank.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    theme TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    explanation TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    served INTEGER NOT NULL DEFAULT 0,
+    flagged INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (theme, difficulty, question_key)
+);
+CREATE TABLE IF NOT EXISTS seen (
+    player TEXT NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (player, question_id)
+);
+CREATE TABLE IF NOT EXISTS pack_cursors (
+    player TEXT NOT NULL,
+    pack_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (player, pack_key)
+);
+CREATE TABLE IF NOT EXISTS answer_agreement (
+    theme TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    checked INTEGER NOT NULL DEFAULT 0,
+    accepted INTEGER NOT NULL DEFAULT 0,
+    unanimous INTEGER NOT NULL DEFAULT 0,
+    share_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (theme, difficulty)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_theme ON questions (theme, difficulty, flagged);
+"""
+
+
+def question_key(text):
+    return " ".join(text.replace("Question:", "").lower().split())
+
+
+class QuestionBank:
+    # Local store of parsed questions keyed by (theme, difficulty).
+    # One connection is shared by every session of the process, guarded by a lock.
+
+    def __init__(self, path=BANK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def add(self, theme, difficulty, item):
+        # Store a question dict (question, options, correct, explanation); returns its id
+        item = validate_item(item)
+        if item is None:
+            return None
+        key = question_key(item["question"])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO questions (theme, difficulty, question_key, question, options, correct,"
+                " explanation, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (theme, difficulty, key, item["question"], json.dumps(item["options"]), item["correct"],
+                 item["explanation"], time.time()),
+            )
+            row = self._conn.execute(
+                "SELECT id FROM questions WHERE theme = ? AND difficulty = ? AND question_key = ?",
+                (theme, difficulty, key),
+            ).fetchone()
+        return row[0]
+
+    def record(self, player, theme, difficulty, item):
+        # Store a question that was just served and mark it as seen by the player
+        question_id = self.add(theme, difficulty, item)
+        if question_id is not None:
+            self.mark_seen(player, [question_id])
+        return question_id
+
+    def mark_seen(self, player, question_ids):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (player, question_id, seen_at) VALUES (?, ?, ?)",
+                [(player, qid, now) for qid in question_ids],
+            )
+            self._conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?",
+                                   [(qid,) for qid in question_ids])
+
+    def count_unseen(self, player, theme, difficulty):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM questions q WHERE theme = ? AND difficulty = ? AND flagged = 0"
+                " AND NOT EXISTS (SELECT 1 FROM seen s WHERE s.player = ? AND s.question_id = q.id)",
+                (theme, difficulty, player),
+            ).fetchone()[0]
+
+    def draw(self, player, theme, difficulty, count=1, exclude=(), include_seen=False):
+        # Random unseen questions for the player; they are marked seen straight away.
+        # include_seen allows repeats from earlier games, used when the LLM is unavailable.
+        skip = {question_key(q) for q in exclude}
+        unseen = "" if include_seen else \
+            " AND NOT EXISTS (SELECT 1 FROM seen s WHERE s.player = :player AND s.question_id = q.id)"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question_key, question, options, correct, explanation FROM questions q"
+                " WHERE theme = :theme AND difficulty = :difficulty AND flagged = 0" + unseen +
+                " ORDER BY RANDOM() LIMIT :limit",
+                {"theme": theme, "difficulty": difficulty, "player": player, "limit": count + len(skip)},
+            ).fetchall()
+        items = [
+            {"id": qid, "question": question, "options": json.loads(options), "correct": correct,
+             "explanation": explanation}
+            for qid, key, question, options, correct, explanation in rows if key not in skip
+        ][:count]
+        if items:
+            self.mark_seen(player, [item["id"] for item in items])
+        return items
+
+    def recent_questions(self, theme, difficulty, limit=50):
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT question FROM questions WHERE theme = ? AND difficulty = ?"
+                " ORDER BY created_at DESC LIMIT ?", (theme, difficulty, limit))]
+
+    def position(self, player, pack_key):
+        # How far the player has walked through an imported pack group (question_pack.py)
+        with self._lock:
+            row = self._conn.execute("SELECT position FROM pack_cursors WHERE player = ? AND pack_key = ?",
+                                     (player, pack_key)).fetchone()
+        return row[0] if row else 0
+
+    def take_position(self, player, pack_key):
+        # Returns the current position and advances it, atomically
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT position FROM pack_cursors WHERE player = ? AND pack_key = ?",
+                                     (player, pack_key)).fetchone()
+            position = row[0] if row else 0
+            self._conn.execute("INSERT OR REPLACE INTO pack_cursors (player, pack_key, position) VALUES (?, ?, ?)",
+                               (player, pack_key, position + 1))
+        return position
+
+    def record_agreement(self, theme, difficulty, share, accepted):
+        # One answer-key vote (verification.py): share is the winning option's share of the votes
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO answer_agreement (theme, difficulty) VALUES (?, ?)",
+                               (theme, difficulty))
+            self._conn.execute(
+                "UPDATE answer_agreement SET checked = checked + 1, accepted = accepted + ?,"
+                " unanimous = unanimous + ?, share_sum = share_sum + ? WHERE theme = ? AND difficulty = ?",
+                (int(accepted), int(share == 1.0), share, theme, difficulty))
+
+    def agreement(self):
+        # Per theme: questions checked, share accepted, share unanimous, mean winning share
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT theme, difficulty, checked, accepted, unanimous, share_sum FROM answer_agreement"
+                " ORDER BY 1.0 * accepted / checked, theme").fetchall()
+        return [{"theme": theme, "difficulty": difficulty, "checked": checked,
+                 "accepted": round(accepted / checked, 3), "unanimous": round(unanimous / checked, 3),
+                 "mean agreement": round(share_sum / checked, 3)}
+                for theme, difficulty, checked, accepted, unanimous, share_sum in rows]
+
+    def questions(self, theme, difficulty):
+        # Every servable question of a (theme, difficulty), without marking anything seen
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, options, correct, explanation FROM questions"
+                " WHERE theme = ? AND difficulty = ? AND flagged = 0", (theme, difficulty)).fetchall()
+        return [{"id": qid, "question": question, "options": json.loads(options), "correct": correct,
+                 "explanation": explanation} for qid, question, options, correct, explanation in rows]
+
+    def flag(self, question_id):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE questions SET flagged = 1 WHERE id = ?", (question_id,))
+
+    def evict(self, max_age_days=90, max_per_theme=2000):
+        # Drop flagged questions, questions older than max_age_days, and the oldest
+        # entries of any (theme, difficulty) holding more than max_per_theme
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM questions WHERE flagged = 1 OR created_at < ?", (cutoff,)).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM questions WHERE id IN (SELECT id FROM (SELECT id, ROW_NUMBER() OVER"
+                " (PARTITION BY theme, difficulty ORDER BY created_at DESC) AS rank FROM questions)"
+                " WHERE rank > ?)", (max_per_theme,)).rowcount
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT theme, difficulty, COUNT(*), SUM(flagged), SUM(served) FROM questions"
+                " GROUP BY theme, difficulty ORDER BY theme, difficulty"
+            ).fetchall()
+
+    def close(self):
+        self._conn.close()
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_bank():
+    # Process-wide bank so Streamlit reruns and sessions reuse one connection
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank()
+        return _bank
+
+
+def warm(themes, difficulty="Easy", per_theme=50, batch_size=10):
+    # Fill the bank ahead of time; run this before peak hours. difficulty "ladder" fills
+    # every tier of the difficulty ladder. The bank is served before anything else, so
+    # keys are voted on like any generated batch and only agreed ones are stored.
+    import config  # reads .env before the gateway reads its settings
+    import llm_gateway
+    import verification
+    from batch_generation import generate_game
+    from errors import QuestionUnavailable
+
+    if difficulty == "ladder":
+        import engine
+
+        for tier in engine.TIERS:
+            warm(themes, tier, per_theme, batch_size)
+        return
+    client = llm_gateway.session()
+    bank = get_bank()
+    for theme in themes:
+        stored = 0
+        while stored < per_theme:
+            known = bank.recent_questions(theme, difficulty)
+            try:
+                items = verification.verify_items(client, generate_game(
+                    client, theme, known, count=min(batch_size, per_theme - stored), difficulty=difficulty),
+                    theme, difficulty)
+            except (ValueError, QuestionUnavailable):
+                break
+            added = [bank.add(theme, difficulty, item) for item in items]
+            if not any(added):
+                break
+            stored += len(items)
+        print(f"{theme} ({difficulty}): +{stored}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local question bank")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm_cmd = sub.add_parser("warm", help="pre-generate questions for the given themes")
+    warm_cmd.add_argument("themes", nargs="+")
+    warm_cmd.add_argument("--difficulty", default="Easy", help='a tier, or "ladder" for every tier')
+    warm_cmd.add_argument("--count", type=int, default=50, help="questions to add per theme")
+    evict_cmd = sub.add_parser("evict", help="remove flagged and stale questions")
+    evict_cmd.add_argument("--max-age-days", type=int, default=90)
+    evict_cmd.add_argument("--max-per-theme", type=int, default=2000)
+    sub.add_parser("stats", help="show bank size per theme")
+    args = parser.parse_args()
+
+    if args.command == "warm":
+        warm(args.themes, args.difficulty, args.count)
+    elif args.command == "evict":
+        print(f"Removed {get_bank().evict(args.max_age_days, args.max_per_theme)} questions")
+    else:
+        for theme, difficulty, total, flagged, served in get_bank().stats():
+            print(f"{theme:30} {difficulty:8} total={total} flagged={flagged} served={served}")
+        for row in get_bank().agreement():
+            print(f"{row['theme']:30} {row['difficulty']:8} answer keys checked={row['checked']} "
+                  f"accepted={row['accepted']:.0%} unanimous={row['unanimous']:.0%}")
@@ -0,0 +1,274 @@
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from array import array
+
+from batch_generation import validate_item
+from dedup import fingerprint
+
+# Imported trivia datasets, read straight from a memory-mapped file.
+#
+# Layout: MAGIC, then one record per question ("<IB" payload length + correct option,
+# payload = question, 4 options and explanation joined by \x1f), then per (theme,
+# difficulty) an array of uint64 record offsets, then a JSON table of those groups,
+# then the footer "<QQ8s" (table offset, table length, MAGIC). Opening a pack only
+# reads the footer and the table; records are paged in as they are drawn.
+#
+#   python question_pack.py import trivia.jsonl history.csv --difficulty Easy
+#   python question_pack.py stats
+
+PACK_PATH = os.getenv("QUESTION_PACK_PATH", "questions.pack")
+MAGIC = b"QPACK\x00\x01\x00"
+RECORD = struct.Struct("<IB")
+FOOTER = struct.Struct("<QQ8s")
+SEP = "\x1f"
+# Column names accepted for each field, in JSONL keys or CSV headers
+ALIASES = {
+    "question": ("question", "prompt", "text"),
+    "correct": ("correct", "answer", "correct_answer", "answer_index"),
+    "explanation": ("explanation", "explain", "rationale"),
+    "theme": ("theme", "category", "topic"),
+    "difficulty": ("difficulty", "level"),
+}
+
+
+def _field(row, name):
+    for key in ALIASES[name]:
+        if row.get(key) not in (None, ""):
+            return row[key]
+    return None
+
+
+def normalize_row(row, theme=None, difficulty="Easy"):
+    # One dataset row -> (theme, difficulty, question dict), or None if unusable.
+    # Options come as a list, a "|"-separated string, or option1..option4 / A..D columns;
+    # the answer as a 1-based number, a letter, or the text of the right option.
+    options = row.get("options") or row.get("choices")
+    if isinstance(options, str):
+        options = options.split("|")
+    if not options:
+        options = [row.get(f"option{i}") or row.get("ABCD"[i - 1]) for i in range(1, 5)]
+    options = [str(opt).strip() for opt in options if opt is not None]
+    correct = _field(row, "correct")
+    if isinstance(correct, str):
+        correct = correct.strip()
+        if len(correct) == 1 and correct.upper() in "ABCD":
+            correct = "ABCD".index(correct.upper()) + 1
+        elif correct in options:
+            correct = options.index(correct) + 1
+    item = validate_item({"question": _field(row, "question"), "options": options, "correct": correct,
+                          "explanation": _field(row, "explanation") or ""})
+    if item is None:
+        return None
+    return theme or str(_field(row, "theme") or "General Knowledge").strip(), \
+        str(_field(row, "difficulty") or difficulty).strip().capitalize(), item
+
+
+def read_rows(path):
+    # Streams dicts from a .jsonl or .csv file without loading it
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        yield {}
+
+
+def build(paths, out=PACK_PATH, theme=None, difficulty="Easy"):
+    # Single pass over the inputs; only the offsets and fingerprints stay in memory.
+    # Duplicate questions within a (theme, difficulty) are kept once.
+    groups = {}
+    seen = set()
+    counts = {"rows": 0, "imported": 0, "invalid": 0, "duplicate": 0}
+    tmp = f"{out}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for path in paths:
+            for row in read_rows(path):
+                counts["rows"] += 1
+                parsed = normalize_row(row, theme, difficulty) if isinstance(row, dict) else None
+                if parsed is None:
+                    counts["invalid"] += 1
+                    continue
+                group, level, item = parsed
+                key = hash((group, level, fingerprint(item["question"])))
+                if key in seen:
+                    counts["duplicate"] += 1
+                    continue
+                seen.add(key)
+                payload = SEP.join([item["question"], *item["options"], item["explanation"]]
+                                   ).replace("\n", " ").encode("utf-8")
+                groups.setdefault((group, level), array("Q")).append(f.tell())
+                f.write(RECORD.pack(len(payload), item["correct"]))
+                f.write(payload)
+                counts["imported"] += 1
+        f.write(b"\x00" * (-f.tell() % 8))  # keep the offset arrays 8-byte aligned
+        table = {"build": uuid.uuid4().hex, "created_at": time.time(), "groups": []}
+        for (group, level), offsets in sorted(groups.items()):
+            table["groups"].append({"theme": group, "difficulty": level, "offset": f.tell(), "count": len(offsets)})
+            f.write(offsets.tobytes())  # native byte order, read back with memoryview.cast("Q")
+        table_offset = f.tell()
+        data = json.dumps(table).encode("utf-8")
+        f.write(data)
+        f.write(FOOTER.pack(table_offset, len(data), MAGIC))
+    os.replace(tmp, out)
+    return counts
+
+
+def _round_keys(seed):
+    digest = hashlib.blake2b(seed.encode("utf-8"), digest_size=16).digest()
+    return struct.unpack("<4I", digest)
+
+
+def permute(index, n, keys):
+    # index-th element of a keyed pseudo-random permutation of range(n), in O(1) memory:
+    # a 4-round Feistel network over the next even power of two, cycle-walking back into range
+    bits = max(2, (n - 1).bit_length())
+    bits += bits & 1
+    half = bits // 2
+    mask = (1 << half) - 1
+    x = index
+    while True:
+        left, right = x >> half, x & mask
+        for key in keys:
+            left, right = right, left ^ ((((right ^ key) * 0x9E3779B1) >> 7) & mask)
+        x = (left << half) | right
+        if x < n:
+            return x
+
+
+class QuestionPack:
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        table_offset, table_length, magic = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC or self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a question pack")
+        table = json.loads(self._map[table_offset:table_offset + table_length])
+        self.build = table["build"]
+        self._view = memoryview(self._map)
+        self._groups = {(g["theme"], g["difficulty"]): self._view[g["offset"]:g["offset"] + 8 * g["count"]].cast("Q")
+                        for g in table["groups"]}
+
+    def groups(self):
+        return [(theme, difficulty, len(offsets)) for (theme, difficulty), offsets in sorted(self._groups.items())]
+
+    def themes(self, difficulty=None):
+        found = []
+        for theme, level in self._groups:
+            if (difficulty is None or level == difficulty) and theme not in found:
+                found.append(theme)
+        return found
+
+    def count(self, theme, difficulty):
+        group = self._groups.get((theme, difficulty))
+        return len(group) if group is not None else 0
+
+    def get(self, theme, difficulty, index):
+        offset = self._groups[(theme, difficulty)][index]
+        length, correct = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        question, *options, explanation = self._map[start:start + length].decode("utf-8").split(SEP)
+        return {"question": question, "options": options, "correct": correct, "explanation": explanation}
+
+    def sample(self, theme, difficulty, seed, position):
+        # The position-th question of the walk identified by seed; every question of the
+        # group comes up exactly once before position reaches count(). None after that.
+        n = self.count(theme, difficulty)
+        if position >= n:
+            return None
+        return self.get(theme, difficulty, permute(position, n, _round_keys(f"{self.build}\0{seed}")))
+
+    def draw(self, player, theme, difficulty):
+        # Next unseen question for the player; the walk position lives in the question bank
+        if not self.count(theme, difficulty):
+            return None
+        from question_bank import get_bank
+
+        seed = f"{player}\0{theme}\0{difficulty}"
+        position = get_bank().take_position(player, f"{self.build}:{theme}:{difficulty}")
+        return self.sample(theme, difficulty, seed, position)
+
+    def remaining(self, player, theme, difficulty):
+        from question_bank import get_bank
+
+        used = get_bank().position(player, f"{self.build}:{theme}:{difficulty}")
+        return max(0, self.count(theme, difficulty) - used)
+
+    def close(self):
+        for group in self._groups.values():
+            group.release()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+_pack = None
+_pack_lock = threading.Lock()
+
+
+def get_pack():
+    # Process-wide pack, or None when nothing has been imported
+    global _pack
+    with _pack_lock:
+        if _pack is None and os.path.exists(PACK_PATH):
+            _pack = QuestionPack(PACK_PATH)
+        return _pack
+
+
+def draw(player, theme, difficulty):
+    # Next unseen pack question for the player, or None (no pack, theme not in it, or used up)
+    pack = get_pack()
+    return pack.draw(player, theme, difficulty) if pack is not None else None
+
+
+def remaining(player, theme, difficulty):
+    pack = get_pack()
+    return pack.remaining(player, theme, difficulty) if pack is not None else 0
+
+
+def with_pack_themes(themes, difficulty=None):
+    # The built-in themes followed by any extra ones the imported pack provides
+    pack = get_pack()
+    if pack is None:
+        return list(themes)
+    return list(themes) + [theme for theme in pack.themes(difficulty) if theme not in themes]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import trivia datasets into a memory-mapped question pack")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_cmd = sub.add_parser("import", help="build the pack from JSONL/CSV files (replaces it)")
+    import_cmd.add_argument("files", nargs="+")
+    import_cmd.add_argument("--out", default=PACK_PATH)
+    import_cmd.add_argument("--theme", help="use this theme for every row instead of the theme column")
+    import_cmd.add_argument("--difficulty", default="Easy", help="for rows without a difficulty column")
+    stats_cmd = sub.add_parser("stats", help="show questions per theme and difficulty")
+    stats_cmd.add_argument("--path", default=PACK_PATH)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        start = time.perf_counter()
+        counts = build(args.files, args.out, args.theme, args.difficulty)
+        print(f"{counts['imported']} questions imported from {counts['rows']} rows "
+              f"({counts['invalid']} invalid, {counts['duplicate']} duplicates) "
+              f"in {time.perf_counter() - start:.1f}s -> {args.out}")
+    else:
+        start = time.perf_counter()
+        pack = QuestionPack(args.path)
+        print(f"opened in {(time.perf_counter() - start) * 1000:.2f} ms")
+        for theme, difficulty, count in pack.groups():
+            print(f"{theme:30} {difficulty:8} {count}")
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import engine
+import llm_gateway
+from errors import QuestionUnavailable
+import metrics
+import verification
+from batch_generation import generate_game
+from dedup import DedupIndex
+
+# Ready, verified questions shared by every session of the process, kept per
+# (theme, difficulty). A buffer's goal follows its demand: the questions asked of it in
+# the last DEMAND_WINDOW, at least POOL_INITIAL and at most POOL_TARGET. Background
+# workers top it back up to the goal whenever it falls under POOL_LOW_WATER (or the goal),
+# so at steady state a session takes a question without any LLM call, and a buffer
+# nobody asks much of stays small. Refills only use the rate-limit budget players leave over.
+# Each tier of the difficulty ladder is a buffer of its own. The front-ends stock the tier
+# a game starts on, then the tier the next question gets, so the others fill on demand;
+# ensure_ladder() stocks them all at once (POOL_PREWARM).
+
+BATCH_SIZE = 5
+TARGET = int(os.getenv("POOL_TARGET", "10"))
+INITIAL = int(os.getenv("POOL_INITIAL", "1"))
+LOW_WATER = int(os.getenv("POOL_LOW_WATER", "4"))
+WORKERS = int(os.getenv("POOL_WORKERS", "2"))
+RATE_WINDOW = 600.0  # seconds of refills behind the reported refill rate
+DEMAND_WINDOW = 600.0  # seconds of take() calls a buffer's goal follows
+
+
+def produce_verified(client, theme, difficulty, count, exclude):
+    # One batch call plus one parallel round of answer-key votes
+    items = generate_game(client, theme, exclude, count=count, difficulty=difficulty)
+    return verification.verify_items(client, items, theme, difficulty)
+
+
+class QuestionPool:
+    def __init__(self, produce=produce_verified, target=TARGET, low_water=LOW_WATER, workers=WORKERS,
+                 client=None, initial=INITIAL):
+        self.produce = produce
+        self.target = target
+        self.initial = min(initial, target)
+        self.low_water = low_water
+        self.client = client
+        self._stock = {}  # (theme, difficulty) -> deque of question dicts
+        self._refilling = set()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pool-refill")
+
+    def _count(self, key):
+        return self._counters.setdefault(key, {"served": 0, "misses": 0, "refilled": 0, "refill_errors": 0,
+                                               "recent": deque(), "asked": deque()})
+
+    def _goal(self, key):
+        # Caller holds the lock. Questions asked of the buffer lately, served or not
+        asked = self._count(key)["asked"]
+        now = time.monotonic()
+        while asked and now - asked[0] > DEMAND_WINDOW:
+            asked.popleft()
+        return min(self.target, max(self.initial, len(asked)))
+
+    def depth(self, theme, difficulty):
+        with self._lock:
+            return len(self._stock.get((theme, difficulty), ()))
+
+    def ensure(self, theme, difficulty):
+        # Start stocking a theme (e.g. when a player picks it) without taking anything
+        with self._lock:
+            self._stock.setdefault((theme, difficulty), deque())
+            self._maybe_refill((theme, difficulty))
+
+    def ensure_ladder(self, theme, tiers=engine.TIERS):
+        # Lowest tier first: it is the first to be asked for and the refill workers are shared
+        for difficulty in tiers:
+            self.ensure(theme, difficulty)
+
+    def take(self, theme, difficulty, history=()):
+        # A ready question the player hasn't seen, or None (a miss: the caller generates)
+        key = (theme, difficulty)
+        seen = history if isinstance(history, DedupIndex) else DedupIndex(history)
+        with self._lock:
+            stock = self._stock.setdefault(key, deque())
+            counters = self._count(key)
+            item = None
+            for candidate in stock:
+                if candidate["question"] not in seen:
+                    item = candidate
+                    break
+            counters["asked"].append(time.monotonic())
+            if item is not None:
+                stock.remove(item)
+                counters["served"] += 1
+            else:
+                counters["misses"] += 1
+            self._maybe_refill(key)
+            metrics.gauge("quiz_pool_depth", len(stock), theme=theme, difficulty=difficulty)
+        return item
+
+    def _maybe_refill(self, key):
+        # Caller holds the lock
+        if key not in self._refilling and len(self._stock[key]) < min(self.low_water, self._goal(key)):
+            self._refilling.add(key)
+            self._executor.submit(self._refill, key)
+
+    def _refill(self, key):
+        theme, difficulty = key
+        # Refills only spend the rate-limit budget players leave over
+        client = self.client or llm_gateway.session(background=True)
+        try:
+            while True:
+                with self._lock:
+                    stock = self._stock[key]
+                    missing = self._goal(key) - len(stock)
+                    exclude = [item["question"] for item in stock]
+                if missing <= 0:
+                    break
+                with metrics.timed("pool_refill"):
+                    try:
+                        items = self.produce(client, theme, difficulty, min(BATCH_SIZE, missing), exclude)
+                    except (QuestionUnavailable, ValueError):
+                        items = None
+                with self._lock:
+                    counters = self._count(key)
+                    if not items:
+                        # Upstream is failing; the next take() below low water tries again
+                        counters["refill_errors"] += 1
+                        break
+                    self._stock[key].extend(items)
+                    counters["refilled"] += len(items)
+                    now = time.monotonic()
+                    counters["recent"].extend([now] * len(items))
+                    metrics.gauge("quiz_pool_depth", len(self._stock[key]), theme=theme, difficulty=difficulty)
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def stats(self):
+        # One row per (theme, difficulty) for the debug panel
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for (theme, difficulty), stock in sorted(self._stock.items()):
+                counters = self._count((theme, difficulty))
+                recent = counters["recent"]
+                while recent and now - recent[0] > RATE_WINDOW:
+                    recent.popleft()
+                requests = counters["served"] + counters["misses"]
+                rows.append({
+                    "theme": theme,
+                    "difficulty": difficulty,
+                    "depth": len(stock),
+                    "goal": self._goal((theme, difficulty)),
+                    "served": counters["served"],
+                    "misses": counters["misses"],
+                    "hit rate": round(counters["served"] / requests, 3) if requests else None,
+                    "refilled": counters["refilled"],
+                    "refills/min": round(len(recent) * 60 / RATE_WINDOW, 1),
+                    "refill errors": counters["refill_errors"],
+                    "refilling": (theme, difficulty) in self._refilling,
+                })
+        return rows
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # Process-wide, like the question bank and the LLM gateway
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = QuestionPool()
+        return _pool
@@ -0,0 +1,118 @@
+import argparse
+import multiprocessing
+import random
+import time
+from collections import Counter
+
+import engine
+
+# Plays random games through the engine with no LLM calls, to tune scoring, lifelines
+# and the difficulty ladder. The player knows an answer with probability --skill,
+# scaled down by TIER_SKILL on harder tiers, and guesses among the visible options
+# otherwise; --policy decides when lifelines are used.
+#
+#   python simulate.py --games 1000000 --skill 0.5 --policy unsure --workers 4
+#   python simulate.py --bank            # play the stored questions instead of synthetic ones
+
+POLICIES = ("never", "unsure", "late")
+HINT_BOOST = 0.3  # extra chance of knowing the answer after reading the hint
+# Share of --skill left on each tier of the ladder
+TIER_SKILL = {"Easy": 1.0, "Medium": 0.8, "Hard": 0.6, "Expert": 0.4}
+
+
+def synthetic_questions(count=200):
+    return [engine.Question(f"Synthetic question {n}?", [f"Option {n}.{i}" for i in range(1, 5)],
+                            n % 4 + 1, f"Option {n % 4 + 1} is right. Always.") for n in range(count)]
+
+
+def bank_questions():
+    from question_bank import get_bank
+
+    bank = get_bank()
+    items = [item for theme, difficulty, *_ in bank.stats() for item in bank.questions(theme, difficulty)]
+    if not items:
+        raise SystemExit("The question bank is empty; run `python question_bank.py warm` first")
+    return [engine.Question.from_item(item) for item in items]
+
+
+def play(draw, rng, skill, policy, length, sudden_death, theme="simulated"):
+    # draw(state, rng) returns the next question; it can read the tier with engine.tier(state)
+    state = engine.new_game(theme, length=length, sudden_death=sudden_death)
+    while not state.finished:
+        state = engine.present(state, draw(state, rng), rng)
+        knows = rng.random() < skill * TIER_SKILL[engine.tier(state)]
+        # "late" keeps the lifelines for the last two questions
+        if not knows and (policy == "unsure" or (policy == "late" and state.q_count >= length - 2)):
+            if "Hint" in state.lifelines:
+                state = engine.hint(state)
+                knows = rng.random() < HINT_BOOST
+            if not knows and "50-50" in state.lifelines:
+                state = engine.fifty_fifty(state, rng)
+            elif not knows and "Skip" in state.lifelines:
+                state = engine.skip(state)
+                continue
+        choice = state.question.correct if knows else rng.choice(state.visible) + 1
+        state = engine.answer(state, choice)
+    return state
+
+
+def run(games, seed, skill, policy, length, sudden_death, bank):
+    questions = bank_questions() if bank else synthetic_questions()
+    rng = random.Random(seed)
+    scores = Counter()
+    lifelines = Counter()
+    tiers = Counter()
+
+    def draw(state, rng):
+        tiers[engine.tier(state)] += 1
+        return rng.choice(questions)
+
+    for _ in range(games):
+        state = play(draw, rng, skill, policy, length, sudden_death)
+        scores[state.score] += 1
+        lifelines.update(set(engine.LIFELINES) - state.lifelines)
+    return scores, lifelines, tiers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate games through the headless engine")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--skill", type=float, default=0.5, help="chance the player knows an answer")
+    parser.add_argument("--policy", choices=POLICIES, default="unsure",
+                        help="never use lifelines, use them whenever unsure, or only on the last two questions")
+    parser.add_argument("--length", type=int, default=engine.GAME_LENGTH)
+    parser.add_argument("--sudden-death", action="store_true", help="a wrong answer ends the game (CLI rules)")
+    parser.add_argument("--bank", action="store_true", help="use the question bank instead of synthetic questions")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    share = args.games // args.workers
+    jobs = [(share + (i < args.games % args.workers), args.seed + i, args.skill, args.policy, args.length,
+             args.sudden_death, args.bank) for i in range(args.workers)]
+    if args.workers == 1:
+        results = [run(*jobs[0])]
+    else:
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.starmap(run, jobs)
+    elapsed = time.perf_counter() - start
+
+    scores, lifelines, tiers = Counter(), Counter(), Counter()
+    for s, l, t in results:
+        scores.update(s)
+        lifelines.update(l)
+        tiers.update(t)
+    mean = sum(score * n for score, n in scores.items()) / args.games
+    print(f"{args.games} games in {elapsed:.2f} s ({args.games / elapsed:,.0f} games/s)")
+    print(f"  mean score {mean:.3f}/{args.length}")
+    for score in range(args.length + 1):
+        share = scores[score] / args.games
+        print(f"  {score}: {share:6.1%} {'#' * round(share * 50)}")
+    print("  lifeline use: " + ", ".join(f"{name} {lifelines[name] / args.games:.1%}" for name in engine.LIFELINES))
+    asked = sum(tiers.values())
+    print("  questions per tier: " + ", ".join(f"{name} {tiers[name] / asked:.1%}" for name in engine.TIERS))
+
+
+if __name__ == "__main__":
+    main()
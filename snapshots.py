@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import engine
+
+# Game snapshots, so a game survives a restart and any replica can pick it up. The
+# session's game is written after each transition under a random resume token that
+# travels in the URL (?resume=...); a new session with that token restores it.
+#
+# Format: compact JSON list, first element the format version. Bump VERSION when the
+# layout changes and add a converter for the old one to UPGRADES.
+#
+# Stores: "sqlite" (default, one file; put it on a shared volume for several replicas)
+# or "file" (one file per token in a directory), picked with SNAPSHOT_STORE.
+
+VERSION = 2
+STORE = os.getenv("SNAPSHOT_STORE", "sqlite")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "snapshots.db" if STORE == "sqlite" else "snapshots")
+# Snapshots untouched for this long are deleted
+TTL = float(os.getenv("SNAPSHOT_TTL", str(7 * 24 * 3600)))
+# version -> function turning that version's list into the next version's
+UPGRADES = {
+    # 2: the game gained the answer streak the difficulty ladder reads
+    1: lambda data: [2, *data[1:3], data[3] + [0] if data[3] is not None else None, *data[4:]],
+}
+
+
+def _dump_game(state):
+    question = state.question
+    return [state.theme, state.length, state.sudden_death, state.score, state.q_count,
+            [question.text, question.options, question.correct, question.explanation] if question else None,
+            state.order, state.visible, sorted(state.lifelines), state.hint, state.last, state.over, state.streak]
+
+
+def _load_game(data):
+    (theme, length, sudden_death, score, q_count, question, order, visible, lifelines, hint, last, over,
+     streak) = data
+    state = engine.new_game(theme, length, sudden_death)
+    return state._replace(score=score, q_count=q_count, question=engine.Question(*question) if question else None,
+                          order=tuple(order), visible=tuple(visible), lifelines=frozenset(lifelines), hint=hint,
+                          last=last, over=over, streak=streak)
+
+
+def dumps(player, game, game_id=None, history=(), extra=None):
+    # history: titles asked so far in the game's theme; extra: small JSON-able session values
+    return json.dumps([VERSION, player, game_id, _dump_game(game) if game is not None else None, list(history),
+                       extra or {}], separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(blob):
+    # (player, game, game_id, history, extra), or None for something this code can't read
+    try:
+        data = json.loads(blob)
+        while data[0] != VERSION:
+            data = UPGRADES[data[0]](data)
+        _, player, game_id, game, history, extra = data
+        return player, _load_game(game) if game is not None else None, game_id, history, extra
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+class SqliteSnapshots:
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS snapshots "
+                           "(token TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)")
+        self.prune()
+
+    def save(self, token, blob):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO snapshots (token, data, updated_at) VALUES (?, ?, ?)",
+                               (token, blob, time.time()))
+
+    def load(self, token):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM snapshots WHERE token = ?", (token,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, token):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM snapshots WHERE token = ?", (token,))
+
+    def prune(self, ttl=TTL):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM snapshots WHERE updated_at < ?", (time.time() - ttl,))
+
+
+class FileSnapshots:
+    # One file per token, replaced atomically; works on any filesystem the replicas share
+    def __init__(self, directory=SNAPSHOT_PATH):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.prune()
+
+    def _path(self, token):
+        if not token.isalnum():
+            raise ValueError(f"bad resume token {token!r}")
+        return os.path.join(self.directory, f"{token}.snap")
+
+    def save(self, token, blob):
+        path = self._path(token)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+    def load(self, token):
+        try:
+            with open(self._path(token), "rb") as f:
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def delete(self, token):
+        try:
+            os.remove(self._path(token))
+        except (OSError, ValueError):
+            pass
+
+    def prune(self, ttl=TTL):
+        cutoff = time.time() - ttl
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".snap") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+
+STORES = {"sqlite": SqliteSnapshots, "file": FileSnapshots}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshots():
+    # Process-wide store, like the question bank and the score store
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = STORES[STORE](SNAPSHOT_PATH)
+        return _store
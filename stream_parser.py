@@ -0,0 +1,58 @@
+import re
+
+_OPTION = re.compile(r"^\s*([1-4])[.)]\s*(.*)$")
+
+
+class QuestionStreamParser:
+    # Incremental parser for the "Question: / Options: / 1.-4. / Explanation:" layout.
+    # feed() takes raw text deltas as they arrive; the question text is exposed while
+    # it is still being written, options only once their line is complete.
+
+    def __init__(self):
+        self.text = ""
+        self.question = ""
+        self.question_done = False
+        self.options = []
+        self.explanation = ""
+        self._line = ""
+
+    @property
+    def options_done(self):
+        return len(self.options) == 4
+
+    def feed(self, delta):
+        # Returns True when something the player can see has changed
+        self.text += delta
+        self._line += delta
+        changed = False
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            changed |= self._complete(line)
+        if not self.question_done and self._line.strip():
+            partial = self._line.replace("Question:", "").strip()
+            changed |= partial != self.question
+            self.question = partial
+        return changed
+
+    def close(self):
+        if self._line:
+            self._complete(self._line)
+            self._line = ""
+        return self.text.strip()
+
+    def _complete(self, line):
+        stripped = line.strip()
+        if not stripped or stripped == "Options:":
+            return False
+        if not self.question_done:
+            self.question = stripped.replace("Question:", "").strip()
+            self.question_done = True
+            return True
+        match = _OPTION.match(stripped)
+        if match and len(self.options) < 4:
+            self.options.append(match.group(2).strip())
+            return True
+        if stripped.startswith("Explanation:"):
+            self.explanation = stripped.replace("Explanation:", "").strip()
+            return True
+        return False
@@ -1,10 +1,9 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
+import config  # loads .env once, before the modules below read their settings
+import llm_gateway
 
-load_dotenv()
-
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Through the shared gateway, so LLM_CASSETTE=auto reruns this check from the cassette
+# instead of spending quota each time
+client = llm_gateway.session()
 
 def generate_question():
     prompt = """Generate one multiple-choice trivia question.
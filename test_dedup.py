@@ -0,0 +1,46 @@
+import dedup
+from dedup import DedupIndex, fingerprint, prompt_history
+
+
+def test_exact_repeat_ignores_case_and_punctuation():
+    index = DedupIndex(["Who wrote the national anthem of India?"])
+    assert "who wrote the NATIONAL anthem of india" in index
+    assert "Question: Who wrote the national anthem of India?!" in index
+    assert fingerprint("Who won?") == fingerprint("who won")
+
+
+def test_rephrased_question_is_a_duplicate():
+    index = DedupIndex(["Which river flows through the city of Varanasi in northern India?"])
+    assert "Which river flows through the city of Varanasi in India?" in index
+
+
+def test_different_questions_are_not_duplicates():
+    index = DedupIndex(["Which river flows through the city of Varanasi in northern India?"])
+    assert "Who was the first captain of the Chennai Super Kings in the IPL?" not in index
+    assert "Which fort did Shivaji Maharaj capture first?" not in index
+
+
+def test_behaves_like_the_history_list():
+    titles = ["First question about cricket?", "Second question about films?", "Third question about forts?"]
+    index = DedupIndex(titles)
+    index.append("First question about cricket?")  # already there
+    assert list(index) == titles and len(index) == 3
+
+
+def test_oldest_entries_are_evicted():
+    index = DedupIndex(max_items=3)
+    titles = [f"Question number {n} about a completely different topic {n * 7}?" for n in range(5)]
+    for title in titles:
+        index.append(title)
+    assert list(index) == titles[2:]
+    assert titles[0] not in index
+    assert titles[4] in index
+    assert len(index._fingerprints) == 3 and len(index._signatures) == 3 * dedup.SIZE
+
+
+def test_prompt_history_is_short_and_recent():
+    titles = [f"Question {n} " + "x" * 80 for n in range(20)]
+    recent = prompt_history(titles, limit=3, width=20)
+    assert len(recent) == 3 and all(len(t) <= 20 for t in recent)
+    assert recent[-1].startswith("Question 19") and recent[-1].endswith("...")
+    assert DedupIndex(titles).summary(limit=2) == prompt_history(titles, limit=2)
@@ -0,0 +1,136 @@
+import random
+import subprocess
+import sys
+
+import pytest
+
+import engine
+
+
+def question(n=1, correct=2):
+    return engine.Question(f"Question {n}?", ["a", "b", "c", "d"], correct, "Because b. More detail.")
+
+
+def play(state, *right):
+    # Answers one question per entry, right or wrong
+    for n, ok in enumerate(right):
+        state = engine.present(state, question(n), random.Random(n))
+        state = engine.answer(state, 2 if ok else 1)
+    return state
+
+
+def test_engine_imports_no_llm_or_io_modules():
+    code = ("import sys, engine; print(' '.join(m for m in ('llm_gateway', 'llm_scheduler', 'asyncio', 'prompts', "
+            "'metrics', 'output_parser', 'errors') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == ""
+
+
+def test_transitions_return_new_states():
+    start = engine.new_game("History")
+    shown = engine.present(start, question(), random.Random(0))
+    assert start.question is None and shown.question is not None
+    assert sorted(shown.order) == [0, 1, 2, 3] and shown.visible == shown.order
+    after = engine.answer(shown, "b")
+    assert (after.score, after.q_count, after.last, after.streak) == (1, 1, True, 1)
+    assert (shown.score, shown.q_count) == (0, 0)
+    assert after.question is None
+
+
+def test_wrong_answer_resets_streak():
+    state = play(engine.new_game("History"), True, True, False)
+    assert (state.score, state.q_count, state.last, state.streak) == (2, 3, False, 0)
+    assert not state.finished
+
+
+def test_game_finishes_after_its_length():
+    state = play(engine.new_game("History", length=2), True, False)
+    assert state.finished
+    with pytest.raises(engine.InvalidMove):
+        engine.present(state, question())
+
+
+def test_sudden_death_ends_on_a_miss():
+    state = play(engine.new_game("History", sudden_death=True), True, False)
+    assert state.over and state.finished and state.score == 1
+
+
+def test_forfeit_counts_as_wrong_and_ends_the_game():
+    state = engine.forfeit(engine.present(engine.new_game("History"), question()))
+    assert state.over and state.last is False and state.score == 0
+
+
+def test_answer_needs_a_visible_option():
+    with pytest.raises(engine.InvalidMove):
+        engine.answer(engine.new_game("History"), 1)
+    shown = engine.fifty_fifty(engine.present(engine.new_game("History"), question()), random.Random(1))
+    hidden = next(i for i in range(4) if i not in shown.visible)
+    with pytest.raises(engine.InvalidMove):
+        engine.answer(shown, hidden + 1)
+
+
+def test_lifelines_are_used_once():
+    shown = engine.present(engine.new_game("History"), question(), random.Random(0))
+    halved = engine.fifty_fifty(shown, random.Random(0))
+    assert len(halved.visible) == 2 and 1 in halved.visible  # the right option stays
+    assert halved.options == [shown.question.options[i] for i in halved.visible]
+    hinted = engine.hint(halved)
+    assert hinted.hint == "Because b..."
+    skipped = engine.skip(hinted)
+    assert (skipped.q_count, skipped.score, skipped.last, skipped.hint) == (1, 0, None, None)
+    assert skipped.lifelines == frozenset()
+    again = engine.present(skipped, question(2))
+    for lifeline in (engine.fifty_fifty, engine.hint, engine.skip):
+        with pytest.raises(engine.InvalidMove):
+            lifeline(again)
+
+
+def test_skip_keeps_the_streak():
+    state = play(engine.new_game("History"), True, True)
+    state = engine.skip(engine.present(state, question()))
+    assert state.streak == 2 and state.last is None
+
+
+@pytest.mark.parametrize("q_count,expected", [(0, 0), (1, 0), (2, 1), (3, 2), (4, 3)])
+def test_base_tier_climbs_with_the_question_number(q_count, expected):
+    assert engine.base_tier(q_count, 5) == expected
+
+
+def test_tier_follows_the_ladder_and_the_form():
+    state = engine.new_game("History")
+    assert engine.tier(state) == "Easy"
+    # Three right in a row: one tier above the position's
+    state = play(state, True, True, True)
+    assert engine.tier(state) == "Expert"
+    # A miss drops one tier below the position's
+    missed = play(engine.new_game("History"), True, False)
+    assert engine.tier(missed) == "Easy"
+    missed = play(engine.new_game("History"), True, True, False)
+    assert engine.tier(missed) == "Medium"
+
+
+def test_tier_stays_on_the_ladder():
+    state = play(engine.new_game("History", length=10), *[True] * 9)
+    assert engine.tier(state) == engine.TIERS[-1]
+    assert engine.tier(play(engine.new_game("History"), False)) == engine.TIERS[0]
+
+
+def test_sudden_death_ignores_the_streak():
+    state = play(engine.new_game("History", sudden_death=True), True, True, True)
+    assert engine.tier(state) == engine.TIERS[engine.base_tier(3)]
+
+
+def test_next_tier_is_the_tier_after_a_right_answer():
+    state = play(engine.new_game("History"), True)
+    assert engine.next_tier(state) == engine.tier(state)
+    shown = engine.present(play(engine.new_game("History"), True, True), question())
+    assert engine.tier(shown) == "Medium"
+    assert engine.next_tier(shown) == "Expert"
+    assert engine.tier(engine.answer(shown, shown.question.correct)) == "Expert"
+
+
+def test_prize_follows_the_score():
+    assert engine.prize(engine.new_game("History")) == 0
+    state = play(engine.new_game("History"), True, True)
+    assert engine.prize(state) == engine.PRIZES[1]
+    assert engine.playing_for(state) == engine.PRIZES[2]
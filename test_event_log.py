@@ -0,0 +1,89 @@
+import glob
+import os
+
+import pytest
+
+import event_log
+from event_log import EventLog
+
+pytest.importorskip("pyarrow")
+
+
+def game(log, game_id="g1"):
+    # One short game: every event kind, each with its own fields
+    log.emit(event_log.QUESTION_SERVED, game_id=game_id, q_index=0, question="Q1?", difficulty="Easy")
+    log.emit(event_log.LIFELINE_USED, game_id=game_id, q_index=0, lifeline="50-50")
+    log.emit(event_log.ANSWER_SUBMITTED, game_id=game_id, q_index=0, choice="Paris", correct=True, latency_ms=850)
+    log.emit(event_log.GAME_FINISHED, game_id=game_id, score=1, length=5, questions=1, tokens=1200)
+
+
+def written(directory, **options):
+    log = EventLog(str(directory), compact_after=10 ** 6, **options)
+    game(log)
+    log.flush()
+    log.close()
+    return log
+
+
+def test_compaction_keeps_every_field_of_every_kind(tmp_path):
+    written(tmp_path)
+    assert event_log.compact(str(tmp_path)) is not None
+    assert event_log.closed_segments(str(tmp_path)) == []
+    events = event_log.load(str(tmp_path)).set_index("kind")
+    assert len(events) == 4
+    answer = events.loc[event_log.ANSWER_SUBMITTED]
+    assert (answer["choice"], bool(answer["correct"]), answer["latency_ms"]) == ("Paris", True, 850)
+    assert events.loc[event_log.LIFELINE_USED, "lifeline"] == "50-50"
+    finished = events.loc[event_log.GAME_FINISHED]
+    assert (finished["score"], finished["tokens"]) == (1, 1200)
+    assert events.loc[event_log.QUESTION_SERVED, "question"] == "Q1?"
+
+
+def test_load_reads_snapshots_and_segments_together(tmp_path):
+    written(tmp_path)
+    event_log.compact(str(tmp_path))
+    written(tmp_path)  # a second game, not compacted yet
+    events = event_log.load(str(tmp_path))
+    assert len(events) == 8 and events["latency_ms"].dropna().tolist() == [850, 850]
+
+
+def test_failed_compaction_gives_the_segments_back(tmp_path, monkeypatch):
+    written(tmp_path)
+    segments = event_log.closed_segments(str(tmp_path))
+    import pyarrow.parquet as pq
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pq, "write_table", broken)
+    with pytest.raises(OSError):
+        event_log.compact(str(tmp_path))
+    assert event_log.closed_segments(str(tmp_path)) == segments
+    assert glob.glob(os.path.join(str(tmp_path), "*.parquet")) == []
+    assert len(event_log.load(str(tmp_path))) == 4
+
+
+def test_a_writer_compacts_only_its_own_segments(tmp_path):
+    mine, theirs = written(tmp_path), written(tmp_path)
+    event_log.compact(str(tmp_path), mine.writer_id)
+    left = event_log.closed_segments(str(tmp_path))
+    assert left and all(f"-{theirs.writer_id}-" in os.path.basename(path) for path in left)
+    assert len(event_log.load(str(tmp_path))) == 8
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    written(tmp_path)
+    with open(event_log.closed_segments(str(tmp_path))[0], "a", encoding="utf-8") as f:
+        f.write('{"ts": 1, "kind": "answer_sub')
+    event_log.compact(str(tmp_path))
+    assert len(event_log.load(str(tmp_path))) == 4
+
+
+def test_writer_compacts_after_enough_rotations(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=1, compact_after=2)
+    for n in range(4):
+        game(log, f"g{n}")
+        log.flush()
+    log.close()
+    assert log.stats["compactions"] >= 1 and log.stats["compaction_errors"] == 0
+    assert len(event_log.load(str(tmp_path))) == 16
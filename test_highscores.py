@@ -0,0 +1,47 @@
+import pytest
+
+from highscores import ScoreStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.db"), legacy_csv=None)
+    yield store
+    store.close()
+
+
+def test_a_game_is_recorded_once(store):
+    assert store.add("game-1", "Asha", 4, "History")
+    # The "Quiz Completed" screen reruns: same game id
+    assert not store.add("game-1", "Asha", 4, "History")
+    assert store.count() == 1
+
+
+def test_top_ranks_games_by_score_then_age(store):
+    store.add("g1", "Asha", 3)
+    store.add("g2", "Ravi", 5)
+    store.add("g3", "Meera", 3)
+    assert store.top(3) == [{"Name": "Ravi", "Score": 5}, {"Name": "Asha", "Score": 3}, {"Name": "Meera", "Score": 3}]
+
+
+def test_legacy_csv_is_imported_once(tmp_path):
+    legacy = tmp_path / "highscores.csv"
+    legacy.write_text("Name,Score\nAsha,4\nRavi,x\nMeera,2\n")
+    path = str(tmp_path / "scores.db")
+    store = ScoreStore(path, legacy_csv=str(legacy))
+    assert store.count() == 2
+    store.close()
+    store = ScoreStore(path, legacy_csv=str(legacy))
+    assert store.count() == 2
+    assert store.top(1) == [{"Name": "Asha", "Score": 4}]
+    store.close()
+
+
+def test_scores_survive_reopening(tmp_path):
+    path = str(tmp_path / "scores.db")
+    store = ScoreStore(path, legacy_csv=None)
+    store.add("g1", "Asha", 4)
+    store.close()
+    store = ScoreStore(path, legacy_csv=None)
+    assert store.count() == 1 and not store.add("g1", "Asha", 4)
+    store.close()
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import Saturated, Scheduler
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after="0"):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def upstream(failures=(), delay=0.0):
+    # Coroutine function that raises the given errors in turn, then answers; counts its calls
+    errors = list(failures)
+
+    async def call(**kwargs):
+        call.calls += 1
+        if delay:
+            await asyncio.sleep(delay)
+        if errors:
+            raise errors.pop(0)
+        return {"reply": kwargs["messages"][0]["content"]}
+
+    call.calls = 0
+    return call
+
+
+def request(text="hi"):
+    return {"messages": [{"role": "user", "content": text}], "model": "m"}
+
+
+def unmetered(**kwargs):
+    return Scheduler(rpm=10 ** 6, tpm=10 ** 9, **kwargs)
+
+
+def test_retries_rate_limited_calls_after_retry_after():
+    scheduler, call, info = unmetered(), upstream([RateLimited(), RateLimited()]), {}
+    assert asyncio.run(scheduler.run(call, request(), info=info)) == {"reply": "hi"}
+    assert call.calls == 3 and info["retries"] == 2
+    assert scheduler.stats["retries"] == 2 and scheduler.stats["rate_limited"] == 2
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    delays = []
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(llm_scheduler.asyncio, "sleep", sleep)
+    monkeypatch.setattr(llm_scheduler.random, "uniform", lambda low, high: high)
+    scheduler = unmetered(max_retries=6, failure_threshold=100)
+    failures = [RateLimited(retry_after=None) for _ in range(6)]
+    assert asyncio.run(scheduler.run(upstream(failures), request())) == {"reply": "hi"}
+    expected = [min(llm_scheduler.BACKOFF_CAP, llm_scheduler.BACKOFF_BASE * 2 ** n) for n in range(6)]
+    assert delays == expected and delays[-1] == llm_scheduler.BACKOFF_CAP
+
+
+def test_gives_up_after_max_retries():
+    scheduler = unmetered(max_retries=2, failure_threshold=100)
+    call = upstream([RateLimited() for _ in range(5)])
+    with pytest.raises(RateLimited):
+        asyncio.run(scheduler.run(call, request()))
+    assert call.calls == 3
+
+
+def test_client_errors_are_not_retried():
+    scheduler, call = unmetered(), upstream([BadRequest()])
+    with pytest.raises(BadRequest):
+        asyncio.run(scheduler.run(call, request()))
+    assert call.calls == 1 and scheduler.stats["retries"] == 0
+
+
+def test_failures_open_the_circuit():
+    scheduler = unmetered(max_retries=0, failure_threshold=2, cooldown=60)
+    call = upstream([RateLimited() for _ in range(5)])
+    for _ in range(2):
+        with pytest.raises(RateLimited):
+            asyncio.run(scheduler.run(call, request()))
+    assert scheduler.circuit_open and scheduler.stats["circuit_opened"] == 1
+    with pytest.raises(Saturated):
+        asyncio.run(scheduler.run(call, request()))
+    assert call.calls == 2
+
+
+def test_queues_for_budget_and_saturates_past_the_longest_wait():
+    scheduler = Scheduler(rpm=60, tpm=10 ** 9, max_queue_wait=0.5)
+    scheduler.requests.tokens = 0.0  # the next request is a second away
+    call = upstream()
+    with pytest.raises(Saturated):
+        asyncio.run(scheduler.run(call, request()))
+    assert call.calls == 0 and scheduler.stats["saturated"] == 1
+    scheduler.requests.tokens = 0.8
+    start = time.monotonic()
+    asyncio.run(scheduler.run(call, request()))
+    assert 0.1 < time.monotonic() - start < 0.5
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    scheduler, call = unmetered(), upstream(delay=0.05)
+
+    async def main():
+        infos = [{}, {}, {}]
+        results = await asyncio.gather(scheduler.run(call, request(), info=infos[0]),
+                                       scheduler.run(call, request(), info=infos[1]),
+                                       scheduler.run(call, request("other"), info=infos[2]))
+        return results, infos
+
+    results, infos = asyncio.run(main())
+    assert results == [{"reply": "hi"}, {"reply": "hi"}, {"reply": "other"}]
+    assert call.calls == 2 and scheduler.stats["coalesced"] == 1
+    assert [info.get("coalesced", False) for info in infos] == [False, True, False]
+    # Finished requests are not reused
+    asyncio.run(scheduler.run(call, request()))
+    assert call.calls == 3
+
+
+def test_streams_are_not_coalesced():
+    scheduler, call = unmetered(), upstream(delay=0.05)
+
+    async def main():
+        await asyncio.gather(*(scheduler.run(call, request(), coalesce=False) for _ in range(2)))
+
+    asyncio.run(main())
+    assert call.calls == 2 and scheduler.stats["coalesced"] == 0
+
+
+def test_shared_request_survives_one_caller_cancelling():
+    scheduler, call = unmetered(), upstream(delay=0.1)
+
+    async def main():
+        first = asyncio.ensure_future(scheduler.run(call, request()))
+        second = asyncio.ensure_future(scheduler.run(call, request()))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == {"reply": "hi"}
+    assert call.calls == 1
+
+
+def test_background_requests_leave_headroom_for_players():
+    scheduler = Scheduler(rpm=10, tpm=10 ** 9, background_headroom=0.5, background_max_wait=0.2)
+    scheduler.requests.tokens = 5.5  # taking one would leave less than half the bucket
+    call = upstream()
+    with pytest.raises(Saturated):
+        asyncio.run(scheduler.run(call, request(), background=True))
+    assert call.calls == 0 and scheduler.stats["deferred"] == 1
+    # Players still get the budget the background request left alone
+    asyncio.run(scheduler.run(call, request()))
+    assert call.calls == 1
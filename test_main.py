@@ -0,0 +1,55 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from fake_groq_server import start_server
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+TRACE = re.compile(r"^\[\s*([\d.]+)s\] (.*)$", re.MULTILINE)
+TIME_LIMIT = 1.0
+TOLERANCE = 0.1
+
+
+@pytest.fixture
+def fake_groq():
+    server, fake, url = start_server()
+    yield url
+    server.shutdown()
+
+
+def play(script, url, folder):
+    # Runs the CLI in test mode; returns its (seconds, event) traces
+    path = os.path.join(folder, "script.txt")
+    with open(path, "w") as f:
+        f.write("\n".join(script) + "\n")
+    env = dict(os.environ, GROQ_API_KEY="fake", GROQ_BASE_URL=url, LLM_RPM="100000", LLM_TPM="100000000",
+               LLM_CASSETTE="", QUESTION_BANK_PATH=os.path.join(folder, "question_bank.db"),
+               QUESTION_PACK_PATH=os.path.join(folder, "questions.pack"),
+               GAME_EVENTS_DIR=os.path.join(folder, "game_events"), METRICS_PATH=os.path.join(folder, "metrics.prom"))
+    result = subprocess.run([sys.executable, MAIN, "--script", path, "--time-limit", str(TIME_LIMIT)], env=env,
+                            cwd=folder, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return [(float(seconds), event) for seconds, event in TRACE.findall(result.stdout)]
+
+
+def test_answer_reports_the_time_left(fake_groq, tmp_path):
+    # Theme 1, then answer the first question 0.3 s after it is shown
+    traces = play(["0 1", "0.3 1"], fake_groq, str(tmp_path))
+    shown = next(seconds for seconds, event in traces if event == "question shown")
+    seconds, event = next((seconds, event) for seconds, event in traces if event.startswith("answer "))
+    left = float(re.fullmatch(r"answer '1' with ([\d.]+)s left", event).group(1))
+    assert seconds - shown == pytest.approx(0.3, abs=TOLERANCE)
+    assert left == pytest.approx(TIME_LIMIT - 0.3, abs=TOLERANCE)
+
+
+def test_time_up_at_the_time_limit(fake_groq, tmp_path):
+    # Theme 1, then "type" the answer only after the clock has run out
+    traces = play(["0 1", "2 1"], fake_groq, str(tmp_path))
+    events = [event for _, event in traces]
+    assert events == ["question shown", "time up", "input '1' arrived after its prompt closed"]
+    (shown, _), (time_up, _), (late, _) = traces
+    assert time_up - shown == pytest.approx(TIME_LIMIT, abs=TOLERANCE)
+    assert late - shown == pytest.approx(2.0, abs=TOLERANCE)
@@ -0,0 +1,74 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import fuzz_parser
+import output_parser
+from batch_generation import format_question
+from errors import MalformedOutput
+
+with open(fuzz_parser.CORPUS, encoding="utf-8") as f:
+    CORPUS = [json.loads(line) for line in f if line.strip()]
+
+ITEM = {"question": "Which planet is known as the Red Planet?", "options": ["Venus", "Mars", "Jupiter", "Saturn"],
+        "correct": 2, "explanation": "Iron oxide."}
+
+
+class Client:
+    # Answers the follow-up call for missing options
+    def __init__(self, reply):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.reply = reply
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus(case):
+    got, item = fuzz_parser.outcome(case["reply"])
+    assert got == case["expect"]
+    if got == "ok":
+        assert (item["question"], item["options"]) == (case["question"], case["options"])
+    elif got == "fix":
+        assert 4 - len(item["options"]) == case["missing"]
+
+
+def test_mutated_replies_never_crash_or_misread():
+    results, problems = fuzz_parser.fuzz(2000, seed=0)
+    assert not problems, problems[:3]
+    assert results["crashed"] == 0
+
+
+def test_clean_reply_needs_no_repair():
+    item, repairs = output_parser.read(format_question(ITEM))
+    assert repairs == []
+    assert (item["question"], item["options"]) == (ITEM["question"], ITEM["options"])
+
+
+def test_missing_options_are_asked_for_once():
+    reply = "Question: Which planet is known as the Red Planet?\nOptions:\n1. Venus\n2. Mars\n3. Jupiter"
+    client = Client("Saturn\nMars")
+    item = output_parser.parse(reply, client, theme="Space")
+    assert item["options"] == ["Venus", "Mars", "Jupiter", "Saturn"]
+    assert len(client.requests) == 1
+
+
+def test_unrepairable_reply_raises_without_a_call():
+    client = Client("Saturn")
+    with pytest.raises(MalformedOutput):
+        output_parser.parse("Question: Which planet?\nOptions:\n1. Venus", client)
+    with pytest.raises(MalformedOutput):
+        output_parser.parse("Sorry, I can't help with that.", client)
+    assert client.requests == []
+
+
+def test_parse_question_needs_four_options_and_a_key():
+    assert output_parser.parse_question(format_question(ITEM), 2)["correct"] == 2
+    with pytest.raises(MalformedOutput):
+        output_parser.parse_question(format_question(ITEM), 5)
+    with pytest.raises(MalformedOutput):
+        output_parser.parse_question("Question: Which planet?\nOptions:\n1. Venus\n2. Mars", 1)
@@ -0,0 +1,66 @@
+import pytest
+
+from highscores import ScoreStore
+
+GAMES = [("g1", "Asha", 5, "History"), ("g2", "Ravi", 3, "History"), ("g3", "Meera", 3, "Science"),
+         ("g4", "Ravi", 4, "Science"), ("g5", "Kiran", 1, "History"), ("g6", "Asha", 1, "Science")]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.db"), legacy_csv=None)
+    yield store
+    store.close()
+
+
+def test_aggregates_per_player_and_theme(store):
+    for game in GAMES:
+        store.add(*game)
+    assert store.standing("Asha") == {"rank": 1, "players": 4, "percentile": 87.5, "best": 5, "mean": 3.0,
+                                      "games": 2}
+    assert store.standing("Ravi", "Science")["best"] == 4
+    assert store.standing("Nobody") is None
+    assert sorted(store.themes()) == ["History", "Science"]
+
+
+def test_players_with_the_same_best_share_a_rank(store):
+    for game in GAMES:
+        store.add(*game)
+    board = store.leaderboard("History")
+    assert [(row["Rank"], row["Name"]) for row in board] == [(1, "Asha"), (2, "Ravi"), (3, "Kiran")]
+    store.add("g7", "Kiran", 3, "History")
+    ranks = {row["Name"]: row["Rank"] for row in store.leaderboard("History")}
+    assert ranks == {"Asha": 1, "Ravi": 2, "Kiran": 2}
+    assert store.standing("Kiran", "History")["percentile"] == store.standing("Ravi", "History")["percentile"]
+
+
+def test_percentile_counts_half_the_ties(store):
+    for n, score in enumerate([1, 2, 2, 4]):
+        store.add(f"g{n}", f"p{n}", score)
+    # One player below, two (including p1) on 2: (1 + 2 / 2) / 4
+    assert store.standing("p1")["percentile"] == 50.0
+    assert store.standing("p3")["percentile"] == 87.5
+
+
+def test_leaderboard_pages(store):
+    for n in range(25):
+        store.add(f"g{n}", f"player{n:02}", n % 6)
+    pages = [store.leaderboard(page=page, size=10) for page in range(3)]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    names = [row["Name"] for page in pages for row in page]
+    assert len(set(names)) == 25
+    bests = [row["Best"] for page in pages for row in page]
+    assert bests == sorted(bests, reverse=True)
+
+
+def test_bulk_load_and_rebuild_match_incremental_adds(tmp_path, store):
+    for game in GAMES:
+        store.add(*game)
+    bulk = ScoreStore(str(tmp_path / "bulk.db"), legacy_csv=None)
+    bulk.add_many([(game_id, name, score, float(n), theme) for n, (game_id, name, score, theme) in enumerate(GAMES)])
+    for theme in ("*", "History", "Science"):
+        assert bulk.leaderboard(theme) == store.leaderboard(theme)
+    bulk.rebuild_stats()
+    assert bulk.leaderboard() == store.leaderboard()
+    assert bulk.players() == 4
+    bulk.close()
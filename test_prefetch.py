@@ -0,0 +1,96 @@
+from concurrent.futures import Future
+
+import pytest
+
+import prefetch
+from prefetch import QuestionPrefetcher
+
+
+class Inline:
+    # Runs each job as it is submitted, so a test can count them
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+@pytest.fixture(autouse=True)
+def inline(monkeypatch):
+    monkeypatch.setattr(prefetch, "_executor", Inline())
+
+
+def produce(theme, history, difficulty="Easy"):
+    produce.calls.append(difficulty)
+    n = len(produce.calls)
+    return f"Question: {difficulty} {n}?\nA) a\nB) b\nC) c\nD) d", "B"
+
+
+@pytest.fixture
+def prefetcher():
+    produce.calls = []
+    return QuestionPrefetcher(produce, depth=2)
+
+
+def title(prefetched):
+    return prefetched[0].split("\n")[0].replace("Question:", "").strip()
+
+
+def test_questions_are_served_at_the_tier_they_were_made_for(prefetcher):
+    prefetcher.fill("History", "Easy", [])
+    prefetcher.fill("History", "Medium", [])
+    assert title(prefetcher.take("History", "Medium", [])).startswith("Medium")
+    assert title(prefetcher.take("History", "Easy", [])).startswith("Easy")
+
+
+def test_depth_caps_the_look_ahead_across_tiers(prefetcher):
+    prefetcher.fill("History", "Easy", [])
+    assert produce.calls == ["Easy", "Easy"]
+    # The next tier still gets the one question it needs, but no more
+    prefetcher.fill("History", "Medium", [])
+    assert produce.calls == ["Easy", "Easy", "Medium"]
+
+
+def test_limit_caps_the_queue_to_the_questions_left(prefetcher):
+    prefetcher.fill("History", "Easy", [], limit=0)
+    prefetcher.fill("History", "Medium", [], limit=1)
+    assert produce.calls == ["Medium"]
+
+
+def test_take_skips_questions_already_seen(prefetcher):
+    prefetcher.fill("History", "Easy", [])
+    seen = title(prefetcher.take("History", "Easy", []))
+    prefetcher.fill("History", "Easy", [])
+    for _ in range(3):
+        assert title(prefetcher.take("History", "Easy", [seen])) != seen
+
+
+def test_take_generates_on_the_spot_when_nothing_is_queued(prefetcher):
+    made = prefetcher.take("History", "Hard", [], produce=lambda theme, history, difficulty: ("Question: x?", "A"))
+    assert made == ("Question: x?", "A")
+    assert produce.calls == []
+
+
+def test_chained_jobs_exclude_what_the_previous_job_made():
+    excluded = []
+
+    def record(theme, history, difficulty="Easy"):
+        excluded.append(list(history))
+        return f"Question: {difficulty} {len(excluded)}?", "A"
+
+    prefetcher = QuestionPrefetcher(record, depth=2)
+    prefetcher.fill("History", "Easy", ["Old?"])
+    prefetcher.take("History", "Easy", [])
+    prefetcher.take("History", "Easy", [])
+    assert excluded == [["Old?"], ["Old?", "Easy 1?"]]
+
+
+def test_a_new_theme_drops_the_old_queue(prefetcher):
+    prefetcher.fill("History", "Easy", [])
+    assert not prefetcher.has_ready("Science", "Easy")
+    prefetcher.fill("Science", "Easy", [])
+    prefetcher.take("History", "Easy", [])
+    # History's questions were dropped, so that one was generated on the spot
+    assert produce.calls.count("Easy") == 5
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+import prompts
+from errors import BudgetExceeded
+from llm_scheduler import estimate_tokens
+
+
+def reply(prompt, completion):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion))
+
+
+REQUEST = prompts.question_request("History", ["Who built the Red Fort?"], "Easy", strategy="compact")
+
+
+def test_default_budget_is_finite():
+    assert prompts.GAME_TOKEN_BUDGET > 0
+    assert prompts.Budget().limit == prompts.GAME_TOKEN_BUDGET
+
+
+def test_reserve_charges_the_estimate_and_settle_the_usage():
+    budget = prompts.Budget(limit=10_000)
+    costs = budget.reserve([REQUEST, REQUEST])
+    assert costs == [estimate_tokens(REQUEST)] * 2
+    assert budget.spent == sum(costs)
+    budget.settle(costs, [reply(100, 20), None])
+    # The stream reported no usage, so its estimate stands
+    assert budget.spent == 120 + costs[1]
+    assert budget.stats["calls"] == 2
+
+
+def test_a_failed_call_costs_nothing():
+    budget = prompts.Budget(limit=10_000)
+    costs = budget.reserve([REQUEST])
+    budget.settle(costs, [RuntimeError("upstream down")])
+    assert budget.spent == 0
+
+
+def test_over_the_limit_nothing_is_charged():
+    cost = estimate_tokens(REQUEST)
+    budget = prompts.Budget(limit=cost * 2)
+    budget.reserve([REQUEST])
+    with pytest.raises(BudgetExceeded):
+        budget.reserve([REQUEST, REQUEST])
+    assert budget.spent == cost
+    assert budget.stats["refused"] == 2
+    budget.reserve([REQUEST])
+
+
+def test_zero_limit_only_measures():
+    budget = prompts.Budget(limit=0)
+    for _ in range(100):
+        budget.reserve([REQUEST])
+    assert budget.spent == 100 * estimate_tokens(REQUEST)
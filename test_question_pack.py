@@ -0,0 +1,21 @@
+import pytest
+
+from question_pack import _round_keys, permute
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 16, 100, 1000, 4097])
+def test_permute_is_a_permutation(n):
+    keys = _round_keys("player\0History\0Easy")
+    assert sorted(permute(i, n, keys) for i in range(n)) == list(range(n))
+
+
+def test_permute_is_deterministic_for_a_seed():
+    keys = _round_keys("seed")
+    assert [permute(i, 500, keys) for i in range(500)] == [permute(i, 500, _round_keys("seed")) for i in range(500)]
+
+
+def test_seeds_walk_in_different_orders():
+    first = [permute(i, 500, _round_keys("alice")) for i in range(500)]
+    second = [permute(i, 500, _round_keys("bob")) for i in range(500)]
+    assert first != second
+    assert first != list(range(500))
@@ -0,0 +1,61 @@
+import time
+
+import question_pool
+
+
+def produce(client, theme, difficulty, count, exclude):
+    produce.calls.append(count)
+    produce.made += count
+    return [{"question": f"{theme} {difficulty} {produce.made - n}?"} for n in range(count)]
+
+
+def pool(**kwargs):
+    produce.calls, produce.made = [], 0
+    return question_pool.QuestionPool(produce=produce, client=object(), workers=1, **kwargs)
+
+
+def settle(pool):
+    deadline = time.monotonic() + 5
+    while any(row["refilling"] for row in pool.stats()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_ensure_stocks_only_the_initial_goal():
+    questions = pool(target=10, low_water=4, initial=1)
+    questions.ensure("History", "Easy")
+    settle(questions)
+    assert questions.depth("History", "Easy") == 1
+    assert produce.calls == [1]
+
+
+def test_goal_follows_demand_up_to_target():
+    questions = pool(target=3, low_water=4, initial=1)
+    questions.ensure("History", "Easy")
+    goals = []
+    for _ in range(5):
+        settle(questions)
+        assert questions.take("History", "Easy") is not None
+        settle(questions)
+        goals.append(questions.stats()[0]["goal"])
+    assert goals == [1, 2, 3, 3, 3]
+    # One question per take until the goal is reached: no batch spent on a guess
+    assert sum(produce.calls) == 1 + 5 + 2
+    assert questions.depth("History", "Easy") == 3
+
+
+def test_demand_older_than_the_window_is_forgotten(monkeypatch):
+    questions = pool(target=10, low_water=4, initial=1)
+    for _ in range(4):
+        questions.take("History", "Easy")
+    settle(questions)
+    assert questions.stats()[0]["goal"] == 4
+    monkeypatch.setattr(question_pool, "DEMAND_WINDOW", 0.0)
+    assert questions.stats()[0]["goal"] == 1
+
+
+def test_take_skips_questions_in_the_history():
+    questions = pool(target=2, low_water=2, initial=2)
+    questions.ensure("History", "Easy")
+    settle(questions)
+    first = questions.take("History", "Easy", history=["History Easy 1?"])
+    assert first["question"] == "History Easy 2?"
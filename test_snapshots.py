@@ -0,0 +1,53 @@
+import json
+import random
+
+import engine
+import snapshots
+
+
+def game_with_question():
+    state = engine.new_game("History")
+    for right in (True, True):
+        state = engine.present(state, engine.Question("Q?", ["a", "b", "c", "d"], 2), random.Random(0))
+        state = engine.answer(state, 2 if right else 1)
+    return engine.present(state, engine.Question("Which year?", ["1947", "1950", "1857", "1961"], 1, "Freedom."),
+                          random.Random(1))
+
+
+def test_round_trip():
+    game = game_with_question()
+    player, loaded, game_id, history, extra = snapshots.loads(
+        snapshots.dumps("asha", game, "g1", ["Q?"], {"token": 3}))
+    assert (player, game_id, history, extra) == ("asha", "g1", ["Q?"], {"token": 3})
+    assert [getattr(loaded, name) for name in ("score", "q_count", "order", "visible", "lifelines", "streak")] == \
+        [getattr(game, name) for name in ("score", "q_count", "order", "visible", "lifelines", "streak")]
+    assert loaded.question.text == "Which year?" and loaded.question.options == game.question.options
+    assert engine.tier(loaded) == engine.tier(game)
+
+
+def test_version_1_snapshot_is_upgraded():
+    # Written before the game kept the answer streak (one field shorter)
+    game = snapshots._dump_game(game_with_question())[:-1]
+    blob = json.dumps([1, "asha", "g1", game, ["Q?"], {}]).encode()
+    player, loaded, game_id, history, extra = snapshots.loads(blob)
+    assert (player, game_id, history, extra) == ("asha", "g1", ["Q?"], {})
+    assert loaded.streak == 0 and loaded.score == 2 and loaded.q_count == 2
+    assert loaded.question.text == "Which year?"
+
+
+def test_version_1_snapshot_without_a_game():
+    assert snapshots.loads(json.dumps([1, "asha", None, None, [], {}]).encode()) == ("asha", None, None, [], {})
+
+
+def test_unreadable_snapshots_load_as_none():
+    assert snapshots.loads(b"not json") is None
+    assert snapshots.loads(json.dumps([99, "asha", None, None, [], {}]).encode()) is None
+    assert snapshots.loads(json.dumps([1, "asha"]).encode()) is None
+
+
+def test_stores_save_and_load(tmp_path):
+    for store in (snapshots.SqliteSnapshots(str(tmp_path / "s.db")), snapshots.FileSnapshots(str(tmp_path / "s"))):
+        blob = snapshots.dumps("asha", game_with_question())
+        store.save("token", blob)
+        assert store.load("token") == blob
+        assert store.load("missing") is None
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+import verification
+
+
+class Client:
+    # gather() answers each vote request in turn with the next scripted reply
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def gather(self, requests):
+        self.requests.extend(requests)
+        out, self.replies = self.replies[:len(requests)], self.replies[len(requests):]
+        return [r if isinstance(r, Exception) else SimpleNamespace(choices=[
+            SimpleNamespace(message=SimpleNamespace(content=r))]) for r in out]
+
+
+class Bank:
+    def __init__(self):
+        self.agreements = []
+
+    def record_agreement(self, theme, difficulty, share, agreed):
+        self.agreements.append((theme, difficulty, round(share, 2), agreed))
+
+
+@pytest.fixture
+def bank(monkeypatch):
+    bank = Bank()
+    monkeypatch.setattr(verification, "get_bank", lambda: bank)
+    return bank
+
+
+def item(n, correct=2):
+    return {"question": f"Question {n}?", "options": ["a", "b", "c", "d"], "correct": correct,
+            "explanation": "Because."}
+
+
+@pytest.mark.parametrize("content, choice", [
+    ("3", 3), ("3.", 3), ("Option 3", 3), ("The answer is option C", 3), ("I don't know", None), ("", None),
+])
+def test_parse_choice(content, choice):
+    assert verification.parse_choice(content) == choice
+
+
+def test_tally_majority_and_share():
+    assert verification.tally([2, 2, 3]) == (2, pytest.approx(2 / 3))
+    # The generator's own key is one more vote
+    assert verification.tally([2, 3, None], claimed=2) == (None, 0.5)
+    assert verification.tally([2, 2, None], claimed=2) == (2, 0.75)
+
+
+def test_tally_rejects_ties_and_unusable_replies():
+    assert verification.tally([1, 2]) == (None, 0.5)
+    assert verification.tally([None, None]) == (None, 0.0)
+    assert verification.tally([]) == (None, 0.0)
+
+
+def test_voters_are_not_coalesced():
+    requests = verification.answer_requests("Question: x?\nOptions:\n1. a\n2. b\n3. c\n4. d", votes=3)
+    assert len({r["seed"] for r in requests}) == 3
+
+
+def test_verify_items_keeps_the_majority_answer(bank):
+    client = Client("3", "3", "3", "2", "1", "4")
+    kept = verification.verify_items(client, [item(1), item(2)], "History", votes=3)
+    # The first item's key is outvoted and corrected; the second has no majority
+    assert kept == [dict(item(1), correct=3)]
+    assert len(client.requests) == 6
+    assert [agreed for *_, agreed in bank.agreements] == [True, False]
+
+
+def test_verify_items_skips_items_whose_votes_all_failed(bank):
+    client = Client(RuntimeError("down"), RuntimeError("down"), "2", "2")
+    assert verification.verify_items(client, [item(1), item(2)], "History", votes=2) == [item(2)]
+
+
+def test_verify_items_raises_when_every_call_failed(bank):
+    with pytest.raises(RuntimeError):
+        verification.verify_items(Client(RuntimeError("down"), RuntimeError("down")), [item(1)], "History", votes=2)
@@ -0,0 +1,114 @@
+import os
+import re
+from collections import Counter
+
+import metrics
+import output_parser
+import prompts
+from batch_generation import format_question
+from errors import NoConsensus
+from question_bank import get_bank
+
+# Answer keys are checked by asking K independent answerers at once and taking a
+# majority vote. The calls go out together through the gateway, so a check costs
+# about one call of latency. Questions without consensus are rejected.
+
+VOTES = int(os.getenv("VERIFY_VOTES", "3"))
+# Comma-separated; voters take turns over these models, so a second model can be mixed in
+MODELS = os.getenv("VERIFY_MODELS", "llama-3.1-8b-instant").split(",")
+# Share of all votes (including unusable replies) the winning option needs
+AGREEMENT = float(os.getenv("VERIFY_AGREEMENT", "0.6"))
+# Fresh questions generated before giving up on a theme
+ATTEMPTS = 2
+
+_CHOICE = re.compile(r"\b([1-4])\b|\boption\s+([A-D])\b", re.IGNORECASE)
+
+
+def parse_choice(content):
+    # "3", "3.", "Option 3", "The answer is option C" -> 3; None when there's no usable answer
+    match = _CHOICE.search(content or "")
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else "ABCD".index(match.group(2).upper()) + 1
+
+
+def answer_requests(q_data, votes=VOTES, models=MODELS):
+    # Messages as prompts.PROMPT_STRATEGY writes them; distinct seeds keep the scheduler
+    # from coalescing the voters into one call
+    request = prompts.answer_request(q_data)
+    return [{
+        **request,
+        "model": models[i % len(models)].strip(),
+        "temperature": 0.0 if i == 0 else 0.7,
+        "seed": i,
+    } for i in range(votes)]
+
+
+def tally(ballots, claimed=None):
+    # ballots: parsed votes (None for unusable replies). The generator's own key, when
+    # there is one, counts as one more vote. Returns (winner or None, share of the winner).
+    ballots = list(ballots) + ([claimed] if claimed is not None else [])
+    counted = Counter(b for b in ballots if b is not None)
+    if not counted:
+        return None, 0.0
+    (winner, count), *rest = counted.most_common()
+    share = count / len(ballots)
+    tied = rest and rest[0][1] == count
+    return (None if tied or share < AGREEMENT else winner), share
+
+
+def _failed(responses):
+    return all(isinstance(r, Exception) for r in responses)
+
+
+def _ballots(responses):
+    if _failed(responses):
+        raise responses[0]
+    return [None if isinstance(r, Exception) else parse_choice(r.choices[0].message.content) for r in responses]
+
+
+def _record(theme, difficulty, winner, share):
+    get_bank().record_agreement(theme, difficulty, share, winner is not None)
+
+
+@metrics.instrument()
+def verify(client, q_data, theme, difficulty="Easy", claimed=None, votes=VOTES):
+    # The agreed option number, or None when the voters disagree
+    winner, share = tally(_ballots(client.gather(answer_requests(q_data, votes))), claimed)
+    _record(theme, difficulty, winner, share)
+    return winner
+
+
+@metrics.instrument()
+def verify_items(client, items, theme, difficulty="Easy", votes=VOTES):
+    # Checks a whole batch with one round of parallel calls. The generator's key is one
+    # vote; items keep the majority answer and are dropped when there is none, or when
+    # none of their votes came back. Only a round where every call failed raises.
+    requests = [r for item in items for r in answer_requests(format_question(item), votes)]
+    responses = client.gather(requests)
+    if responses and _failed(responses):
+        raise responses[0]
+    kept = []
+    for i, item in enumerate(items):
+        answers = responses[i * votes:(i + 1) * votes]
+        if _failed(answers):
+            continue
+        winner, share = tally(_ballots(answers), item["correct"])
+        _record(theme, difficulty, winner, share)
+        if winner is not None:
+            kept.append(dict(item, correct=winner))
+    return kept
+
+
+def generate_verified(client, generate, theme, difficulty="Easy", votes=VOTES):
+    # generate() returns question text; it is repaired into the standard layout, and
+    # retried with a fresh question when it can't be or the voters disagree
+    for _ in range(ATTEMPTS):
+        try:
+            q_data = format_question(output_parser.parse(generate(), client, theme, source="single"))
+        except output_parser.MalformedOutput:
+            continue
+        correct = verify(client, q_data, theme, difficulty, votes=votes)
+        if correct is not None:
+            return q_data, correct
+    raise NoConsensus(f"no usable question with an agreed answer key for {theme} after {ATTEMPTS} tries")